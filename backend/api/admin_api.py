@@ -1,10 +1,18 @@
 # api/admin_api.py
-from flask import Blueprint, jsonify
-from flask_restful import Api, Resource
+import os
+from flask import Blueprint, jsonify, current_app, request, send_from_directory
+from flask_restful import Resource
+from core.restful import Api
 from core.extensions import db
-from core.models import User, QuizAttempt
+from core.models import User, ArchivedQuizAttempt, Quiz, percentage_score
+from core.archive import attempt_history, quiz_labels
+from core.database import pool_metrics
+from core.item_analysis import analysis_or_enqueue
+from core.profiling import list_profiles, profile_dir
+from core.routing import read_only
 from .decorators import admin_required_api
 from flask_jwt_extended import jwt_required 
+from sqlalchemy import func, select
 
 # Define the Blueprint
 admin_api_bp = Blueprint('admin_api', __name__)
@@ -19,23 +27,41 @@ def format_timedelta(td):
 class UserActivityAPI(Resource):
     @jwt_required()
     @admin_required_api
+    @read_only()
     def get(self, user_id):
-        """ Fetches a specific user's details and their full attempt history. """
+        """
+        Fetches a specific user's details and their attempt history. Archived attempts
+        are only included with ?include_archived=true, which pages the combined history
+        (?page=1&per_page=50).
+        """
         user = User.query.get_or_404(user_id)
-        
-        attempts = QuizAttempt.query.filter_by(user_id=user.id)\
-                                    .order_by(QuizAttempt.submitted_at.desc()).all()
-        
+        include_archived = request.args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+        history = attempt_history(user.id, include_archived)
+        paging = None
+        if include_archived:
+            page = max(request.args.get('page', 1, type=int), 1)
+            per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+            total = db.session.scalar(select(func.count()).select_from(history.subquery()))
+            attempts = db.session.execute(history.limit(per_page).offset((page - 1) * per_page)).all()
+            paging = {'page': page, 'per_page': per_page, 'total': total, 'pages': -(-total // per_page)}
+        else:
+            attempts = db.session.execute(history).all()
+        archived_count = db.session.query(func.count(ArchivedQuizAttempt.id))\
+                                   .filter(ArchivedQuizAttempt.user_id == user.id).scalar()
+        labels = quiz_labels([a.quiz_id for a in attempts])
+
         attempts_data = [
             {
-                'quiz_title': a.quiz.title,
-                'chapter_name': a.quiz.chapter.name,
-                'subject_name': a.quiz.chapter.subject.name,
+                'quiz_title': labels[a.quiz_id].title,
+                'chapter_name': labels[a.quiz_id].chapter_name,
+                'subject_name': labels[a.quiz_id].subject_name,
                 'score': a.score,
                 'total_questions': a.total_questions,
-                'percentage_score': a.percentage_score,
+                'percentage_score': percentage_score(a.score, a.total_questions),
                 'submitted_at': a.submitted_at.strftime('%Y-%m-%d %H:%M:%S') if a.submitted_at else 'Incomplete',
-                'time_taken': format_timedelta(a.time_taken)
+                'time_taken': format_timedelta(a.submitted_at - a.start_time if a.submitted_at and a.start_time else None),
+                'archived': a.archived
             } for a in attempts
         ]
 
@@ -47,7 +73,73 @@ class UserActivityAPI(Resource):
 
         return jsonify({
             'user': user_data,
-            'attempts': attempts_data
+            'attempts': attempts_data,
+            'archived_count': archived_count,
+            'paging': paging
+        })
+
+class ProfileListAPI(Resource):
+    @jwt_required()
+    @admin_required_api
+    def get(self):
+        """ Lists captured request profiles (newest first) with their endpoint and SQL summary. """
+        limit = request.args.get('limit', 100, type=int)
+        return jsonify({
+            'enabled': current_app.config.get('PROFILING_ENABLED', False),
+            'profiles': list_profiles(current_app, limit=limit)
+        })
+
+class ProfileFileAPI(Resource):
+    @jwt_required()
+    @admin_required_api
+    def get(self, filename):
+        """ Downloads a profile file (.collapsed, .prof or its .json metadata). """
+        return send_from_directory(profile_dir(current_app), filename, as_attachment=True)
+
+class SlowQueryReportAPI(Resource):
+    @jwt_required()
+    @admin_required_api
+    def get(self):
+        """ Slow statements of this worker process aggregated by fingerprint, worst total time first. """
+        recorder = current_app.extensions.get('quizapp_slow_queries')
+        if recorder is None:
+            return {'enabled': False, 'queries': []}
+        return jsonify({
+            'enabled': True,
+            'threshold_ms': recorder.threshold * 1000.0,
+            'pid': os.getpid(),
+            'queries': recorder.report(limit=request.args.get('limit', 50, type=int))
         })
 
-api.add_resource(UserActivityAPI, '/users/<int:user_id>/activity')
\ No newline at end of file
+    @jwt_required()
+    @admin_required_api
+    def delete(self):
+        """ Clears the aggregated slow query report. """
+        recorder = current_app.extensions.get('quizapp_slow_queries')
+        if recorder:
+            recorder.reset()
+        return {'message': 'Slow query report cleared'}, 200
+
+class DatabasePoolAPI(Resource):
+    @jwt_required()
+    @admin_required_api
+    def get(self):
+        """ Connection pool usage of this worker process: checkout waits, overflow and timeouts. """
+        return jsonify({'pid': os.getpid(), 'dialect': db.engine.dialect.name, 'pool': pool_metrics(db.engine)})
+
+class QuizItemAnalysisAPI(Resource):
+    @jwt_required()
+    @admin_required_api
+    @read_only()
+    def get(self, quiz_id):
+        """ Difficulty, discrimination and option choices per question, from the stored answers. ?refresh=1 recomputes. """
+        quiz = db.get_or_404(Quiz, quiz_id)
+        body, status = analysis_or_enqueue(quiz, refresh=request.args.get('refresh', '0') in ('1', 'true'))
+        return jsonify(body) if status == 200 else (body, status)
+
+api.add_resource(UserActivityAPI, '/users/<int:user_id>/activity')
+api.add_resource(ProfileListAPI, '/profiles')
+api.add_resource(ProfileFileAPI, '/profiles/<path:filename>')
+api.add_resource(SlowQueryReportAPI, '/slow-queries')
+api.add_resource(DatabasePoolAPI, '/db-pool')
+api.add_resource(QuizItemAnalysisAPI, '/quizzes/<int:quiz_id>/item-analysis')
@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
-from flask_restful import Api, Resource, reqparse
-from flasgger import swag_from
+from flask_restful import Resource, reqparse
+from core.restful import Api
+from core.apidocs import swag_from
 from core.extensions import db
 from core.models import QuizAttempt, User, Quiz
-from .decorators import admin_required_api
+from core.leaderboards import record_attempt
+from .decorators import admin_required_api, has_role_claim
 from datetime import datetime, timezone
 from flask_login import current_user
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
@@ -55,7 +57,7 @@ class QuizAttemptListAPI(Resource):
         quiz_id_filter = request.args.get('quiz_id', type=int)
 
         # Non-admins can only see their own attempts
-        if not jwt_current_user.has_role('admin'):
+        if not has_role_claim('admin'):
             query = query.filter_by(user_id=jwt_current_user.id)
             if user_id_filter and user_id_filter != jwt_current_user.id:
                  return {'message': 'Forbidden'}, 403 
@@ -70,8 +72,8 @@ class QuizAttemptListAPI(Resource):
         result = [{
             'id': a.id, 'user_id': a.user_id, 'quiz_id': a.quiz_id, 'score': a.score,
             'total_questions': a.total_questions, 
-            'start_time': a.start_time.isoformat() if a.start_time else None, 
-            'submitted_at': a.submitted_at.isoformat() if a.submitted_at else None,
+            'start_time': a.start_time, 
+            'submitted_at': a.submitted_at,
             'percentage_score': a.percentage_score
             } for a in attempts]
         return jsonify({'attempts': result})
@@ -108,6 +110,7 @@ class QuizAttemptListAPI(Resource):
          db.session.add(attempt)
          try:
             db.session.commit()
+            record_attempt(attempt) # No-op unless it has a submitted_at
             return {'message': 'Quiz attempt recorded', 'attempt': {'id': attempt.id}}, 201
          except Exception as e:
              db.session.rollback(); print(f"Error recording attempt: {e}")
@@ -125,13 +128,13 @@ class QuizAttemptDetailAPI(Resource):
     def get(self, attempt_id):
         attempt = QuizAttempt.query.get_or_404(attempt_id, description='Attempt not found')
         # Check permissions: Admin or owner of the attempt
-        if not jwt_current_user.has_role('admin') and attempt.user_id != jwt_current_user.id:
+        if not has_role_claim('admin') and attempt.user_id != jwt_current_user.id:
             return {'message': 'Forbidden'}, 403
         return jsonify({
              'id': attempt.id, 'user_id': attempt.user_id, 'quiz_id': attempt.quiz_id, 'score': attempt.score,
              'total_questions': attempt.total_questions,
-             'start_time': attempt.start_time.isoformat() if attempt.start_time else None,
-             'submitted_at': attempt.submitted_at.isoformat() if attempt.submitted_at else None,
+             'start_time': attempt.start_time,
+             'submitted_at': attempt.submitted_at,
              'percentage_score': attempt.percentage_score
         })
 
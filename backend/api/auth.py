@@ -1,9 +1,11 @@
 # api/auth.py
 from flask import request, jsonify, Blueprint
-from flask_restful import Api, Resource, reqparse
-from flasgger import swag_from
+from flask_restful import Resource, reqparse
+from core.restful import Api
+from core.apidocs import swag_from
 from core.extensions import db, csrf
 from core.models import User, Role, SecretQuestion
+from core.identity import invalidate_identity
 from flask_jwt_extended import create_access_token, jwt_required
 import re
 
@@ -25,7 +27,9 @@ class LoginAPI(Resource):
         username_or_email = data.get('username')
         password = data.get('password')
         user = User.query.filter((User.username == username_or_email) | (User.email == username_or_email)).first()
-        if user and user.check_password(password):
+        if user and user.active and user.check_password(password): # Deactivated, e.g. while being deleted
+            # Informational only: the SPA reads roles to pick its menus and routes. The API
+            # authorizes from the user's current roles (core/authz.py), never from this claim.
             additional_claims = {"roles": [role.name for role in user.roles], "username": user.username}
             access_token = create_access_token(identity=user.fs_uniquifier, additional_claims=additional_claims)
             return {'access_token': access_token}, 200
@@ -64,7 +68,7 @@ class RegisterAPI(Resource):
         db.session.commit()
 
         secret_key_part = '-'.join(new_user.fs_uniquifier.split('-')[1:4])
-        additional_claims = {"roles": ["user"], "username": new_user.username}
+        additional_claims = {"roles": ["user"], "username": new_user.username} # roles is informational, see LoginAPI
         access_token = create_access_token(identity=new_user.fs_uniquifier, additional_claims=additional_claims)
         return {'message': 'Registration successful!', 'secret_key': secret_key_part, 'access_token': access_token}, 201
 
@@ -120,6 +124,7 @@ class ForgotPasswordResetAPI(Resource):
         # All checks passed, update the password
         user.set_password(data['new_password'])
         db.session.commit()
+        invalidate_identity(user.fs_uniquifier)
         
         return {'message': 'Password has been reset successfully.'}, 200
 
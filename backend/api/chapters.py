@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
-from flask_restful import Api, Resource, reqparse
-from flasgger import swag_from
+from flask_restful import Resource, reqparse
+from core.restful import Api
+from core.apidocs import swag_from
+from core.cloning import clone_or_enqueue
+from core.deletion import delete_or_enqueue
 from core.extensions import db
 from core.models import Chapter, Subject # Need Subject for checks/joins
+from sqlalchemy.orm import contains_eager
 from .decorators import admin_required_api
 from flask_jwt_extended import jwt_required, current_user as jwt_current_user
 
@@ -47,7 +51,7 @@ class ChapterListAPI(Resource):
         subject_id = request.args.get('subject_id', type=int)
         if subject_id:
             query = query.filter_by(subject_id=subject_id)
-        chapters = query.join(Subject).order_by(Subject.name, Chapter.name).all()
+        chapters = query.join(Subject).options(contains_eager(Chapter.subject)).order_by(Subject.name, Chapter.name).all()
         result = [{'id': c.id, 'name': c.name, 'subject_id': c.subject_id, 'subject_name': c.subject.name} for c in chapters]
         return jsonify({'chapters': result})
 
@@ -151,16 +155,51 @@ class ChapterDetailAPI(Resource):
     @jwt_required()
     @admin_required_api
     def delete(self, chapter_id):
-        chapter = Chapter.query.get_or_404(chapter_id, description='Chapter not found')
+        Chapter.query.get_or_404(chapter_id, description='Chapter not found')
         try:
-            db.session.delete(chapter) # Cascade delete handles quizzes etc.
-            db.session.commit()
-            return {'message': 'Chapter deleted successfully'}, 200
+            body, status = delete_or_enqueue('chapter', chapter_id) # Quizzes, questions, attempts etc. in bulk
+            if status == 202:
+                return {'message': 'Chapter is being deleted in the background', **body}, status
+            return {'message': 'Chapter deleted successfully', **body}, status
         except Exception as e:
             db.session.rollback()
             return {'message': f'Error deleting chapter: {e}'}, 500
         
+class ChapterCloneAPI(Resource):
+    @swag_from({
+        'tags': ['Chapters'],
+        'summary': 'Copy a chapter with all its quizzes, questions and options',
+        'parameters': [
+            {'name': 'chapter_id', 'in': 'path', 'type': 'integer', 'required': True},
+            {'name': 'body', 'in': 'body', 'required': False, 'schema': {'type': 'object', 'properties': {
+                'subject_id': {'type': 'integer', 'description': 'Subject to copy into (default: the same one)'},
+                'name': {'type': 'string', 'description': "Copy's name (default: the same one)"}}}}
+        ],
+        'responses': {
+            201: {'description': 'Chapter copied'},
+            202: {'description': 'Copying in the background'},
+            404: {'description': 'Chapter or subject not found'}
+        }
+    })
+    @jwt_required()
+    @admin_required_api
+    def post(self, chapter_id):
+        Chapter.query.get_or_404(chapter_id, description='Chapter not found')
+        data = request.get_json(silent=True) or {}
+        subject_id = data.get('subject_id')
+        if subject_id is not None and not db.session.get(Subject, subject_id):
+            return {'message': 'Subject not found'}, 404
+        try:
+            body, status = clone_or_enqueue('chapter', chapter_id, name=data.get('name'), parent_id=subject_id)
+        except Exception as e:
+            db.session.rollback()
+            return {'message': f'Error cloning chapter: {e}'}, 500
+        if status == 202:
+            return {'message': 'Chapter is being copied in the background', **body}, status
+        return {'message': 'Chapter copied successfully', **body}, status
+
 api.add_resource(ChapterListAPI, '/')
 api.add_resource(ChapterDetailAPI, '/<int:chapter_id>')
+api.add_resource(ChapterCloneAPI, '/<int:chapter_id>/clone')
 
 chapters_api_bp.add_app_template_global(definitions, name='chapter_definitions')
\ No newline at end of file
@@ -1,11 +1,11 @@
 # api/export_api.py
-from flask import Blueprint, jsonify
-from flask_restful import Api, Resource
-from celery.result import AsyncResult
+from flask import Blueprint, jsonify, request
+from flask_restful import Resource
+from core.restful import Api
+from core.export_jobs import create_job, update_job, wait_for_job
 from core.extensions import csrf
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from jobs import export_user_attempts_csv 
-from core.models import User
+from core.models import ExportJob
+from flask_jwt_extended import jwt_required, current_user as jwt_current_user
 
 export_api_bp = Blueprint('export_api', __name__)
 api = Api(export_api_bp)
@@ -15,23 +15,50 @@ class UserExportAPI(Resource):
 
     def post(self):
         """Triggers the CSV export background job for the current user."""
-        user_identity = get_jwt_identity()
-        user = User.query.filter_by(fs_uniquifier=user_identity).first()
-        if not user:
-            return {'message': 'User not found'}, 404
-        
-        # Start the background task and get its ID
-        task = export_user_attempts_csv.delay(user.id)
-        
-        # Immediately return the task ID to the frontend
-        return jsonify({'task_id': task.id})
+        # Imported on first use so web workers don't load Celery at startup.
+        from jobs import export_user_attempts_csv
+        # The job row exists before the task starts, so the first status request always finds it
+        job = create_job(jwt_current_user.id)
+        try:
+            export_user_attempts_csv.apply_async(args=(jwt_current_user.id, job.id), task_id=job.id)
+        except Exception as e:
+            update_job(job.id, status='FAILURE', error='Could not queue the export')
+            print(f"Error queueing export: {e}")
+            return {'message': 'Could not start the export'}, 503
+
+        # Immediately return the job (= task) ID to the frontend
+        return jsonify({'task_id': job.id, 'status_url': f'/api/user/exports/{job.id}'})
+
+class UserExportJobAPI(Resource):
+    method_decorators = [jwt_required()]
+
+    def get(self, job_id):
+        """
+        An export job's status. With `?version=<n>&wait=<seconds>` it long-polls:
+        it answers once the job's version is no longer n (or it has finished),
+        or after `wait` seconds (capped by EXPORT_WAIT_SECONDS) unchanged.
+        """
+        job = wait_for_job(job_id, jwt_current_user.id, version=request.args.get('version', type=int),
+                           timeout=request.args.get('wait', 0, type=float))
+        if job is None:
+            return {'message': 'Export not found'}, 404
+        return job
 
 class ExportStatusAPI(Resource):
     method_decorators = [csrf.exempt, jwt_required()]
 
     def get(self, task_id):
         """Checks the status of a background task."""
-        task_result = AsyncResult(task_id)
+        job = ExportJob.query.get(task_id)
+        if job is not None and job.user_id == jwt_current_user.id: # Exports: from the table, not the result backend
+            result = {'status': 'SUCCESS', 'filename': job.filename} if job.status == 'SUCCESS' else \
+                     {'status': 'FAILURE', 'error': job.error} if job.status == 'FAILURE' else None
+            response = {'status': job.status, 'result': result}
+            if job.status == 'PROGRESS':
+                response['progress'] = {'done': job.done, 'total': job.total}
+            return jsonify(response)
+        from celery_worker import celery
+        task_result = celery.AsyncResult(task_id)
         
         response = {
             'status': task_result.status,
@@ -40,10 +67,13 @@ class ExportStatusAPI(Resource):
 
         if task_result.successful():
             response['result'] = task_result.get() # This will be {'status': 'SUCCESS', 'filename': '...'}
+        elif task_result.state == 'PROGRESS':
+            response['progress'] = task_result.info # e.g. {'done': ..., 'total': ...} from jobs.delete_content
         elif task_result.failed():
             response['result'] = {'status': 'FAILURE', 'error': str(task_result.info)} # Get exception info
 
         return jsonify(response)
 
 api.add_resource(UserExportAPI, '/user/export-attempts')
+api.add_resource(UserExportJobAPI, '/user/exports/<string:job_id>')
 api.add_resource(ExportStatusAPI, '/tasks/<string:task_id>/status')
\ No newline at end of file
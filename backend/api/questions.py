@@ -1,9 +1,14 @@
 from flask import Blueprint, jsonify, request # Added jsonify, request
-from flask_restful import Api, Resource, reqparse # Added reqparse
-from flasgger import swag_from
+from flask_restful import Resource, reqparse # Added reqparse
+from core.restful import Api
+from core.apidocs import swag_from
 
 from core.extensions import db
+from core.item_analysis import forget_analysis
 from core.models import Quiz, Question, Option
+from core.instrumentation import query_budget
+from core.quiz_authoring import QUIZ_DOCUMENT_SCHEMA, InvalidDocument, attempts_in_progress, replace_questions
+from core.serializers import load_question, load_quiz_content, serialize_question
 from flask_jwt_extended import jwt_required
 from .decorators import admin_required_api
 
@@ -22,14 +27,10 @@ class QuizQuestionListAPI(Resource):
         'parameters': [{'name': 'quiz_id', 'in': 'path', 'type': 'integer', 'required': True}],
         'responses': { 200: {'description': 'List of questions with options', 'schema': {'$ref': '#/definitions/QuestionListResponse'}}, 404: {} }
     })
+    @query_budget(4) # identity, quiz, questions, options - whatever the quiz size
     def get(self, quiz_id):
-        quiz = Quiz.query.get_or_404(quiz_id, description='Quiz not found')
-        questions = Question.query.filter_by(quiz_id=quiz.id).order_by(Question.id).all()
-        result = []
-        for q in questions:
-            options = [{'id': o.id, 'text': o.text, 'is_correct': o.is_correct} for o in q.options.order_by(Option.id).all()]
-            result.append({'id': q.id, 'text': q.text, 'quiz_id': q.quiz_id, 'options': options})
-        return {'questions': result}
+        quiz = load_quiz_content(quiz_id)
+        return {'questions': [serialize_question(q) for q in quiz.question_list]}
 
     @jwt_required() # Apply both decorators for admin action
     @jwt_required()
@@ -75,6 +76,35 @@ class QuizQuestionListAPI(Resource):
             return {'message': f'Error creating question/options'}, 500
 
 
+    @jwt_required()
+    @admin_required_api
+    @swag_from({
+        'tags': ['Questions'], 'summary': "Replace all of a quiz's questions in one request",
+        'parameters': [
+            {'name': 'quiz_id', 'in': 'path', 'type': 'integer', 'required': True},
+            {'name': 'force', 'in': 'query', 'type': 'boolean', 'required': False,
+             'description': 'Replace even while attempts are in progress (their answers stop matching)'},
+            {'name': 'body', 'in': 'body', 'required': True, 'schema': {
+                'type': 'object', 'properties': {'questions': QUIZ_DOCUMENT_SCHEMA['properties']['questions']}}}
+        ],
+        'responses': { 200: {'description': 'Questions replaced'}, 400: {}, 404: {}, 409: {'description': 'Attempts in progress'}, 500: {} }
+    })
+    def put(self, quiz_id):
+        quiz = Quiz.query.get_or_404(quiz_id, description='Quiz not found')
+        data = request.get_json(silent=True) or {}
+        in_progress = attempts_in_progress(quiz)
+        if in_progress and request.args.get('force', '').lower() not in ('1', 'true', 'yes'):
+            return {'message': f'{in_progress} attempt(s) of this quiz are in progress; retry with ?force=true to replace anyway'}, 409
+        try:
+            replace_questions(quiz.id, data.get('questions'))
+        except InvalidDocument as e:
+            return {'message': 'Invalid questions', 'errors': e.errors}, 400
+        except Exception as e:
+            print(f"Error replacing questions: {e}")
+            return {'message': 'Error replacing questions'}, 500
+        quiz = load_quiz_content(quiz_id)
+        return {'questions': [serialize_question(q) for q in quiz.question_list]}, 200
+
 class QuestionDetailAPI(Resource):
      method_decorators = {
         'get': [jwt_required()], # Any logged-in user can view a question?
@@ -87,10 +117,9 @@ class QuestionDetailAPI(Resource):
         'parameters': [{'name': 'question_id', 'in': 'path', 'type': 'integer', 'required': True}],
         'responses': { 200: {'description': 'Question details', 'schema': {'$ref': '#/definitions/QuestionWithOptions'}}, 404: {} }
      })
+     @query_budget(3) # identity, question, options
      def get(self, question_id):
-         question = Question.query.get_or_404(question_id)
-         options = [{'id': o.id, 'text': o.text, 'is_correct': o.is_correct} for o in question.options.order_by(Option.id).all()]
-         return {'id': question.id, 'text': question.text, 'quiz_id': question.quiz_id, 'options': options}
+         return serialize_question(load_question(question_id))
 
      @swag_from({
         'tags': ['Questions'], 'summary': 'Update an existing question and its options',
@@ -101,8 +130,8 @@ class QuestionDetailAPI(Resource):
         'responses': { 200: {'description': 'Question updated', 'schema': {'$ref': '#/definitions/QuestionWithOptions'}}, 400: {}, 404: {}, 500: {} }
      })
      def put(self, question_id):
-        question = Question.query.get_or_404(question_id)
-        options = question.options.order_by(Option.id).all()
+        question = load_question(question_id)
+        options = question.option_list
         if len(options) != 4: return {'message': 'Question data inconsistent (not 4 options)'}, 500
 
         parser = reqparse.RequestParser()
@@ -122,6 +151,7 @@ class QuestionDetailAPI(Resource):
                 options[i].text = option_text
                 options[i].is_correct = (i + 1 == correct_index)
             db.session.commit()
+            forget_analysis(question.quiz_id) # A changed key changes the item statistics
             final_options = [{'id': o.id, 'text': o.text, 'is_correct': o.is_correct} for o in options]
             return { 'id': question.id, 'text': question.text, 'quiz_id': question.quiz_id, 'options': final_options }, 200
         except Exception as e:
@@ -136,8 +166,10 @@ class QuestionDetailAPI(Resource):
      def delete(self, question_id):
         question = Question.query.get_or_404(question_id)
         try:
+            quiz_id = question.quiz_id
             db.session.delete(question)
             db.session.commit()
+            forget_analysis(quiz_id) # Its stored answers went with it
             return {'message': 'Question deleted successfully'}, 200
         except Exception as e:
             db.session.rollback(); print(f"Error deleting question: {e}")
@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify
-from flask_restful import Api, Resource, reqparse
-from flasgger import swag_from
+from flask_restful import Resource, reqparse
+from core.restful import Api
+from core.apidocs import swag_from
+from core.cloning import clone_or_enqueue
+from core.deletion import delete_or_enqueue
 from core.extensions import db
 from core.models import Quiz, Chapter, Subject 
+from core.quiz_authoring import QUIZ_DOCUMENT_SCHEMA, InvalidDocument, create_quiz
+from core.serializers import joined_quiz_context_options, load_quiz_content, quiz_context_options, serialize_question
 from .decorators import admin_required_api
 from datetime import datetime 
 from flask_jwt_extended import jwt_required
@@ -31,13 +36,14 @@ class QuizListAPI(Resource):
             query = query.filter_by(chapter_id=chapter_id)
 
         # Join to get related names for response clarity
-        quizzes = query.join(Chapter).join(Subject).order_by(Subject.name, Chapter.name, Quiz.title).all()
+        quizzes = query.join(Chapter).join(Subject).options(joined_quiz_context_options())\
+                       .order_by(Subject.name, Chapter.name, Quiz.title).all()
         result = [{
             'id': q.id, 'title': q.title, 'chapter_id': q.chapter_id,
             'chapter_name': q.chapter.name, # Added for context
             'subject_name': q.chapter.subject.name, # Added for context
             'duration_minutes': q.duration_minutes,
-            'scheduled_date': q.scheduled_date.isoformat() if hasattr(q, 'scheduled_date') and q.scheduled_date else None, # Check attribute exists
+            'scheduled_date': q.scheduled_date,
             'is_active': q.is_active
         } for q in quizzes]
         return jsonify({'quizzes': result})
@@ -59,7 +65,8 @@ class QuizListAPI(Resource):
         parser.add_argument('is_active', type=bool, default=True)
         data = parser.parse_args()
 
-        if not Chapter.query.get(data['chapter_id']):
+        chapter = Chapter.query.get(data['chapter_id'])
+        if not chapter:
              return {'message': f'Chapter with id {data["chapter_id"]} not found'}, 404
 
         parsed_scheduled_date = parse_datetime(data.get('scheduled_date'))
@@ -67,6 +74,7 @@ class QuizListAPI(Resource):
         quiz = Quiz(
             title=data['title'],
             chapter_id=data['chapter_id'],
+            subject_id=chapter.subject_id,
             duration_minutes=data['duration_minutes'],
             scheduled_date=parsed_scheduled_date, # Use parsed date
             is_active=data['is_active']
@@ -80,13 +88,37 @@ class QuizListAPI(Resource):
                  'chapter_name': quiz.chapter.name, # Add related names
                  'subject_name': quiz.chapter.subject.name, # Add related names
                  'duration_minutes': quiz.duration_minutes,
-                 'scheduled_date': quiz.scheduled_date.isoformat() if quiz.scheduled_date else None,
+                 'scheduled_date': quiz.scheduled_date,
                  'is_active': quiz.is_active
             }, 201
         except Exception as e:
             db.session.rollback(); print(f"Error creating quiz: {e}")
             return {'message': f'Error creating quiz'}, 500
 
+class QuizBulkAPI(Resource):
+    method_decorators = [admin_required_api, jwt_required()]
+
+    @swag_from({
+        'tags': ['Quizzes'], 'summary': 'Create a quiz with all its questions in one request',
+        'parameters': [{'name': 'body', 'in': 'body', 'required': True, 'schema': QUIZ_DOCUMENT_SCHEMA}],
+        'responses': { 201: {'description': 'Quiz and questions created'}, 400: {'description': 'Every validation error in the document'}, 500: {} }
+    })
+    def post(self):
+        try:
+            quiz_id = create_quiz(request.get_json(silent=True))
+        except InvalidDocument as e:
+            return {'message': 'Invalid quiz document', 'errors': e.errors}, 400
+        except Exception as e:
+            print(f"Error creating quiz in bulk: {e}")
+            return {'message': 'Error creating quiz'}, 500
+        quiz = load_quiz_content(quiz_id)
+        return {
+            'id': quiz.id, 'title': quiz.title, 'chapter_id': quiz.chapter_id,
+            'duration_minutes': quiz.duration_minutes, 'scheduled_date': quiz.scheduled_date,
+            'is_active': quiz.is_active,
+            'questions': [serialize_question(q) for q in quiz.question_list]
+        }, 201
+
 class QuizDetailAPI(Resource):
     method_decorators = {
         'get': [jwt_required()],
@@ -100,13 +132,13 @@ class QuizDetailAPI(Resource):
         'responses': { 200: {'description': 'Quiz details', 'schema': {'$ref': '#/definitions/Quiz'}}, 404: {} }
     })
     def get(self, quiz_id):
-        quiz = Quiz.query.get_or_404(quiz_id)
+        quiz = Quiz.query.options(quiz_context_options()).filter_by(id=quiz_id).first_or_404()
         return jsonify({
             'id': quiz.id, 'title': quiz.title, 'chapter_id': quiz.chapter_id,
             'chapter_name': quiz.chapter.name, # Add related names
             'subject_name': quiz.chapter.subject.name, # Add related names
             'duration_minutes': quiz.duration_minutes,
-            'scheduled_date': quiz.scheduled_date.isoformat() if hasattr(quiz, 'scheduled_date') and quiz.scheduled_date else None,
+            'scheduled_date': quiz.scheduled_date,
             'is_active': quiz.is_active
         })
 
@@ -129,9 +161,11 @@ class QuizDetailAPI(Resource):
         data = parser.parse_args()
 
         if data['title'] is not None: quiz.title = data['title']
-        if data['chapter_id'] is not None:
-            if not Chapter.query.get(data['chapter_id']): return {'message': f'Chapter with id {data["chapter_id"]} not found'}, 404
-            quiz.chapter_id = data['chapter_id']
+        if data['chapter_id'] is not None and data['chapter_id'] != quiz.chapter_id:
+            chapter = Chapter.query.get(data['chapter_id'])
+            if not chapter: return {'message': f'Chapter with id {data["chapter_id"]} not found'}, 404
+            # The quiz's attempts follow it to the new chapter/subject on flush (see the events in core/models.py)
+            quiz.chapter_id, quiz.subject_id = chapter.id, chapter.subject_id
         if data['duration_minutes'] is not None: quiz.duration_minutes = data['duration_minutes']
         # Handle date parsing for update
         if 'scheduled_date' in data: # Check if key exists, even if None
@@ -145,7 +179,7 @@ class QuizDetailAPI(Resource):
                  'id': quiz.id, 'title': quiz.title, 'chapter_id': quiz.chapter_id,
                  'chapter_name': quiz.chapter.name, 'subject_name': quiz.chapter.subject.name,
                  'duration_minutes': quiz.duration_minutes,
-                 'scheduled_date': quiz.scheduled_date.isoformat() if quiz.scheduled_date else None,
+                 'scheduled_date': quiz.scheduled_date,
                  'is_active': quiz.is_active
             }, 200
         except Exception as e:
@@ -158,15 +192,46 @@ class QuizDetailAPI(Resource):
         'responses': { 200: {'description': 'Quiz deleted'}, 404: {}, 500: {} }
     })
     def delete(self, quiz_id):
-        quiz = Quiz.query.get_or_404(quiz_id)
+        Quiz.query.get_or_404(quiz_id)
         try:
-            db.session.delete(quiz)
-            db.session.commit()
-            return {'message': 'Quiz deleted successfully'}, 200
+            body, status = delete_or_enqueue('quiz', quiz_id)
+            if status == 202:
+                return {'message': 'Quiz is being deleted in the background', **body}, status
+            return {'message': 'Quiz deleted successfully', **body}, status
         except Exception as e:
             db.session.rollback(); print(f"Error deleting quiz: {e}")
             return {'message': f'Error deleting quiz'}, 500
 
+class QuizCloneAPI(Resource):
+    method_decorators = [admin_required_api, jwt_required()]
+
+    @swag_from({
+        'tags': ['Quizzes'], 'summary': 'Copy a quiz with its questions and options',
+        'parameters': [
+            {'name': 'quiz_id', 'in': 'path', 'type': 'integer', 'required': True},
+            {'name': 'body', 'in': 'body', 'required': False, 'schema': {'type': 'object', 'properties': {
+                'chapter_id': {'type': 'integer', 'description': 'Chapter to copy into (default: the same one)'},
+                'title': {'type': 'string', 'description': "Copy's title (default: the same one)"}}}}
+        ],
+        'responses': { 201: {'description': 'Quiz copied'}, 202: {'description': 'Copying in the background'}, 404: {}, 500: {} }
+    })
+    def post(self, quiz_id):
+        Quiz.query.get_or_404(quiz_id)
+        data = request.get_json(silent=True) or {}
+        chapter_id = data.get('chapter_id')
+        if chapter_id is not None and not db.session.get(Chapter, chapter_id):
+            return {'message': f'Chapter with id {chapter_id} not found'}, 404
+        try:
+            body, status = clone_or_enqueue('quiz', quiz_id, name=data.get('title'), parent_id=chapter_id)
+        except Exception as e:
+            db.session.rollback(); print(f"Error cloning quiz: {e}")
+            return {'message': 'Error cloning quiz'}, 500
+        if status == 202:
+            return {'message': 'Quiz is being copied in the background', **body}, status
+        return {'message': 'Quiz copied successfully', **body}, status
+
 # --- Register Resources ---
 api.add_resource(QuizListAPI, '/')
-api.add_resource(QuizDetailAPI, '/<int:quiz_id>')
\ No newline at end of file
+api.add_resource(QuizBulkAPI, '/bulk')
+api.add_resource(QuizDetailAPI, '/<int:quiz_id>')
+api.add_resource(QuizCloneAPI, '/<int:quiz_id>/clone')
\ No newline at end of file
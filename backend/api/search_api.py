@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy import or_
 from core.models import User, Subject, Quiz, Chapter # Import your models
+from core.serializers import joined_quiz_context_options
 from .decorators import admin_required_api # Assuming you have this decorator
 from flask_jwt_extended import jwt_required
 
@@ -39,6 +40,7 @@ def perform_search():
     # Search Quizzes by title, joining to get context
     quizzes_found = Quiz.query.filter(Quiz.title.ilike(search_pattern))\
                               .join(Chapter).join(Subject)\
+                              .options(joined_quiz_context_options())\
                               .limit(20).all()
 
     # --- Serialize Results for JSON Response ---
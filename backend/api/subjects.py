@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_restful import Api, Resource, reqparse
-from flasgger import swag_from
+from flask_restful import Resource, reqparse
+from core.restful import Api
+from core.apidocs import swag_from
+from core.cloning import clone_or_enqueue
+from core.deletion import delete_or_enqueue
 from core.extensions import db, cache
 from core.models import Subject
 from .decorators import admin_required_api
@@ -18,6 +21,11 @@ api = Api(subjects_api_bp)
 CACHE_KEY_ALL_SUBJECTS = 'all_subjects_list'
 CACHE_KEY_SUBJECT_DETAIL_PREFIX = 'subject_detail_' # Will be suffixed with subject_id
 
+
+def invalidate_subject_caches(subject_id):
+    cache.delete(f'{CACHE_KEY_SUBJECT_DETAIL_PREFIX}{subject_id}')
+    cache.delete(CACHE_KEY_ALL_SUBJECTS)
+
 class SubjectListAPI(Resource):
     method_decorators = {'get': [jwt_required()], 'post': [admin_required_api, jwt_required()]}
 
@@ -141,20 +149,55 @@ class SubjectDetailAPI(Resource):
          'responses': { 200: {'description': 'Subject deleted'}, 404: {}, 500: {} }
      })
      def delete(self, subject_id):
-        subject = Subject.query.get_or_404(subject_id)
+        Subject.query.get_or_404(subject_id)
         try:
-            db.session.delete(subject)
-            db.session.commit()
+            body, status = delete_or_enqueue('subject', subject_id)
             # Invalidate specific subject detail cache and all subjects list cache
-            cache.delete(f'{CACHE_KEY_SUBJECT_DETAIL_PREFIX}{subject_id}')
-            cache.delete(CACHE_KEY_ALL_SUBJECTS)
+            invalidate_subject_caches(subject_id)
+            if status == 202:
+                logger.info(f"Subject {subject_id} queued for deletion (task {body['task_id']}).")
+                return {'message': 'Subject is being deleted in the background', **body}, status
             logger.info(f"Subject {subject_id} deleted. Relevant caches invalidated.")
-            return {'message': 'Subject deleted successfully'}, 200
+            return {'message': 'Subject deleted successfully', **body}, status
         except Exception as e:
             db.session.rollback()
             logger.error(f"Error deleting subject: {e}")
             return {'message': 'Error deleting subject'}, 500
 
+class SubjectCloneAPI(Resource):
+    method_decorators = [admin_required_api, jwt_required()]
+
+    @swag_from({
+        'tags': ['Subjects'], 'summary': 'Copy a subject with all its chapters, quizzes, questions and options',
+        'parameters': [
+            {'name': 'subject_id', 'in': 'path', 'type': 'integer', 'required': True},
+            {'name': 'body', 'in': 'body', 'required': True, 'schema': {'type': 'object', 'required': ['name'],
+                                                                        'properties': {'name': {'type': 'string'}}}}
+        ],
+        'responses': { 201: {'description': 'Subject copied'}, 202: {'description': 'Copying in the background'}, 400: {}, 404: {}, 500: {} }
+    })
+    def post(self, subject_id):
+        Subject.query.get_or_404(subject_id)
+        parser = reqparse.RequestParser()
+        parser.add_argument('name', type=str, required=True, help='Name is required')
+        data = parser.parse_args()
+
+        if Subject.query.filter_by(name=data['name']).first():
+            return {'message': 'Subject name already exists'}, 400
+        try:
+            body, status = clone_or_enqueue('subject', subject_id, name=data['name'])
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error cloning subject: {e}")
+            return {'message': 'Error cloning subject'}, 500
+        if status == 202:
+            logger.info(f"Subject {subject_id} queued for cloning (task {body['task_id']}).")
+            return {'message': 'Subject is being copied in the background', **body}, status
+        cache.delete(CACHE_KEY_ALL_SUBJECTS)
+        logger.info(f"Subject {subject_id} cloned as {body['id']}. All subjects cache invalidated.")
+        return {'message': 'Subject copied successfully', **body}, status
+
 # --- Register Resources ---
 api.add_resource(SubjectListAPI, '/')
-api.add_resource(SubjectDetailAPI, '/<int:subject_id>')
\ No newline at end of file
+api.add_resource(SubjectDetailAPI, '/<int:subject_id>')
+api.add_resource(SubjectCloneAPI, '/<int:subject_id>/clone')
\ No newline at end of file
@@ -1,11 +1,18 @@
 # api/summary_api.py
-from flask import Blueprint, jsonify
-from flask_restful import Api, Resource
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, current_app, jsonify, request
+from flask_restful import Resource
+from core.restful import Api
 from core.extensions import db
-from core.models import Subject, Chapter, Quiz, Question, User, QuizAttempt
+from core.models import Subject, Chapter, Quiz, Question, User
+from core.routing import read_only
+from core.activity import series, watermark
+from core.archive import subject_attempt_stats
+from core.serializers import quiz_context, quiz_context_options
 from .decorators import admin_required_api
 from sqlalchemy import func
 from flask_jwt_extended import jwt_required 
+from utils import parse_datetime
 
 # Define the Blueprint
 summary_api_bp = Blueprint('summary_api', __name__)
@@ -14,37 +21,27 @@ api = Api(summary_api_bp)
 class AdminSummaryAPI(Resource):
     @jwt_required()
     @admin_required_api
-   
+    @read_only()
     def get(self):
         """
         Gathers all data points for the admin summary dashboard.
         """
         try:
             # --- Chart Data ---
-            top_scores_query = db.session.query(
-                Subject.name,
-                func.max(QuizAttempt.score).label('top_score')
-            ).join(Chapter, Subject.id == Chapter.subject_id)\
-             .join(Quiz, Chapter.id == Quiz.chapter_id)\
-             .join(QuizAttempt, Quiz.id == QuizAttempt.quiz_id)\
-             .group_by(Subject.name)\
-             .order_by(func.max(QuizAttempt.score).desc()).all()
-
-            attempts_query = db.session.query(
-                Subject.name,
-                func.count(QuizAttempt.id).label('attempt_count')
-            ).join(Chapter, Subject.id == Chapter.subject_id)\
-             .join(Quiz, Chapter.id == Quiz.chapter_id)\
-             .join(QuizAttempt, Quiz.id == QuizAttempt.quiz_id)\
-             .group_by(Subject.name)\
-             .order_by(func.count(QuizAttempt.id).desc()).all()
+            # Subject aggregates read quiz_attempt.subject_id / quiz.subject_id through covering
+            # indexes plus the archive rollups; subject is only joined (by primary key) for the labels.
+            stats = subject_attempt_stats()
+            subject_stats = db.session.query(
+                Subject.name, stats.c.top_score, stats.c.attempt_count
+            ).join(stats, stats.c.subject_id == Subject.id).all()
+            top_scores_query = sorted(subject_stats, key=lambda r: r.top_score, reverse=True)
+            attempts_query = sorted(subject_stats, key=lambda r: r.attempt_count, reverse=True)
 
             quiz_count_query = db.session.query(
                 Subject.name,
                 func.count(Quiz.id).label('quiz_count')
-            ).join(Chapter, Subject.id == Chapter.subject_id)\
-             .join(Quiz, Chapter.id == Quiz.chapter_id)\
-             .group_by(Subject.name)\
+            ).join(Quiz, Quiz.subject_id == Subject.id)\
+             .group_by(Subject.id, Subject.name)\
              .order_by(func.count(Quiz.id).desc()).all()
 
             chart_data = {
@@ -54,25 +51,21 @@ class AdminSummaryAPI(Resource):
             }
 
             # --- Table Data ---
+            # Counter cache over live and archived attempts; walks ix_user_attempt_count
             user_activity_query = db.session.query(
-                User.id, User.username, User.email,
-                func.count(QuizAttempt.id).label('attempt_count')
-            ).outerjoin(QuizAttempt, User.id == QuizAttempt.user_id)\
-             .group_by(User.id, User.username, User.email)\
-             .order_by(func.count(QuizAttempt.id).desc()).all()
+                User.id, User.username, User.email, User.attempt_count
+            ).order_by(User.attempt_count.desc()).all()
             
             user_activity = [
                 {'id': u.id, 'username': u.username, 'email': u.email, 'attempt_count': u.attempt_count}
                 for u in user_activity_query
             ]
 
-            quizzes_no_questions_query = db.session.query(Quiz)\
-                .outerjoin(Question, Quiz.id == Question.quiz_id)\
-                .group_by(Quiz.id)\
-                .having(func.count(Question.id) == 0).all()
+            quizzes_no_questions_query = Quiz.query.options(quiz_context_options())\
+                .filter(Quiz.question_count == 0).all()
             
             quizzes_no_questions = [
-                {'id': q.id, 'title': q.title, 'chapter_name': q.chapter.name, 'subject_name': q.chapter.subject.name}
+                {'id': q.id, 'title': q.title, **quiz_context(q)}
                 for q in quizzes_no_questions_query
             ]
 
@@ -96,4 +89,44 @@ class AdminSummaryAPI(Resource):
             print(f"Error in AdminSummaryAPI: {e}")
             return {"message": "An internal error occurred"}, 500
 
-api.add_resource(AdminSummaryAPI, '/')
\ No newline at end of file
+class ActivityTrendAPI(Resource):
+    @jwt_required()
+    @admin_required_api
+    @read_only()
+    def get(self):
+        """
+        Attempts per subject and active users over time, for the trend charts.
+        ?start=&end= (ISO dates or datetimes, UTC; default the last 30 days),
+        ?subject_id= (repeatable) and ?max_points=. Served from the rollups
+        (core/activity.py), so long ranges come back as weeks or months.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        start_arg, end_arg = request.args.get('start'), request.args.get('end')
+        start = parse_datetime(start_arg) if start_arg else now - timedelta(days=30)
+        end = parse_datetime(end_arg) if end_arg else now
+        if start is None or end is None:
+            return {"message": "start and end must be ISO dates or datetimes"}, 400
+        start, end = (d.astimezone(timezone.utc).replace(tzinfo=None) if d.tzinfo else d for d in (start, end))
+        if end_arg and len(end_arg) == 10: # A bare date includes the whole day
+            end += timedelta(days=1, microseconds=-1)
+        if start > end:
+            return {"message": "start must not be after end"}, 400
+        ceiling = current_app.config.get('ACTIVITY_MAX_POINTS', 400)
+        max_points = min(max(request.args.get('max_points', ceiling, type=int), 10), ceiling)
+        subject_ids = request.args.getlist('subject_id', type=int) or None
+
+        try:
+            data = series(start, end, subject_ids, max_points)
+            names = dict(db.session.query(Subject.id, Subject.name).filter(Subject.id.in_(data['subjects']))) \
+                if data['subjects'] else {}
+            data['subjects'] = [{'id': subject_id, 'name': names.get(subject_id), 'attempts': counts}
+                                for subject_id, counts in sorted(data['subjects'].items())]
+            through = watermark()
+            data['through'] = through.isoformat() if through else None
+            return jsonify(data)
+        except Exception as e:
+            print(f"Error in ActivityTrendAPI: {e}")
+            return {"message": "An internal error occurred"}, 500
+
+api.add_resource(AdminSummaryAPI, '/')
+api.add_resource(ActivityTrendAPI, '/activity')
\ No newline at end of file
@@ -1,11 +1,19 @@
 # api/user_api.py
 from flask import Blueprint, jsonify, request
-from flask_restful import Api, Resource
+from flask_restful import Resource
+from core.restful import Api
 from core.extensions import db, csrf
-from core.models import Subject, Chapter, Quiz, Question, Option, QuizAttempt, User
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func
+from core.models import AttemptAnswer, Subject, Quiz, Option, QuizAttempt, User
+from core.routing import read_only
+from flask_jwt_extended import jwt_required, current_user as jwt_current_user
+from core.archive import user_quiz_best, user_subject_stats
+from core.histograms import describe, load_histograms, quiz_distribution
+from core.instrumentation import query_budget
+from core.leaderboards import KINDS, record_attempt, standing, top
+from core.serializers import (answer_sheet, attempt_context_options, load_attempt_content,
+                              load_catalog, serialize_question)
 from datetime import datetime, timezone
+from sqlalchemy import insert
 
 user_api_bp = Blueprint('user_api', __name__)
 api = Api(user_api_bp)
@@ -14,22 +22,21 @@ class UserDashboardDataAPI(Resource):
 
     @jwt_required()
     def get(self):
-        user_identity = get_jwt_identity()
-        user = User.query.filter_by(fs_uniquifier=user_identity).first()
-        if not user: return {"message": "User not found"}, 404
+        user = jwt_current_user
         user_attempts = QuizAttempt.query.filter_by(user_id=user.id).all()
         high_scores = {}
         for attempt in user_attempts:
             if attempt.quiz_id not in high_scores or attempt.score > high_scores[attempt.quiz_id]['score']:
                 high_scores[attempt.quiz_id] = {'score': attempt.score, 'total': attempt.total_questions}
-        all_subjects = Subject.query.order_by(Subject.name).all()
+        for quiz_id, best in user_quiz_best(user.id).items(): # Archived attempts
+            if quiz_id not in high_scores or best['score'] > high_scores[quiz_id]['score']:
+                high_scores[quiz_id] = best
         subjects_data = []
-        for subject in all_subjects:
+        for subject in load_catalog(active_only=True):
             chapters_data = []
-            for chapter in subject.chapters.order_by(Chapter.name).all():
-                active_quizzes = chapter.quizzes.filter_by(is_active=True).order_by(Quiz.title).all()
-                if active_quizzes:
-                    chapters_data.append({'id': chapter.id, 'name': chapter.name, 'quizzes': [{'id': q.id, 'title': q.title, 'duration_minutes': q.duration_minutes} for q in active_quizzes]})
+            for chapter in subject.chapter_list:
+                if chapter.quiz_list:
+                    chapters_data.append({'id': chapter.id, 'name': chapter.name, 'quizzes': [{'id': q.id, 'title': q.title, 'duration_minutes': q.duration_minutes} for q in chapter.quiz_list]})
             if chapters_data:
                 subjects_data.append({'id': subject.id, 'name': subject.name, 'description': subject.description, 'chapters': chapters_data})
         return jsonify({'subjects': subjects_data, 'high_scores': high_scores})
@@ -38,30 +45,27 @@ class StartQuizAPI(Resource):
     # ... (This class remains the same as before)
     method_decorators = [csrf.exempt, jwt_required()]
     def post(self, quiz_id):
-        user_identity = get_jwt_identity()
-        user = User.query.filter_by(fs_uniquifier=user_identity).first()
+        user = jwt_current_user
         quiz = Quiz.query.get_or_404(quiz_id)
         if not quiz.is_active: return {'message': 'This quiz is not currently active.'}, 403
-        question_count = quiz.questions.count()
+        question_count = quiz.question_count # Counter cache, no COUNT(*)
         if question_count == 0: return {'message': 'This quiz has no questions yet. Please check back later.'}, 400
-        new_attempt = QuizAttempt(user_id=user.id, quiz_id=quiz.id, score=0, total_questions=question_count)
+        new_attempt = QuizAttempt(user_id=user.id, quiz_id=quiz.id, chapter_id=quiz.chapter_id, subject_id=quiz.subject_id,
+                                  score=0, total_questions=question_count)
         db.session.add(new_attempt)
         db.session.commit()
         return jsonify({'attempt_id': new_attempt.id})
 
 class AttendQuizDataAPI(Resource):
     method_decorators = [csrf.exempt, jwt_required()]
+    @query_budget(4) # identity, attempt + quiz, questions, options
     def get(self, attempt_id):
-        user_identity = get_jwt_identity()
-        user = User.query.filter_by(fs_uniquifier=user_identity).first()
-        attempt = QuizAttempt.query.get_or_404(attempt_id)
+        user = jwt_current_user
+        attempt = load_attempt_content(attempt_id)
         if attempt.user_id != user.id: return {'message': 'You are not authorized to view this attempt.'}, 403
         if attempt.submitted_at is not None: return {'message': 'This quiz has already been submitted.'}, 400
         quiz = attempt.quiz
-        questions = []
-        for q in quiz.questions.order_by(Question.id).all():
-            options = [{'id': o.id, 'text': o.text} for o in q.options.order_by(Option.id).all()]
-            questions.append({'id': q.id, 'text': q.text, 'options': options})
+        questions = [serialize_question(q, include_answers=False) for q in quiz.question_list]
         time_remaining = None
         if attempt.start_time:
             start_time_utc = attempt.start_time.replace(tzinfo=timezone.utc)
@@ -70,34 +74,39 @@ class AttendQuizDataAPI(Resource):
             time_remaining = (quiz.duration_minutes * 60) - time_elapsed
         return jsonify({'attempt_id': attempt.id, 'quiz_title': quiz.title, 'duration_minutes': quiz.duration_minutes, 'time_remaining_seconds': time_remaining, 'questions': questions})
     
+    @query_budget(7) # identity, attempt, answer key, UPDATE, histogram upsert, answers INSERT, histogram read
     def post(self, attempt_id):
-        user_identity = get_jwt_identity()
-        user = User.query.filter_by(fs_uniquifier=user_identity).first()
+        user = jwt_current_user
         attempt = QuizAttempt.query.get_or_404(attempt_id)
         if attempt.user_id != user.id: return {'message': 'You are not authorized to submit this attempt.'}, 403
         if attempt.submitted_at is not None: return {'message': 'This quiz has already been submitted.'}, 400
         data = request.get_json()
         user_answers = data.get('answers', {})
         score = 0
-        correct_answers = {}
-        for question in attempt.quiz.questions:
-            correct_option = question.get_correct_option()
-            if correct_option:
-                correct_answers[question.id] = correct_option.id
-                user_option_id = user_answers.get(str(question.id))
-                if user_option_id and int(user_option_id) == correct_option.id: score += 1
+        correct_answers, question_options = answer_sheet(attempt.quiz_id) # The whole answer key in one query
+        answers = [] # One attempt_answer row per question, for item analysis
+        for question_id, option_id in correct_answers.items():
+            user_option_id = user_answers.get(str(question_id))
+            if user_option_id and int(user_option_id) == option_id: score += 1
+            chosen = int(user_option_id) if user_option_id else None
+            answers.append({'attempt_id': attempt.id, 'question_id': question_id, 'quiz_id': attempt.quiz_id,
+                            'option_id': chosen if chosen in question_options[question_id] else None,
+                            'is_correct': chosen == option_id})
         attempt.score = score
         attempt.submitted_at = datetime.now(timezone.utc)
+        if answers:
+            db.session.execute(insert(AttemptAnswer.__table__), answers) # One executemany; the ORM bulk path would split on NULLs
         db.session.commit()
-        return jsonify({'message': 'Quiz submitted successfully!', 'score': attempt.score, 'total_questions': attempt.total_questions, 'percentage': attempt.percentage_score, 'correct_answers': correct_answers})
+        leaderboard = record_attempt(attempt) # Rank on the quiz and its subject, None if the boards are down
+        distribution = quiz_distribution(attempt.quiz_id, attempt.score, attempt.total_questions) # Includes this attempt
+        return jsonify({'message': 'Quiz submitted successfully!', 'score': attempt.score, 'total_questions': attempt.total_questions, 'percentage': attempt.percentage_score, 'correct_answers': correct_answers, 'leaderboard': leaderboard, 'distribution': distribution})
 
 class CheckAnswerAPI(Resource):
     method_decorators = [csrf.exempt, jwt_required()]
 
     def post(self, attempt_id):
         attempt = QuizAttempt.query.get_or_404(attempt_id)
-        user_identity = get_jwt_identity()
-        user = User.query.filter_by(fs_uniquifier=user_identity).first()
+        user = jwt_current_user
 
         if attempt.user_id != user.id:
             return {'message': 'Forbidden'}, 403
@@ -122,17 +131,32 @@ class CheckAnswerAPI(Resource):
             'correct_option_id': correct_option.id
         })
 
+class LeaderboardAPI(Resource):
+    method_decorators = [jwt_required()]
+    @query_budget(3) # identity, quiz/subject, usernames
+    def get(self, kind, obj_id):
+        if kind not in KINDS: return {'message': 'Unknown leaderboard.'}, 404
+        target = db.get_or_404(Quiz if kind == 'quiz' else Subject, obj_id)
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        try:
+            entries, me = top(kind, obj_id, limit), standing(kind, obj_id, jwt_current_user.id)
+        except Exception as e:
+            print(f"Error reading leaderboard {kind} {obj_id}: {e}")
+            return {'message': 'Leaderboards are unavailable right now.'}, 503
+        names = dict(db.session.query(User.id, User.username).filter(User.id.in_([e['user_id'] for e in entries])).all())
+        entries = [dict(e, username=names[e['user_id']]) for e in entries if e['user_id'] in names] # Deleted users wait for a rebuild
+        return jsonify({'kind': kind, 'id': obj_id, 'name': target.title if kind == 'quiz' else target.name,
+                        'players': me['of'], 'top': entries, 'me': me})
+
 class UserSummaryDataAPI(Resource):
     @jwt_required()
+    @read_only(max_staleness=1) # Users usually land here right after submitting
     def get(self):
-        user_identity = get_jwt_identity()
-        user = User.query.filter_by(fs_uniquifier=user_identity).first()
-        if not user:
-            return {"message": "User not found"}, 404
+        user = jwt_current_user
         
         # 1. Fetch user's past attempts (no change here)
-        attempts = QuizAttempt.query.filter_by(user_id=user.id)\
-                                    .join(Quiz)\
+        attempts = QuizAttempt.query.options(attempt_context_options())\
+                                    .filter_by(user_id=user.id)\
                                     .order_by(QuizAttempt.submitted_at.desc()).all()
         
         def format_timedelta(td):
@@ -140,57 +164,52 @@ class UserSummaryDataAPI(Resource):
             minutes, seconds = divmod(td.total_seconds(), 60)
             return f"{int(minutes)}m {int(seconds)}s"
 
+        # Everyone's scores on the quizzes this user took, from the histograms (no attempt scans)
+        histograms = load_histograms({a.quiz_id for a in attempts})
+
         attempts_data = [
             {
+                'quiz_id': a.quiz_id,
                 'quiz_title': a.quiz.title,
                 'subject_name': a.quiz.chapter.subject.name,
                 'score': a.score,
                 'total_questions': a.total_questions,
                 'percentage_score': a.percentage_score,
                 'submitted_at': a.submitted_at.strftime('%Y-%m-%d %H:%M') if a.submitted_at else 'Incomplete',
-                'time_taken': format_timedelta(a.time_taken)
+                'time_taken': format_timedelta(a.time_taken),
+                'percentile_rank': describe(histograms.get(a.quiz_id), a.score, a.total_questions)['percentile_rank'] if a.submitted_at else None
             } for a in attempts
         ]
 
         
         # Chart 1: Highest Percentage Score per Subject
-        # calculate the percentage for each attempt and find the maximum.
-        top_scores_query = db.session.query(
-            Subject.name,
-            func.max(QuizAttempt.score * 100.0 / QuizAttempt.total_questions).label('max_percentage')
-        ).select_from(QuizAttempt)\
-         .join(Quiz).join(Chapter).join(Subject)\
-         .filter(QuizAttempt.user_id == user.id, QuizAttempt.total_questions > 0)\
-         .group_by(Subject.name).all()
-
-        # Chart 2: Average Percentage Score per Subject
-        # calculate the sum of scores and totals to get an accurate overall average.
-        attempts_by_subject_query = db.session.query(
-            Subject.name,
-            (func.sum(QuizAttempt.score) * 100.0 / func.sum(QuizAttempt.total_questions)).label('avg_percentage')
-        ).select_from(QuizAttempt)\
-         .join(Quiz).join(Chapter).join(Subject)\
-         .filter(QuizAttempt.user_id == user.id, QuizAttempt.total_questions > 0)\
-         .group_by(Subject.name).all()
-        
+        # Chart 2: Average Percentage Score per Subject, from the sums of scores and totals
+        # Both come from one pass over the user's attempts (live and archived rollups).
+        stats = user_subject_stats(user.id)
+        subject_stats = db.session.query(
+            Subject.name, stats.c.max_percentage, stats.c.score_sum, stats.c.total_sum
+        ).join(stats, stats.c.subject_id == Subject.id).all()
+
         # Format the data for the frontend
         chart_data = {
             'top_scores': {
-                'labels': [r.name for r in top_scores_query], 
-                'data': [round(r.max_percentage, 1) for r in top_scores_query] # Round to 1 decimal place
+                'labels': [r.name for r in subject_stats],
+                'data': [round(r.max_percentage, 1) for r in subject_stats] # Round to 1 decimal place
             },
             'attempts': {
-                'labels': [r.name for r in attempts_by_subject_query], 
-                'data': [round(r.avg_percentage, 1) for r in attempts_by_subject_query] # Round to 1 decimal place
+                'labels': [r.name for r in subject_stats],
+                'data': [round(r.score_sum * 100.0 / r.total_sum, 1) for r in subject_stats]
             }
         }
 
         return jsonify({
             'attempts': attempts_data,
+            'quiz_distributions': {quiz_id: describe(h) for quiz_id, h in histograms.items()},
             'chart_data': chart_data
         })
 api.add_resource(UserDashboardDataAPI, '/dashboard-data')
 api.add_resource(StartQuizAPI, '/quizzes/<int:quiz_id>/start')
 api.add_resource(AttendQuizDataAPI, '/attempts/<int:attempt_id>')
 api.add_resource(CheckAnswerAPI, '/attempts/<int:attempt_id>/check')
+api.add_resource(LeaderboardAPI, '/leaderboards/<string:kind>/<int:obj_id>')
 api.add_resource(UserSummaryDataAPI, '/summary-data')
\ No newline at end of file
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
-from flask_restful import Api, Resource, reqparse
-from flasgger import swag_from
+from flask_restful import Resource, reqparse
+from flask_jwt_extended import jwt_required
+from core.restful import Api
+from core.apidocs import swag_from
+from core.deletion import delete_or_enqueue
 from core.extensions import db
 from core.models import User, Role
+from core.identity import invalidate_identity
 from .decorators import admin_required_api # Only admin manages users via API?
 from werkzeug.security import generate_password_hash
 
@@ -41,7 +45,7 @@ definitions = {
       }
 
 class UserListAPI(Resource):
-    decorators = [admin_required_api] # Only admin can list/create users via API?
+    decorators = [admin_required_api, jwt_required()] # Only admin can list/create users via API
     @swag_from({
         'tags': ['Users'], 'summary': 'List all users (Admin only)',
         'responses': {200: {'description': 'List of users'}} # Add schema
@@ -49,7 +53,7 @@ class UserListAPI(Resource):
     def get(self):
         users = User.query.all()
         result = [{'id': u.id, 'username': u.username, 'email': u.email, 'active': u.active,
-                   'created_at': u.created_at.isoformat()} for u in users]
+                   'created_at': u.created_at} for u in users]
         return jsonify({'users': result})
 
     # Be careful with creating users via API vs web registration
@@ -87,7 +91,7 @@ class UserListAPI(Resource):
 
 
 class UserDetailAPI(Resource):
-    decorators = [admin_required_api] # Only admin can manage users via API?
+    decorators = [admin_required_api, jwt_required()] # Only admin can manage users via API
     @swag_from({
         'tags': ['Users'], 'summary': 'Get details of a specific user (Admin only)',
         'parameters': [{'name': 'user_id', 'in': 'path', 'type': 'integer', 'required': True}],
@@ -98,7 +102,7 @@ class UserDetailAPI(Resource):
         roles = [role.name for role in user.roles]
         return jsonify({
             'id': user.id, 'username': user.username, 'email': user.email, 'active': user.active,
-            'created_at': user.created_at.isoformat(), 'roles': roles
+            'created_at': user.created_at, 'roles': roles
         })
 
     @swag_from({
@@ -131,6 +135,7 @@ class UserDetailAPI(Resource):
 
         try:
             db.session.commit()
+            invalidate_identity(user.fs_uniquifier)
             return {'message': 'User updated', 'user': {'id': user.id, 'username': user.username}}, 200
         except Exception as e:
             db.session.rollback()
@@ -145,11 +150,18 @@ class UserDetailAPI(Resource):
         user = User.query.get_or_404(user_id, description='User not found')
         # Prevent admin from deleting themselves? Or last admin? Add checks if needed.
         try:
-            db.session.delete(user)
-            db.session.commit()
-            return {'message': 'User deleted successfully'}, 200
+            fs_uniquifier = user.fs_uniquifier
+            body, status = delete_or_enqueue('user', user_id) # Attempts, archive and rollups in bulk
+            invalidate_identity(fs_uniquifier)
+            if status == 202:
+                return {'message': 'User is being deleted in the background', **body}, status
+            return {'message': 'User deleted successfully', **body}, status
         except Exception as e:
             db.session.rollback()
             return {'message': f'Error deleting user: {e}'}, 500
-        
+
+
+api.add_resource(UserListAPI, '/')
+api.add_resource(UserDetailAPI, '/<int:user_id>')
+
 users_api_bp.add_app_template_global(definitions, name='user_definitions')
\ No newline at end of file
@@ -1,133 +1,161 @@
 # app.py
 import os
-from flask import Flask, send_from_directory
-from flask_wtf.csrf import CSRFProtect
-from flasgger import Swagger
-from flask_jwt_extended import JWTManager, jwt_required
+from flask import Flask
 from utils import parse_datetime
-from celery_worker import celery
 
-# Use new paths for imports
-from core.extensions import db, cache, csrf, mail
-from core.extensions import db, cache, csrf, mail
+from core.extensions import db, cache, csrf, mail, jwt, migrate
+from core.authz import init_authz_audit
+from core.database import build_engine_options, init_engine
+from core.routing import READ_BIND, init_read_routing, read_bind_config
+from core.identity import load_identity
+from core.compression import init_compression
+from core.instrumentation import init_query_instrumentation
+from core.json_provider import init_json
+from core.profiling import init_profiling
+from core.slow_queries import init_slow_query_log
+from core.migrations import upgrade_database, upgrade_db_command
+from core.analytics_keys import backfill_analytics_keys_command
+from core.activity import rebuild_activity_command
+from core.archive import archive_attempts_command
+from core.counters import reconcile_counters_command
+from core.histograms import rebuild_histograms_command
+from core.leaderboards import rebuild_leaderboards_command
+from core.static_assets import init_static_assets, precompress_static_command
 from core.models import User, Role, SecretQuestion
-from config import DevelopmentConfig as AppConfig
-
-from core.models import User, Role, SecretQuestion
-from config import DevelopmentConfig as AppConfig
-from werkzeug.security import generate_password_hash
-from flask_debugtoolbar import DebugToolbarExtension
-
-from flask_apscheduler import APScheduler
-from celery.schedules import crontab
-
-
-try:
-    from api.auth import definitions as api_auth_definitions
-    api_definitions = {**api_auth_definitions} 
-except ImportError:
-    print("Warning: Could not import API definitions. Swagger might be incomplete.")
-    api_definitions = {}
-
-# App Setup 
-app = Flask(__name__, 
-            instance_relative_config=True,
-            static_folder='../frontend/dist', 
-            static_url_path='/'
-            )
-app.config.from_object(AppConfig)
-
-app.config['SWAGGER'] = {
-    'title': 'Quiz App API',
-    'uiversion': 3,
-    "specs_route": "/apidocs/",
-    'definitions': api_definitions
-}
-
-swagger = Swagger(app, template={
-    "swagger": "2.0",
-    "info": {
-        "title": "My API",
-        "version": "1.0"
-    },
-    "securityDefinitions": {
-        "Bearer": {
-            "type": "apiKey",
-            "name": "Authorization",
-            "in": "header",
-            "description": "Enter: **Bearer &lt;your JWT token&gt;**"
-        }
-    }
-})
-
-# Flask-DebugToolbar Configuration
-app.config['DEBUG'] = True
-app.config['SECRET_KEY'] = 'your_super_secret_key_for_debug_toolbar'
-app.config['DEBUG_TB_INTERCEPT_REDIRECTS'] = False
-toolbar = DebugToolbarExtension(app)
-
-# Flask-Caching Configuration for Redis 
-app.config['CACHE_TYPE'] = 'RedisCache' 
-app.config['CACHE_REDIS_HOST'] = 'localhost' 
-app.config['CACHE_REDIS_PORT'] = 6379      
-app.config['CACHE_REDIS_DB'] = 0         
-app.config['CACHE_REDIS_URL'] = 'redis://localhost:6379/0' 
-
-celery.conf.broker_url = app.config['CELERY_BROKER_URL']
-celery.conf.result_backend = app.config['CELERY_RESULT_BACKEND']
-celery.conf.update(app.config)
-
-# Define the ContextTask here, where 'app' is available
-class ContextTask(celery.Task):
-    def __call__(self, *args, **kwargs):
-        with app.app_context():
-            return self.run(*args, **kwargs)
-
-celery.Task = ContextTask
-
-# Define the Celery Beat schedule here
-celery.conf.beat_schedule = {
-    'send-monthly-reports': {
-        'task': 'jobs.send_monthly_reports', 
-        'schedule': crontab(day_of_month='1', hour=8, minute=0), 
-    },
-}
-try:
-    os.makedirs(app.instance_path)
-except OSError:
-    pass
-
-# --- Initialize Extensions ---
-db.init_app(app)
-jwt = JWTManager(app)
-cache.init_app(app)
-csrf.init_app(app)
-mail.init_app(app)
-
-scheduler = APScheduler()
-scheduler.init_app(app)
-scheduler.start()
-
-from jobs import send_daily_reminders
-
-if not scheduler.get_job('daily-reminders'):
-    scheduler.add_job(
-        id='daily-reminders', 
-        func=send_daily_reminders, 
-        #trigger='interval',
-        #minutes=1
-        trigger='cron', 
-        hour=20, 
-        
-    )
-    #print("TESTING: Scheduled 'daily-reminders' job to run every 1 minute.")
-    print("Scheduled 'daily-reminders' job to run every day at 20:00.")
+from config import config_by_name, DevelopmentConfig
+
+
+def create_app(config=None, **overrides):
+    """
+    Application factory.
+
+    `config` is a config class or a profile name from config.config_by_name
+    ('development', 'production', 'worker', 'testing'); it defaults to the
+    QUIZAPP_CONFIG environment variable, then 'development'. Keyword overrides
+    are applied on top, before any extension is initialized.
+    """
+    if config is None:
+        config = os.environ.get('QUIZAPP_CONFIG', 'development')
+    if isinstance(config, str):
+        config = config_by_name[config]
+
+    # App Setup
+    # No built-in static route: main.serve_vue_app serves dist from a manifest (core/static_assets.py)
+    app = Flask(__name__,
+                instance_relative_config=True,
+                static_folder=None
+                )
+    app.static_folder = '../frontend/dist'
+    app.config.from_object(config)
+    app.config.update(overrides)
+    os.makedirs(app.instance_path, exist_ok=True)
+    init_json(app) # orjson (when installed) behind jsonify, request.get_json and the Api representations
+
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS (config or overrides) win over the computed ones.
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**build_engine_options(app.config),
+                                               **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    read_bind = read_bind_config(app.config, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    if read_bind:
+        app.config['SQLALCHEMY_BINDS'] = {**app.config.get('SQLALCHEMY_BINDS', {}), READ_BIND: read_bind}
+
+    # --- Initialize Extensions ---
+    db.init_app(app)
+    with app.app_context():
+        for engine in db.engines.values():
+            init_engine(app, engine)
+        init_read_routing(app, db)
+    # Batch mode lets Alembic alter SQLite tables (it recreates them under the hood).
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'),
+                     render_as_batch=True)
+    jwt.init_app(app)
+    cache.init_app(app)
+    csrf.init_app(app)
+    mail.init_app(app)
+    init_query_instrumentation(app)
+    init_slow_query_log(app)
+    init_profiling(app) # After the SQL instrumentation so profiles can attach its stats
+    init_authz_audit(app)
+    init_compression(app)
+    # Celery is bound lazily: celery_worker.init_celery() runs when the first task
+    # module is imported inside this app's context (see celery_worker.py).
+
+    # Register the function as a Jinja filter
+    app.jinja_env.filters['timedeltaformat'] = parse_datetime
+
+    register_blueprints(app)
+    init_static_assets(app)
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(backfill_analytics_keys_command)
+    app.cli.add_command(archive_attempts_command)
+    app.cli.add_command(reconcile_counters_command)
+    app.cli.add_command(rebuild_leaderboards_command)
+    app.cli.add_command(rebuild_histograms_command)
+    app.cli.add_command(rebuild_activity_command)
+    app.cli.add_command(precompress_static_command)
+
+    # --- Optional, profile-dependent extras (imported only when enabled) ---
+    if app.config.get('SWAGGER_ENABLED'):
+        from core.apidocs import init_swagger
+        init_swagger(app)
+
+    if app.config.get('DEBUG_TB_ENABLED'):
+        from flask_debugtoolbar import DebugToolbarExtension
+        DebugToolbarExtension(app)
+
+    if app.config.get('SCHEDULER_ENABLED'):
+        from core.scheduler import init_scheduler
+        init_scheduler(app)
+
+    return app
+
+
+def register_blueprints(app):
+    """Imports the blueprint modules on demand and mounts them."""
+    from main.routes import main_bp
+    from api.auth import auth_api_bp
+    from api.subjects import subjects_api_bp
+    from api.chapters import chapters_api_bp
+    from api.quizzes import quizzes_api_bp
+    from api.questions import questions_api_bp
+    from api.users import users_api_bp
+    from api.attempts import attempts_api_bp
+    from api.search_api import search_api_bp
+    from api.summary_api import summary_api_bp
+    from api.user_api import user_api_bp
+    from api.admin_api import admin_api_bp
+    from api.export_api import export_api_bp
+
+    app.register_blueprint(main_bp)
+    app.register_blueprint(auth_api_bp, url_prefix='/api/auth')
+    app.register_blueprint(subjects_api_bp, url_prefix='/api/subjects')
+    app.register_blueprint(chapters_api_bp, url_prefix='/api/chapters')
+    app.register_blueprint(quizzes_api_bp, url_prefix='/api/quizzes')
+    app.register_blueprint(questions_api_bp, url_prefix='/api')
+    app.register_blueprint(users_api_bp, url_prefix='/api/users')
+    app.register_blueprint(attempts_api_bp, url_prefix='/api/attempts')
+    app.register_blueprint(search_api_bp, url_prefix='/api/search')
+    app.register_blueprint(summary_api_bp, url_prefix='/api/summary')
+    app.register_blueprint(user_api_bp, url_prefix='/api/user')
+    app.register_blueprint(admin_api_bp, url_prefix='/api/admin')
+    app.register_blueprint(export_api_bp, url_prefix='/api')
+
+    csrf.exempt(auth_api_bp)
+    csrf.exempt(subjects_api_bp)
+    csrf.exempt(chapters_api_bp)
+    csrf.exempt(quizzes_api_bp)
+    csrf.exempt(questions_api_bp)
+    csrf.exempt(users_api_bp)
+    csrf.exempt(attempts_api_bp)
+    csrf.exempt(search_api_bp)
+    csrf.exempt(summary_api_bp)
+    csrf.exempt(user_api_bp)
+    csrf.exempt(admin_api_bp)
+    csrf.exempt(export_api_bp)
 
 
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
-    identity = jwt_data["sub"] 
-    return User.query.filter_by(fs_uniquifier=identity).first()
+    return load_identity(jwt_data["sub"])
 
 def create_initial_data():
     """Creates roles, secret questions, and the default admin user."""
@@ -156,14 +184,14 @@ def create_initial_data():
         ]
         for q_text in questions:
             db.session.add(SecretQuestion(text=q_text))
-    
+
     # --- Create Admin User ---
     admin_user = User.query.join(User.roles).filter(Role.name == 'admin').first()
     if not admin_user:
         admin_username = os.environ.get('ADMIN_USERNAME', 'admin')
         admin_email = os.environ.get('ADMIN_EMAIL', 'admin@example.com')
         admin_password = os.environ.get('ADMIN_PASSWORD', 'Thisisadmin@123')
-        
+
         # Get the first secret question to assign to the admin
         default_secret_question = SecretQuestion.query.first()
         if not default_secret_question:
@@ -181,7 +209,7 @@ def create_initial_data():
                 secret_question_id=default_secret_question.id
             )
             admin_user.set_password(admin_password)
-            admin_user.set_secret_answer(admin_secret_answer) 
+            admin_user.set_secret_answer(admin_secret_answer)
             admin_user.roles.append(admin_role)
             db.session.add(admin_user)
             print(f"Created admin user: {admin_username}")
@@ -195,66 +223,12 @@ def create_initial_data():
         db.session.rollback()
 
 
-# Register the function as a Jinja filter
-app.jinja_env.filters['timedeltaformat'] = parse_datetime
-
-# --- Register Blueprints ---
-from main.routes import main_bp 
-from api.auth import auth_api_bp 
-from api.subjects import subjects_api_bp 
-from api.chapters import chapters_api_bp
-from api.quizzes import quizzes_api_bp
-from api.questions import questions_api_bp
-from api.users import users_api_bp
-from api.attempts import attempts_api_bp
-from api.search_api import search_api_bp
-from api.summary_api import summary_api_bp
-from api.user_api import user_api_bp 
-from api.admin_api import admin_api_bp
-from api.export_api import export_api_bp
-
-app.register_blueprint(main_bp)
-app.register_blueprint(auth_api_bp, url_prefix='/api/auth')
-app.register_blueprint(subjects_api_bp, url_prefix='/api/subjects')
-app.register_blueprint(chapters_api_bp, url_prefix='/api/chapters')
-app.register_blueprint(quizzes_api_bp, url_prefix='/api/quizzes')
-app.register_blueprint(questions_api_bp, url_prefix='/api') 
-app.register_blueprint(users_api_bp, url_prefix='/api/users')
-app.register_blueprint(attempts_api_bp, url_prefix='/api/attempts')
-app.register_blueprint(search_api_bp, url_prefix='/api/search')
-app.register_blueprint(summary_api_bp, url_prefix='/api/summary')
-app.register_blueprint(user_api_bp, url_prefix='/api/user')
-app.register_blueprint(admin_api_bp, url_prefix='/api/admin')
-app.register_blueprint(export_api_bp, url_prefix='/api')
-
-from flask import send_from_directory
-
-@app.route('/exports/<path:filename>')
-@jwt_required() # Secure the download link
-def download_export(filename):
-    """Serves files from the secure export directory."""
-    export_dir = os.path.join(app.instance_path, 'exports')
-    return send_from_directory(export_dir, filename, as_attachment=True)
-
-csrf.exempt(auth_api_bp)
-csrf.exempt(subjects_api_bp)
-csrf.exempt(chapters_api_bp)
-csrf.exempt(quizzes_api_bp)
-csrf.exempt(questions_api_bp)
-csrf.exempt(users_api_bp)
-csrf.exempt(attempts_api_bp)
-csrf.exempt(search_api_bp)
-csrf.exempt(summary_api_bp)
-csrf.exempt(user_api_bp)
-csrf.exempt(admin_api_bp)
-csrf.exempt(export_api_bp)
-
-
 # --- Run the App ---
 if __name__ == '__main__':
+    app = create_app(DevelopmentConfig)
     with app.app_context():
-        print("Initializing database...")
-        db.create_all()
+        print("Migrating database...")
+        upgrade_database()
         print("Checking initial data (roles, questions, admin)...")
         create_initial_data()
         print("Initialization complete.")
@@ -0,0 +1,252 @@
+# benchmarks/bench_activity.py
+"""
+Activity trend rollups: correctness and read cost.
+
+Seeds a tier, adds --years of older archived history, archives part of the
+live table and rebuilds the rollups. Checks every rollup row (hour, day,
+week and month; per subject and overall) against a recount of the attempt
+tables. Then submits new attempts - some sharing a submitted_at across a
+page boundary, some inside the lag window - and checks that refreshes add
+exactly the new ones and still match the recount, also when they fire while
+a rebuild runs on another thread.
+
+Finally times the trend endpoint for a week and for the whole history
+against a GROUP BY over the attempt tables per request, which is what the
+chart would otherwise run.
+
+Usage (from backend/):
+    python -m benchmarks.bench_activity [--tier medium] [--years 3] [--iterations 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.run import build_app, make_tokens
+
+RAW_DAILY = """
+    SELECT date(submitted_at) AS day, subject_id, count(*), count(DISTINCT user_id) FROM (
+        SELECT submitted_at, subject_id, user_id FROM quiz_attempt WHERE submitted_at BETWEEN :start AND :end
+        UNION ALL
+        SELECT submitted_at, subject_id, user_id FROM quiz_attempt_archive WHERE submitted_at BETWEEN :start AND :end
+    ) GROUP BY day, subject_id
+"""
+
+
+def recount(db, horizon):
+    """(level, bucket, subject) -> (attempts, score sum, question sum, distinct users), from the attempt tables."""
+    from core.activity import ALL_SUBJECTS, LEVELS, bucket
+    sums, users = defaultdict(lambda: [0, 0, 0]), defaultdict(set)
+    for table in ('quiz_attempt', 'quiz_attempt_archive'):
+        for user_id, subject_id, score, total, submitted_at in db.session.execute(db.text(
+                f'SELECT user_id, subject_id, score, total_questions, submitted_at FROM {table} '
+                'WHERE submitted_at IS NOT NULL AND submitted_at <= :horizon'), {'horizon': horizon}):
+            submitted_at = datetime.fromisoformat(submitted_at) if isinstance(submitted_at, str) else submitted_at
+            for level in LEVELS:
+                for subject in {ALL_SUBJECTS, subject_id or ALL_SUBJECTS}:
+                    key = (level, bucket(level, submitted_at), subject)
+                    sums[key][0] += 1
+                    sums[key][1] += score
+                    sums[key][2] += total
+                    users[key].add(user_id)
+    return {key: (*entry, len(users[key])) for key, entry in sums.items()}
+
+
+def stored(db):
+    from core.models import ActivityRollup as R
+    return {(r.level, r.bucket_start, r.subject_id): (r.attempts, r.score_sum, r.total_sum, r.active_users)
+            for r in db.session.query(R)}
+
+
+def compare(db, horizon, label):
+    expected, got = recount(db, horizon), stored(db)
+    if expected == got:
+        return []
+    wrong = [k for k in expected.keys() | got.keys() if expected.get(k) != got.get(k)]
+    return [f'{label}: {len(wrong)} rollup rows differ from a recount, e.g. '
+            + ', '.join(f'{k}: {got.get(k)} vs {expected.get(k)}' for k in sorted(wrong)[:3])]
+
+
+def add_history(db, years, now, rng):
+    """Archived attempts from a year to `years` years back, at the seeded tier's daily rate."""
+    from core.models import ArchivedQuizAttempt, Quiz
+    quizzes = db.session.query(Quiz.id, Quiz.chapter_id, Quiz.subject_id, Quiz.question_count).all()
+    users = [u for (u,) in db.session.execute(db.text('SELECT id FROM user WHERE id > 1'))]
+    per_day = max(db.session.execute(db.text('SELECT count(*) FROM quiz_attempt')).scalar() // 365, 1)
+    next_id = db.session.execute(db.text('SELECT max(id) FROM quiz_attempt')).scalar() + 1_000_000
+    rows = []
+    for day in range(365, int(365 * years)):
+        for _ in range(per_day):
+            quiz_id, chapter_id, subject_id, questions = rng.choice(quizzes)
+            submitted = now - timedelta(days=day, minutes=rng.randrange(1440))
+            rows.append({'id': next_id, 'user_id': rng.choice(users), 'quiz_id': quiz_id, 'chapter_id': chapter_id,
+                         'subject_id': subject_id, 'score': rng.randrange(questions + 1), 'total_questions': questions,
+                         'start_time': submitted - timedelta(minutes=10), 'submitted_at': submitted})
+            next_id += 1
+    for i in range(0, len(rows), 10_000):
+        db.session.execute(db.insert(ArchivedQuizAttempt), rows[i:i + 10_000])
+    db.session.commit()
+    return len(rows)
+
+
+def submit(db, ctx, moments, rng):
+    """Submitted attempts at the given moments, across the seeded users and quizzes."""
+    from core.models import QuizAttempt
+    users = [u for (u,) in db.session.execute(db.text('SELECT id FROM user WHERE id > 1 LIMIT 20'))]
+    for moment in moments:
+        db.session.add(QuizAttempt(user_id=rng.choice(users), quiz_id=rng.choice(ctx['quiz_ids']),
+                                   score=rng.randrange(ctx['questions_per_quiz'] + 1),
+                                   total_questions=ctx['questions_per_quiz'],
+                                   start_time=moment - timedelta(minutes=5), submitted_at=moment))
+    db.session.commit()
+
+
+def timed(fn, iterations):
+    from core.instrumentation import track_queries
+    samples = []
+    for _ in range(iterations):
+        with track_queries() as stats:
+            started = time.perf_counter()
+            result = fn()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), stats.count, result
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Activity rollup benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--years', type=float, default=3, help='Total history, the seeded year included')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'activity.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None, ACTIVITY_ROLLUP_LAG_SECONDS=120,
+                    ACTIVITY_LOCK_FILE=os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'activity.lock'))
+    from benchmarks.seed import seed_database
+    from core.activity import next_bucket, rebuild_activity, refresh_activity, watermark
+    from core.archive import archive_old_attempts
+    from core.extensions import db
+
+    rng = random.Random(11)
+    failures = []
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+        history = add_history(db, args.years, now, rng)
+        with contextlib.redirect_stdout(io.StringIO()):
+            archived = archive_old_attempts(horizon_days=180)
+        total = db.session.execute(db.text( # The seed has a few submissions up to 30 minutes ahead
+            'SELECT (SELECT count(*) FROM quiz_attempt WHERE submitted_at <= :h) + '
+            '(SELECT count(*) FROM quiz_attempt_archive WHERE submitted_at <= :h)'), {'h': now - timedelta(seconds=120)}).scalar()
+        started = time.perf_counter()
+        rebuilt = rebuild_activity(now=now)
+        rebuild_s = time.perf_counter() - started
+        rows = db.session.execute(db.text('SELECT count(*) FROM activity_rollup')).scalar()
+        presence = db.session.execute(db.text('SELECT count(*) FROM activity_presence')).scalar()
+        print(f"\nTier '{args.tier}' + {history} older attempts ({total} in all, {archived} archived here)")
+        print(f"Rebuild: {rebuilt} attempts in {rebuild_s:.2f}s -> {rows} rollup rows, {presence} presence rows kept")
+        if rebuilt != total:
+            failures.append(f'rebuild added {rebuilt} attempts, there are {total}')
+        failures += compare(db, now - timedelta(seconds=120), 'after rebuild')
+
+        # New submissions: five share one timestamp across a page boundary; two land inside the lag window
+        # (after the watermark, as live submissions are: seeded attempts reach to within minutes of now)
+        mark, horizon = watermark(), now - timedelta(seconds=120)
+        gap = (horizon - mark).total_seconds()
+        moments = [mark + timedelta(seconds=gap * rng.uniform(0.01, 1)) for _ in range(40)]
+        moments += [mark + timedelta(seconds=gap / 2)] * 5
+        lagging = [now - timedelta(seconds=30), now - timedelta(seconds=10)]
+        submit(db, ctx, moments + lagging, rng)
+        started = time.perf_counter()
+        added = refresh_activity(batch_size=7, now=now)
+        refresh_ms = (time.perf_counter() - started) * 1000
+        if added != len(moments):
+            failures.append(f'refresh added {added} attempts, expected {len(moments)} (the lag window held back 2)')
+        failures += compare(db, now - timedelta(seconds=120), 'after refresh')
+        later = now + timedelta(minutes=5)
+        due = db.session.execute(db.text('SELECT count(*) FROM quiz_attempt WHERE submitted_at > :a AND submitted_at <= :b'),
+                                 {'a': horizon, 'b': later - timedelta(seconds=120)}).scalar()
+        if (again := refresh_activity(now=later)) != due:
+            failures.append(f'next refresh added {again}, expected the {due} that came due ({len(lagging)} held back)')
+        failures += compare(db, later - timedelta(seconds=120), 'after the next refresh')
+        with track_queries_quietly() as idle:
+            nothing = refresh_activity(now=later)
+        if nothing:
+            failures.append(f'an idle refresh added {nothing} attempts')
+        print(f"Refresh: {added} new attempts in {refresh_ms:.1f}ms (pages of 7); "
+              f"an idle refresh runs {idle.count} statements; watermark {watermark()}")
+
+        # Scheduler ticks during a rebuild on another worker skip instead of counting attempts twice
+        def rebuild_elsewhere():
+            with app.app_context():
+                rebuild_activity(batch_size=500, now=later)
+        worker = threading.Thread(target=rebuild_elsewhere)
+        worker.start()
+        ticks = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            while worker.is_alive():
+                refresh_activity(now=later)
+                ticks += 1
+        worker.join()
+        db.session.expire_all()
+        failures += compare(db, later - timedelta(seconds=120), f'after a rebuild with {ticks} refreshes alongside')
+
+    # Reads: the endpoint against a GROUP BY per request
+    client = app.test_client()
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    oldest = now - timedelta(days=int(365 * args.years))
+    ranges = {'last week': (now - timedelta(days=7), now), 'last 90 days': (now - timedelta(days=90), now),
+              f'{args.years:g} years': (oldest, now)}
+    print(f"\n{'range':<16}{'level':>7}{'points':>8}{'rollup ms':>11}{'SQL':>5}{'GROUP BY ms':>13}{'rows':>7}")
+    for name, (start, end) in ranges.items():
+        url = f'/api/summary/activity?start={start.isoformat()}&end={end.isoformat()}'
+        ms, statements, response = timed(lambda: client.get(url, headers=admin), args.iterations)
+        data = response.get_json()
+        first = datetime.fromisoformat(data['labels'][0]) # Series cover whole buckets
+        last = min(next_bucket(data['level'], datetime.fromisoformat(data['labels'][-1])) - timedelta(microseconds=1),
+                   later - timedelta(seconds=120))
+        with app.app_context():
+            raw_ms, _, raw = timed(lambda: db.session.execute(db.text(RAW_DAILY), {'start': first, 'end': last}).all(),
+                                   max(args.iterations // 4, 1))
+            day_attempts = sum(n for _, subject_id, n, _ in raw)
+        if response.status_code != 200 or sum(data['attempts']) != day_attempts:
+            failures.append(f"{name}: endpoint counted {sum(data['attempts'])} attempts, the GROUP BY {day_attempts}")
+        print(f"{name:<16}{data['level']:>7}{len(data['labels']):>8}{ms:>11.2f}{statements:>5}{raw_ms:>13.2f}{len(raw):>7}")
+
+    # Daily active users for one day match a distinct count (max_points=10: one day bucket, not 24 hours)
+    day = (now - timedelta(days=3)).replace(hour=0, minute=0, second=0, microsecond=0)
+    data = client.get(f'/api/summary/activity?start={day.date()}&end={day.date()}&max_points=10', headers=admin).get_json()
+    with app.app_context():
+        raw = db.session.execute(db.text(RAW_DAILY), {'start': day, 'end': day + timedelta(days=1, microseconds=-1)}).all()
+        distinct = db.session.execute(db.text(
+            'SELECT count(DISTINCT user_id) FROM (SELECT user_id, submitted_at FROM quiz_attempt UNION ALL '
+            'SELECT user_id, submitted_at FROM quiz_attempt_archive) WHERE submitted_at >= :start AND submitted_at < :end'),
+            {'start': day, 'end': day + timedelta(days=1)}).scalar()
+    if sum(data['active_users']) != distinct or sum(data['attempts']) != sum(n for _, _, n, _ in raw):
+        failures.append(f"{day.date()}: {sum(data['active_users'])} active users / {sum(data['attempts'])} attempts, "
+                        f"recount {distinct} / {sum(n for _, _, n, _ in raw)}")
+
+    print('\nActivity rollups match a recount.' if not failures else '\n!! ' + '\n!! '.join(failures))
+    return 1 if failures else 0
+
+
+@contextlib.contextmanager
+def track_queries_quietly():
+    from core.instrumentation import track_queries
+    with track_queries() as stats, contextlib.redirect_stdout(io.StringIO()):
+        yield stats
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# benchmarks/bench_archive.py
+"""
+Archival benchmark and correctness check.
+
+Seeds a tier (attempts spread over the last 365 days), records what the
+dashboards show, archives everything older than --horizon-days, and checks that
+the dashboards show exactly the same numbers afterwards (the rollups stand in
+for the archived rows). Reports the hot table size, archival throughput and the
+dashboard latencies before and after.
+
+Usage (from backend/):
+    python -m benchmarks.bench_archive [--tier medium] [--horizon-days 90] [--iterations 20]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.run import build_app, define_cases, make_tokens, measure
+
+CASES = ('user_dashboard', 'user_summary', 'admin_summary', 'export_task')
+
+
+def charts(chart):
+    return {name: dict(zip(series['labels'], series['data'])) for name, series in chart.items()}
+
+
+def snapshot(client, ctx, tokens):
+    """The archive-sensitive numbers from each dashboard, normalized for comparison."""
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    summary = client.get('/api/summary/', headers=admin).get_json()
+    activity = client.get(f"/api/admin/users/{ctx['user_id']}/activity?include_archived=1&per_page=1",
+                          headers=admin).get_json()
+    return {
+        'admin_charts': charts(summary['chart_data']),
+        'admin_user_activity': {u['id']: u['attempt_count'] for u in summary['user_activity']},
+        'user_charts': charts(client.get('/api/user/summary-data', headers=user).get_json()['chart_data']),
+        'user_high_scores': client.get('/api/user/dashboard-data', headers=user).get_json()['high_scores'],
+        'user_history_total': activity['paging']['total'],
+    }
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Attempt archival benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--horizon-days', type=int, default=90)
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'archive.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import seed_database
+    from core.archive import archive_old_attempts
+    from core.extensions import db
+    from core.models import ArchivedQuizAttempt, QuizAttempt
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+    client = app.test_client()
+    cases = {name: case for name, case in define_cases(app, client, ctx, tokens).items() if name in CASES}
+    exports_before = set(glob.glob(os.path.join(app.instance_path, 'exports', '*')))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        before_snapshot = snapshot(client, ctx, tokens)
+    before = {name: measure(setup, call, args.iterations, warmup=2) for name, (setup, call) in cases.items()}
+
+    with app.app_context():
+        hot_before = QuizAttempt.query.count()
+        started = time.perf_counter()
+        archived = archive_old_attempts(horizon_days=args.horizon_days)
+        seconds = time.perf_counter() - started
+        hot_after, archive_rows = QuizAttempt.query.count(), ArchivedQuizAttempt.query.count()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        after_snapshot = snapshot(client, ctx, tokens)
+    after = {name: measure(setup, call, args.iterations, warmup=2) for name, (setup, call) in cases.items()}
+    for path in set(glob.glob(os.path.join(app.instance_path, 'exports', '*'))) - exports_before:
+        os.remove(path)
+
+    print(f"\nTier '{args.tier}', horizon {args.horizon_days} days")
+    print(f"quiz_attempt rows: {hot_before} -> {hot_after} ({archive_rows} archived)")
+    print(f"archived {archived} attempts in {seconds:.2f}s ({archived / seconds if seconds else 0:.0f}/s)")
+    print(f"\n{'endpoint':<16}{'p50 before':>12}{'p50 after':>12}{'SQL before':>12}{'SQL after':>11}")
+    for name in cases:
+        b, a = before[name], after[name]
+        print(f"{name:<16}{b['p50_ms']:>12}{a['p50_ms']:>12}{b['statements']:>12}{a['statements']:>11}")
+
+    mismatched = [key for key in before_snapshot if before_snapshot[key] != after_snapshot[key]]
+    if mismatched:
+        print(f"\nDashboards changed after archival: {', '.join(mismatched)}")
+        return 1
+    print('\nDashboards show identical numbers before and after archival.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
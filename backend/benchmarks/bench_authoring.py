@@ -0,0 +1,107 @@
+# benchmarks/bench_authoring.py
+"""
+Quiz authoring benchmark.
+
+Builds the same N-question quiz the old way (POST /api/quizzes/ then one
+POST /api/quizzes/<id>/questions per question) and with one
+POST /api/quizzes/bulk, then replaces its questions with
+PUT /api/quizzes/<id>/questions. Reports requests, SQL statements, commits and
+wall time for each, and checks both quizzes end up with identical content.
+
+Usage (from backend/):
+    python -m benchmarks.bench_authoring [--questions 50] [--rounds 5]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from benchmarks.run import build_app, make_tokens
+
+
+def document(chapter_id, questions, tag=''):
+    return {
+        'title': f'Authoring benchmark {tag}', 'chapter_id': chapter_id, 'duration_minutes': 30,
+        'questions': [{'text': f'Question {i}{tag}?', 'options': [f'Option {i}.{j}{tag}' for j in range(1, 5)],
+                       'correct_option_index': i % 4 + 1} for i in range(questions)],
+    }
+
+
+def content(client, headers, quiz_id):
+    questions = client.get(f'/api/quizzes/{quiz_id}/questions', headers=headers).get_json()['questions']
+    return [(q['text'], [(o['text'], o['is_correct']) for o in q['options']]) for q in questions]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Quiz authoring benchmark')
+    parser.add_argument('--questions', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'authoring.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import seed_database
+    from core.extensions import db
+    from core.instrumentation import track_queries
+
+    with app.app_context():
+        ctx = seed_database('small')
+        tokens = make_tokens(ctx)
+    client = app.test_client()
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    chapter_id = 1
+    commits = []
+    event.listen(db.session, 'after_commit', lambda session: commits.append(1))
+
+    def one_by_one(doc):
+        quiz = client.post('/api/quizzes/', headers=admin, json={k: v for k, v in doc.items() if k != 'questions'})
+        quiz_id = quiz.get_json()['id']
+        for q in doc['questions']:
+            client.post(f'/api/quizzes/{quiz_id}/questions', headers=admin, json=q)
+        return quiz_id, 1 + len(doc['questions'])
+
+    def bulk(doc):
+        return client.post('/api/quizzes/bulk', headers=admin, json=doc).get_json()['id'], 1
+
+    def replace(doc):
+        client.put(f"/api/quizzes/{state['bulk_id']}/questions", headers=admin, json={'questions': doc['questions']})
+        return state['bulk_id'], 1
+
+    state = {}
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, write in (('one_by_one', one_by_one), ('bulk', bulk), ('replace', replace)):
+            samples = []
+            for r in range(args.rounds):
+                doc = document(chapter_id, args.questions, tag=f' r{r}' if name == 'replace' else '')
+                commits.clear()
+                with track_queries() as stats:
+                    started = time.perf_counter()
+                    quiz_id, requests = write(doc)
+                    samples.append((time.perf_counter() - started) * 1000.0)
+                results[name] = (requests, stats.count, len(commits), statistics.median(samples))
+                state[f'{name}_id'] = quiz_id
+        reference = content(client, admin, state['one_by_one_id'])
+        bulk_content = content(client, admin, state['bulk_id']) # Replaced by the last 'replace' round
+        expected_replaced = [(q['text'], [(t, j + 1 == q['correct_option_index']) for j, t in enumerate(q['options'])])
+                             for q in document(chapter_id, args.questions, tag=f' r{args.rounds - 1}')['questions']]
+
+    print(f"\n{args.questions}-question quiz, median of {args.rounds} rounds")
+    print(f"{'method':<12}{'requests':>10}{'SQL':>8}{'commits':>9}{'ms':>10}")
+    for name, (requests, statements, n_commits, ms) in results.items():
+        print(f"{name:<12}{requests:>10}{statements:>8}{n_commits:>9}{ms:>10.1f}")
+
+    fresh = client.post('/api/quizzes/bulk', headers=admin, json=document(chapter_id, args.questions)).get_json()['id']
+    ok = content(client, admin, fresh) == reference and bulk_content == expected_replaced
+    print('\nBulk-created and replaced quizzes have the expected content.' if ok else '\n!! Quiz content differs.')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
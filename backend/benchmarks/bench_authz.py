@@ -0,0 +1,61 @@
+# benchmarks/bench_authz.py
+"""
+Micro-benchmark for the admin authorization path.
+
+Times admin_required_api around a no-op view inside a request whose JWT has
+already been verified. The role mask is worked out once when the identity is
+loaded (core/identity.py), so every check costs the same. Exits non-zero
+above the budget.
+
+Usage (from backend/):
+    python -m benchmarks.bench_authz [--iterations 100000] [--budget-us 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.run import build_app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='admin_required_api micro-benchmark')
+    parser.add_argument('--iterations', type=int, default=100_000)
+    parser.add_argument('--budget-us', type=float, default=10.0,
+                        help='Fail when a check costs more than this many microseconds')
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'authz.db'))
+    from flask_jwt_extended import create_access_token, verify_jwt_in_request
+    from api.decorators import admin_required_api
+    from benchmarks.seed import seed_database
+
+    @admin_required_api
+    def view():
+        return None
+
+    with app.app_context():
+        seed_database('small')
+        token = create_access_token(identity='bench-admin-uniquifier', additional_claims={'roles': ['admin']})
+    headers = {'Authorization': f'Bearer {token}'}
+
+    results = {}
+    with app.test_request_context('/api/summary/', headers=headers):
+        verify_jwt_in_request(verify_type=False)
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            view()
+        results['admin check'] = (time.perf_counter() - start) / args.iterations * 1e6
+
+    for label, micros in results.items():
+        print(f'{label:<26}{micros:8.3f} us/call')
+    worst = max(results.values())
+    if worst > args.budget_us:
+        print(f'FAILED: {worst:.3f} us exceeds the {args.budget_us} us budget')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmarks/bench_cloning.py
+"""
+Cloning benchmark and correctness check.
+
+Copies the same seeded subject the old way - a script that reads it through
+the API and posts every chapter, quiz and question back - and with one
+POST /api/subjects/<id>/clone, then clones a chapter into another subject and
+a quiz into another chapter. Reports requests, SQL statements and wall time,
+and checks every copy has the same chapters, quizzes, questions and options
+(correct answers included) as its source.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cloning [--tier medium]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.run import build_app, make_tokens
+
+
+def quiz_content(quiz):
+    return (quiz.title, quiz.duration_minutes, quiz.is_active, quiz.scheduled_date,
+            [(q.text, [(o.text, o.is_correct) for o in q.option_list]) for q in quiz.question_list])
+
+
+def chapter_content(chapter):
+    return (chapter.name, [quiz_content(quiz) for quiz in sorted(chapter.quiz_list, key=lambda q: q.id)])
+
+
+def subject_content(subject):
+    return (subject.description, [chapter_content(c) for c in sorted(subject.chapter_list, key=lambda c: c.id)])
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Cloning benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'cloning.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import seed_database
+    from core.cloning import count_rows
+    from core.extensions import db
+    from core.instrumentation import track_queries
+    from core.models import Chapter, Quiz, Subject
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+    client = app.test_client()
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    source_id = 1
+
+    def by_script():
+        requests = 0
+
+        def call(method, url, **kwargs):
+            nonlocal requests
+            requests += 1
+            return getattr(client, method)(url, headers=admin, **kwargs).get_json()
+
+        subject = call('get', f'/api/subjects/{source_id}')
+        new_id = call('post', '/api/subjects/', json={'name': subject['name'] + ' (script copy)',
+                                                      'description': subject['description']})['id']
+        for chapter in call('get', f'/api/chapters/?subject_id={source_id}')['chapters']:
+            new_chapter = call('post', '/api/chapters/', json={'name': chapter['name'], 'subject_id': new_id})['id']
+            for quiz in call('get', f"/api/quizzes/?chapter_id={chapter['id']}")['quizzes']:
+                new_quiz = call('post', '/api/quizzes/', json={
+                    'title': quiz['title'], 'chapter_id': new_chapter, 'duration_minutes': quiz['duration_minutes'],
+                    'scheduled_date': quiz['scheduled_date'], 'is_active': quiz['is_active']})['id']
+                for q in call('get', f"/api/quizzes/{quiz['id']}/questions")['questions']:
+                    call('post', f'/api/quizzes/{new_quiz}/questions', json={
+                        'text': q['text'], 'options': [o['text'] for o in q['options']],
+                        'correct_option_index': next(i for i, o in enumerate(q['options'], 1) if o['is_correct'])})
+        return new_id, requests
+
+    def by_clone():
+        return client.post(f'/api/subjects/{source_id}/clone', headers=admin,
+                           json={'name': 'Cloned subject'}).get_json()['id'], 1
+
+    results = {}
+    copies = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, copy in (('script', by_script), ('clone', by_clone)):
+            with track_queries() as stats:
+                started = time.perf_counter()
+                copies[name], requests = copy()
+                results[name] = (requests, stats.count, time.perf_counter() - started)
+        chapter_copy = client.post('/api/chapters/1/clone', headers=admin, json={'subject_id': 2}).get_json()['id']
+        with app.app_context(): # Into another subject, so subject 1 stays as it was
+            target_chapter = db.session.scalar(db.select(Chapter.id).where(Chapter.subject_id == 3).limit(1))
+        quiz_copy = client.post('/api/quizzes/1/clone', headers=admin,
+                                json={'chapter_id': target_chapter, 'title': 'Copied quiz'}).get_json()['id']
+
+    with app.app_context():
+        rows = count_rows('subject', source_id)
+        print(f"\nTier '{args.tier}': copy subject {source_id} ({sum(rows.values())} rows: "
+              + ', '.join(f'{k} {v}' for k, v in rows.items()) + ')')
+        print(f"{'method':<10}{'requests':>10}{'SQL':>8}{'seconds':>10}")
+        for name, (requests, statements, seconds) in results.items():
+            print(f"{name:<10}{requests:>10}{statements:>8}{seconds:>10.3f}")
+
+        source = subject_content(db.session.get(Subject, source_id))
+        failures = [name for name, subject_id in copies.items() if subject_content(db.session.get(Subject, subject_id)) != source]
+        chapter = db.session.get(Chapter, chapter_copy)
+        if chapter.subject_id != 2 or chapter_content(chapter) != chapter_content(db.session.get(Chapter, 1)):
+            failures.append('chapter clone')
+        if any(q.subject_id != 2 for q in chapter.quiz_list):
+            failures.append('chapter clone subject_id')
+        quiz, original = db.session.get(Quiz, quiz_copy), db.session.get(Quiz, 1)
+        if (quiz.chapter_id, quiz.subject_id, quiz.title) != (target_chapter, 3, 'Copied quiz') \
+                or quiz_content(quiz)[1:] != quiz_content(original)[1:]:
+            failures.append('quiz clone')
+    print('\nCopies match their sources.' if not failures else f"\n!! Copies differ: {', '.join(failures)}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
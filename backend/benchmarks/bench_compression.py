@@ -0,0 +1,131 @@
+# benchmarks/bench_compression.py
+"""
+Compression and static asset benchmark.
+
+Dynamic: body size and p50 of the largest JSON endpoints uncompressed, gzipped
+and (with brotli installed) brotli-compressed.
+
+Static: serves a frontend bundle - frontend/dist when it has been built,
+otherwise a synthetic one - precompressed, through the manifest, next to the
+old per-request `os.path.exists` + send_from_directory route, and reports the
+bytes sent and p50 for each.
+
+Usage (from backend/):
+    python -m benchmarks.bench_compression [--tier medium] [--iterations 30]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.run import build_app, make_tokens, measure
+
+
+def synthetic_dist(root):
+    """index.html plus Vite-style hashed JS/CSS of realistic sizes."""
+    os.makedirs(os.path.join(root, 'assets'))
+    script = ''.join(f'export function component{i}(props){{return h("div",{{class:"card-{i}"}},props.title)}}\n'
+                     for i in range(4000))
+    style = ''.join(f'.card-{i}{{margin:{i % 7}px;padding:{i % 5}px;color:#{i % 4096:03x}}}\n' for i in range(3000))
+    files = {
+        'index.html': '<!doctype html><html><head><script type="module" src="/assets/index-Bx8kP2aQ.js"></script>'
+                      '<link rel="stylesheet" href="/assets/index-C1dE9fGh.css"></head><body><div id="app"></div></body></html>',
+        'assets/index-Bx8kP2aQ.js': script,
+        'assets/index-C1dE9fGh.css': style,
+    }
+    for name, text in files.items():
+        with open(os.path.join(root, name), 'w') as f:
+            f.write(text)
+    return ['assets/index-Bx8kP2aQ.js', 'assets/index-C1dE9fGh.css', 'index.html']
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Compression benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--iterations', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp(prefix='quizapp-bench-')
+    app = build_app(os.path.join(scratch, 'compression.db'), SLOW_QUERY_THRESHOLD_MS=None)
+    from flask import send_from_directory
+    from benchmarks.seed import create_open_attempt, seed_database
+    from core.compression import available_encodings
+    from core.static_assets import init_static_assets, precompress
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+        open_attempt = create_open_attempt(ctx['user_id'], ctx['quiz_ids'][0], ctx['questions_per_quiz'])
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+
+    # Static bundle: a copy of the real build, or a synthetic one
+    dist = os.path.join(scratch, 'dist')
+    built = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'frontend', 'dist'))
+    if os.path.isdir(built):
+        shutil.copytree(built, dist)
+        assets = sorted((os.path.relpath(os.path.join(d, n), dist).replace(os.sep, '/')
+                         for d, _, names in os.walk(dist) for n in names), key=lambda p: -os.path.getsize(os.path.join(dist, p)))[:3]
+    else:
+        assets = synthetic_dist(dist)
+    app.static_folder = dist
+    with app.app_context():
+        precompress(dist)
+    init_static_assets(app)
+
+    @app.route('/_legacy_static/<path:path>')
+    def legacy_static(path): # serve_vue_app before the manifest
+        if os.path.exists(os.path.join(app.static_folder, path)):
+            return send_from_directory(app.static_folder, path)
+        return send_from_directory(app.static_folder, 'index.html')
+
+    client = app.test_client()
+    encodings = ['identity', *reversed(available_encodings())]
+
+    def timed(url, headers):
+        def call():
+            response = client.get(url, headers=headers)
+            response.get_data()
+            response.close()
+            return response
+        return measure(None, call, args.iterations, warmup=2)['p50_ms']
+
+    def size(url, headers):
+        response = client.get(url, headers=headers)
+        body = response.get_data()
+        response.close()
+        return len(body)
+
+    dynamic = {
+        'attempts_list': ('/api/attempts/', admin),
+        'quiz_list': ('/api/quizzes/', admin),
+        'attempt_get': (f'/api/user/attempts/{open_attempt}', user),
+        'user_dashboard': ('/api/user/dashboard-data', user),
+        'admin_summary': ('/api/summary/', admin),
+    }
+    print(f"\nTier '{args.tier}', dynamic responses")
+    print(f"{'endpoint':<16}" + ''.join(f"{e + ' KiB':>14}{e + ' p50':>14}" for e in encodings))
+    for name, (url, headers) in dynamic.items():
+        row = ''
+        for encoding in encodings:
+            hh = {**headers, 'Accept-Encoding': encoding}
+            row += f"{size(url, hh) / 1024:>14.1f}{timed(url, hh):>14.3f}"
+        print(f"{name:<16}{row}")
+
+    print(f"\nStatic assets ({'frontend/dist' if os.path.isdir(built) else 'synthetic bundle'})")
+    print(f"{'file':<30}{'legacy KiB':>12}{'legacy p50':>12}" + ''.join(f"{e + ' KiB':>14}{e + ' p50':>14}" for e in encodings))
+    for path in assets:
+        row = f"{size('/_legacy_static/' + path, {}) / 1024:>12.1f}{timed('/_legacy_static/' + path, {}):>12.3f}"
+        for encoding in encodings:
+            hh = {'Accept-Encoding': encoding}
+            row += f"{size('/' + path, hh) / 1024:>14.1f}{timed('/' + path, hh):>14.3f}"
+        print(f"{path[-30:]:<30}{row}")
+    shutil.rmtree(dist, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
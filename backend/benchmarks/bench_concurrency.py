@@ -0,0 +1,156 @@
+# benchmarks/bench_concurrency.py
+"""
+Concurrent quiz-submit stress test: legacy SQLite settings vs the tuned engine.
+
+For each mode a fresh database is seeded. Forked writer processes then
+submit pre-created attempts while reader processes keep loading the admin
+summary (full-table aggregates). The report shows submit throughput, submit latency, reader throughput, failed
+requests and the pool's checkout waits.
+
+  legacy  rollback journal, synchronous=FULL, SQLAlchemy's default pool (5 + 10)
+  tuned   the app's defaults from core/database.py (WAL, NORMAL, busy timeout, mmap, pool)
+          and core/routing.py (the admin summary reads through its own query_only engine)
+
+Usage (from backend/):
+    python -m benchmarks.bench_concurrency [--tier medium] [--writers 4] [--readers 2] [--submits 25]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.run import build_app, make_tokens, percentile
+
+LEGACY_OPTIONS = {
+    'SQLITE_TUNING': False,
+    'READ_ROUTING_ENABLED': False,
+    'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 5, 'max_overflow': 10, 'connect_args': {'timeout': 5}},
+}
+
+
+def run_mode(name, overrides, tier, writers, readers, submits):
+    from sqlalchemy.pool import QueuePool
+    from benchmarks.seed import create_open_attempt, seed_database
+    from core.database import pool_metrics
+    from core.extensions import db
+
+    if 'SQLALCHEMY_ENGINE_OPTIONS' in overrides:
+        overrides = dict(overrides, SQLALCHEMY_ENGINE_OPTIONS=dict(overrides['SQLALCHEMY_ENGINE_OPTIONS'], poolclass=QueuePool))
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), f'{name}.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None, **overrides)
+    with app.app_context():
+        ctx = seed_database(tier)
+        tokens = make_tokens(ctx)
+        quiz_id, per_quiz = ctx['quiz_ids'][0], ctx['questions_per_quiz']
+        attempt_ids = [create_open_attempt(ctx['user_id'], quiz_id, per_quiz) for _ in range(writers * submits)]
+        journal = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        db.session.remove()
+
+    question_ids = range((quiz_id - 1) * per_quiz + 1, quiz_id * per_quiz + 1)
+    answers = {str(q): (q - 1) * 4 + 1 for q in question_ids}
+    headers = {'Authorization': f"Bearer {tokens['user']}"}
+    admin_headers = {'Authorization': f"Bearer {tokens['admin']}"}
+
+    def forked():
+        with app.app_context():
+            for engine in db.engines.values(): # Never share the parent's connections across a fork
+                engine.dispose(close=False)
+
+    def writer(ids, results):
+        forked()
+        client = app.test_client()
+        latencies, failures = [], []
+        for attempt_id in ids:
+            start = time.perf_counter()
+            try:
+                response = client.post(f'/api/user/attempts/{attempt_id}', json={'answers': answers}, headers=headers)
+                if response.status_code != 200:
+                    raise RuntimeError(f'HTTP {response.status_code}')
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            except Exception as e:
+                failures.append(f'{type(e).__name__}: {str(e)[:80]}')
+        with app.app_context():
+            results.put(('writer', latencies, failures, pool_metrics(db.engine).get('max_wait_ms')))
+
+    def reader(stop, results):
+        forked()
+        client = app.test_client()
+        reads, failures = 0, []
+        while not stop.is_set():
+            try:
+                # The admin summary aggregates all of quiz_attempt: long reads that, without WAL,
+                # hold the shared lock a committing writer has to wait for.
+                response = client.get('/api/summary/', headers=admin_headers)
+                if response.status_code != 200:
+                    raise RuntimeError(f'HTTP {response.status_code}')
+                reads += 1
+            except Exception as e:
+                failures.append(f'read {type(e).__name__}: {str(e)[:80]}')
+        results.put(('reader', reads, failures, None))
+
+    # Separate processes, as gunicorn workers would be; threads would serialize on the GIL.
+    mp = multiprocessing.get_context('fork')
+    results, stop = mp.Queue(), mp.Event()
+    reader_procs = [mp.Process(target=reader, args=(stop, results)) for _ in range(readers)]
+    writer_procs = [mp.Process(target=writer, args=(attempt_ids[i::writers], results)) for i in range(writers)]
+    for p in reader_procs:
+        p.start()
+    started = time.perf_counter()
+    for p in writer_procs:
+        p.start()
+    collected = [results.get() for _ in writer_procs]
+    elapsed = time.perf_counter() - started
+    stop.set()
+    collected += [results.get() for _ in reader_procs]
+    for p in reader_procs + writer_procs:
+        p.join()
+
+    submit_ms, failures, reads, waits = [], [], 0, []
+    for kind, value, errors, max_wait in collected:
+        failures += errors
+        if kind == 'writer':
+            submit_ms += value
+            if max_wait is not None: # Only the instrumented pool reports waits
+                waits.append(max_wait)
+        else:
+            reads += value
+    return {
+        'journal': journal,
+        'submits_per_s': round(len(submit_ms) / elapsed, 1),
+        'submit_p50_ms': round(percentile(submit_ms, 50), 1) if submit_ms else None,
+        'submit_p95_ms': round(percentile(submit_ms, 95), 1) if submit_ms else None,
+        'reads_per_s': round(reads / elapsed, 1),
+        'failures': len(failures),
+        'first_failure': failures[0] if failures else '',
+        'max_wait_ms': max(waits) if waits else '-',
+    }
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Concurrent submit stress test')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--submits', type=int, default=25, help='Submits per writer process')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, overrides in (('legacy', LEGACY_OPTIONS), ('tuned', {})):
+        results[name] = run_mode(name, overrides, args.tier, args.writers, args.readers, args.submits)
+
+    print(f"\nTier '{args.tier}': {args.writers} writers x {args.submits} submits, {args.readers} readers")
+    print(f"{'mode':<8}{'journal':>9}{'submit/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'reads/s':>9}{'failed':>8}{'max pool wait ms':>18}")
+    for name, r in results.items():
+        print(f"{name:<8}{r['journal']:>9}{r['submits_per_s']:>10}{str(r['submit_p50_ms']):>9}{str(r['submit_p95_ms']):>9}"
+              f"{r['reads_per_s']:>9}{r['failures']:>8}{str(r['max_wait_ms']):>18}")
+        if r['first_failure']:
+            print(f"         first failure: {r['first_failure']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# benchmarks/bench_deletes.py
+"""
+Cascading delete benchmark and correctness check.
+
+Seeds a tier and deletes the same subject (and separately a user) from copies
+of the database three ways: the ORM cascade (session.delete), delete_now
+(set-based, one transaction) and delete_in_chunks (the background task's
+path). Reports time, statements and peak memory for each, and checks that the
+set-based ways leave the same rows behind as the ORM, with no orphans.
+
+Usage (from backend/):
+    python -m benchmarks.bench_deletes [--tier medium] [--chunk-size 5000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.run import build_app
+
+ORPHANS = {
+    'options without question': 'SELECT count(*) FROM option WHERE question_id NOT IN (SELECT id FROM question)',
+    'questions without quiz': 'SELECT count(*) FROM question WHERE quiz_id NOT IN (SELECT id FROM quiz)',
+    'attempts without quiz/user': 'SELECT count(*) FROM quiz_attempt WHERE quiz_id NOT IN (SELECT id FROM quiz) '
+                                  'OR user_id NOT IN (SELECT id FROM user)',
+    'archived without quiz/user': 'SELECT count(*) FROM quiz_attempt_archive WHERE quiz_id NOT IN (SELECT id FROM quiz) '
+                                  'OR user_id NOT IN (SELECT id FROM user)',
+    'rollups without quiz/user': 'SELECT count(*) FROM quiz_attempt_rollup WHERE quiz_id NOT IN (SELECT id FROM quiz) '
+                                 'OR user_id NOT IN (SELECT id FROM user)',
+    'quizzes without chapter': 'SELECT count(*) FROM quiz WHERE chapter_id NOT IN (SELECT id FROM chapter)',
+    'chapters without subject': 'SELECT count(*) FROM chapter WHERE subject_id NOT IN (SELECT id FROM subject)',
+    'roles without user': 'SELECT count(*) FROM user_roles WHERE user_id NOT IN (SELECT id FROM user)',
+    'histograms without quiz': 'SELECT count(*) FROM quiz_score_histogram WHERE quiz_id NOT IN (SELECT id FROM quiz)',
+    'export jobs without user': 'SELECT count(*) FROM export_job WHERE user_id NOT IN (SELECT id FROM user)',
+    'answers without attempt/question': 'SELECT count(*) FROM attempt_answer WHERE question_id NOT IN (SELECT id FROM question) '
+                                        'OR (attempt_id NOT IN (SELECT id FROM quiz_attempt) '
+                                        'AND attempt_id NOT IN (SELECT id FROM quiz_attempt_archive))',
+}
+TABLES = ('subject', 'chapter', 'quiz', 'question', 'option', 'quiz_attempt', 'quiz_attempt_archive',
+          'quiz_attempt_rollup', 'quiz_score_histogram', 'attempt_answer', 'user', 'user_roles', 'export_job')
+
+
+def table_counts(db):
+    return {t: db.session.execute(db.text(f'SELECT count(*) FROM "{t}"')).scalar() for t in TABLES}
+
+
+def run(db_path, kind, obj_id, how, chunk_size):
+    """Deletes one object from a copy of the database; returns (seconds, statements, peak KiB, counts, orphans)."""
+    app = build_app(db_path, SLOW_QUERY_THRESHOLD_MS=None, ARCHIVE_ENABLED=False)
+    from core.deletion import delete_in_chunks, delete_now
+    from core.extensions import db
+    from core.instrumentation import track_queries
+    from core.models import Subject, User
+
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        with track_queries() as stats:
+            started = time.perf_counter()
+            if how == 'orm':
+                db.session.delete(db.session.get({'subject': Subject, 'user': User}[kind], obj_id))
+                db.session.commit()
+            elif how == 'set-based':
+                delete_now(kind, obj_id)
+            else:
+                delete_in_chunks(kind, obj_id, chunk_size=chunk_size)
+            seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        counts = table_counts(db)
+        orphans = {name: n for name, sql in ORPHANS.items() if (n := db.session.execute(db.text(sql)).scalar())}
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    return seconds, stats.count, peak / 1024.0, counts, orphans
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Cascading delete benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp(prefix='quizapp-bench-')
+    seeded = os.path.join(scratch, 'seeded.db')
+    app = build_app(seeded, SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import seed_answers, seed_database
+    from core.archive import archive_old_attempts
+    from core.deletion import count_rows
+    from core.extensions import db
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        seed_answers()
+        archive_old_attempts(horizon_days=90) # So the archive and rollup tables have rows to cascade to
+        targets = {'subject': 1, 'user': ctx['user_id']}
+        planned = {kind: count_rows(kind, obj_id) for kind, obj_id in targets.items()}
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+    failures = 0
+    for kind, obj_id in targets.items():
+        print(f"\nTier '{args.tier}': delete {kind} {obj_id} ({sum(planned[kind].values())} rows: "
+              + ', '.join(f'{k} {v}' for k, v in planned[kind].items() if v) + ')')
+        print(f"{'method':<12}{'seconds':>10}{'SQL':>8}{'peak KiB':>12}")
+        results = {}
+        for how in ('orm', 'set-based', 'chunked'):
+            copy = os.path.join(scratch, f'{kind}-{how}.db')
+            shutil.copy(seeded, copy)
+            results[how] = run(copy, kind, obj_id, how, args.chunk_size)
+            seconds, statements, peak, _, _ = results[how]
+            print(f"{how:<12}{seconds:>10.3f}{statements:>8}{peak:>12.1f}")
+        for how in ('set-based', 'chunked'):
+            counts, orphans = results[how][3], results[how][4]
+            if counts != results['orm'][3]:
+                failures += 1
+                diff = {t: (results['orm'][3][t], counts[t]) for t in TABLES if counts[t] != results['orm'][3][t]}
+                print(f"  !! {how} left different rows than the ORM cascade (orm, {how}): {diff}")
+            if orphans:
+                failures += 1
+                print(f"  !! {how} left orphans: {orphans}")
+    shutil.rmtree(scratch, ignore_errors=True)
+    print('\nSet-based deletes match the ORM cascade.' if not failures else f'\n{failures} check(s) failed.')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
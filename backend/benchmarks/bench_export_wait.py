@@ -0,0 +1,123 @@
+# benchmarks/bench_export_wait.py
+"""
+Export status: interval polling vs long-polling.
+
+Runs the real export task once with job tracking and checks the job row ends
+up SUCCESS with the file and a full count. Then simulates exports that take a
+few seconds (a thread stepping a job through PROGRESS to SUCCESS) and follows
+each one the old way - GET /api/tasks/<id>/status every --interval seconds -
+and with GET /api/user/exports/<id>?version=<n>&wait=<s>. Reports requests,
+SQL statements and how long after completion the client found out.
+
+Without EXPORT_EVENTS_URL (Redis) the long-poll re-reads the row every
+EXPORT_WAIT_POLL_INTERVAL seconds inside one request; with Redis it wakes on
+the published change instead.
+
+Usage (from backend/):
+    python -m benchmarks.bench_export_wait [--steps 5] [--step-seconds 0.5] [--interval 1.0]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.run import build_app, make_tokens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export status polling benchmark')
+    parser.add_argument('--steps', type=int, default=5, help='Progress updates per simulated export')
+    parser.add_argument('--step-seconds', type=float, default=0.5)
+    parser.add_argument('--interval', type=float, default=1.0, help='Polling interval of the old client')
+    parser.add_argument('--redis', default=None, help='EXPORT_EVENTS_URL to test pub/sub wake-ups')
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'exports.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None, EXPORT_EVENTS_URL=args.redis,
+                    EXPORT_WAIT_POLL_INTERVAL=0.25, EXPORT_PROGRESS_EVERY=10)
+    from benchmarks.seed import seed_database
+    from core.export_jobs import create_job, update_job
+    from core.extensions import db
+    from core.instrumentation import track_queries
+    from core.models import ExportJob
+    from jobs import export_user_attempts_csv
+
+    with app.app_context():
+        ctx = seed_database('small')
+        tokens = make_tokens(ctx)
+    client = app.test_client()
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    failures = []
+
+    # The real task, tracked
+    with app.app_context(), contextlib.redirect_stdout(io.StringIO()):
+        job_id = create_job(ctx['user_id']).id
+        export_user_attempts_csv(ctx['user_id'], job_id)
+        job = db.session.get(ExportJob, job_id)
+        if job.status != 'SUCCESS' or not job.filename or job.done != job.total or job.version < 3:
+            failures.append(f'export task left the job {job.status} {job.done}/{job.total} v{job.version}')
+        os.remove(os.path.join(app.instance_path, 'exports', job.filename))
+    if client.get(f'/api/user/exports/{job_id}', headers=admin).status_code != 404:
+        failures.append("another user can read the job")
+    legacy = client.get(f'/api/tasks/{job_id}/status', headers=user).get_json()
+    if legacy['status'] != 'SUCCESS' or legacy['result']['filename'] != job.filename:
+        failures.append(f'/tasks/<id>/status does not answer from the table: {legacy}')
+
+    def simulated_export():
+        with app.app_context():
+            job_id = create_job(ctx['user_id']).id
+        finished = {}
+
+        def run():
+            with app.app_context():
+                update_job(job_id, status='PROGRESS', done=0, total=args.steps)
+                for step in range(1, args.steps + 1):
+                    time.sleep(args.step_seconds)
+                    if step < args.steps:
+                        update_job(job_id, done=step)
+                finished['at'] = time.perf_counter()
+                update_job(job_id, status='SUCCESS', done=args.steps, filename='simulated.csv')
+        return job_id, finished, threading.Thread(target=run)
+
+    def interval_polling(job_id):
+        requests = 0
+        while True:
+            requests += 1
+            if client.get(f'/api/tasks/{job_id}/status', headers=user).get_json()['status'] in ('SUCCESS', 'FAILURE'):
+                return requests
+            time.sleep(args.interval)
+
+    def long_polling(job_id):
+        requests, version = 0, None
+        while True:
+            requests += 1
+            params = '' if version is None else f'?version={version}&wait=25'
+            job = client.get(f'/api/user/exports/{job_id}{params}', headers=user).get_json()
+            version = job['version']
+            if job['status'] in ('SUCCESS', 'FAILURE'):
+                return requests
+
+    print(f"\nSimulated export: {args.steps} steps of {args.step_seconds}s; old client polls every {args.interval}s"
+          f" ({'Redis pub/sub' if args.redis else 'no Redis: server-side re-reads'})")
+    print(f"{'client':<16}{'requests':>10}{'SQL':>8}{'noticed after ms':>18}")
+    for name, follow in (('interval poll', interval_polling), ('long-poll', long_polling)):
+        job_id, finished, worker = simulated_export()
+        with track_queries() as stats:
+            worker.start()
+            requests = follow(job_id)
+            noticed = time.perf_counter()
+            worker.join()
+        # The worker thread's own statements aren't tracked (different context), only the client's
+        print(f"{name:<16}{requests:>10}{stats.count:>8}{(noticed - finished['at']) * 1000:>18.1f}")
+
+    print('\nExport jobs are tracked correctly.' if not failures else '\n!! ' + '\n!! '.join(failures))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
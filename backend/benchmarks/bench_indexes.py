@@ -0,0 +1,107 @@
+# benchmarks/bench_indexes.py
+"""
+Before/after benchmark for the 0002_performance_indexes migration.
+
+Seeds a tier, migrates the database down to the baseline (no secondary
+indexes), runs every endpoint case, then upgrades to head and runs them again.
+The slow query recorder runs with a 0 ms threshold, so every statement gets its
+query plan captured. The report shows each case's latency before and after,
+plus every statement whose plan changed.
+
+Usage (from backend/):
+    python -m benchmarks.bench_indexes [--tier medium] [--iterations 20]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.run import build_app, define_cases, make_tokens, measure
+
+BASELINE = '0001_baseline'
+
+
+def capture_plans(app, cases):
+    """Runs each case once and returns {fingerprint: (case, plan)} from the slow query recorder."""
+    recorder = app.extensions['quizapp_slow_queries']
+    recorder.reset()
+    plans = {}
+    for name, (setup, call) in cases.items():
+        if setup:
+            setup()
+        call()
+        deadline = time.time() + 10
+        while not recorder._queue.empty() and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.1) # let the last EXPLAIN land
+        for row in recorder.report(limit=None):
+            plans.setdefault(row['fingerprint'], (name, row['plan']))
+    return plans
+
+
+def run_phase(app, cases, iterations):
+    recorder = app.extensions['quizapp_slow_queries']
+    recorder.threshold = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        plans = capture_plans(app, cases)
+    recorder.threshold = float('inf') # Keep logging and EXPLAIN out of the timed runs
+    timings = {name: measure(setup, call, iterations, warmup=2) for name, (setup, call) in cases.items()}
+    return plans, timings
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Index migration before/after benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'indexes.db'),
+                    SLOW_QUERY_THRESHOLD_MS=0)
+    from flask_migrate import downgrade, stamp, upgrade
+    from benchmarks.seed import seed_database
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+        stamp(revision='head')
+        downgrade(revision=BASELINE)
+    cases = define_cases(app, app.test_client(), ctx, tokens)
+    exports_before = set(glob.glob(os.path.join(app.instance_path, 'exports', '*')))
+
+    before_plans, before = run_phase(app, cases, args.iterations)
+    with app.app_context():
+        upgrade(revision='head')
+    after_plans, after = run_phase(app, cases, args.iterations)
+    for path in set(glob.glob(os.path.join(app.instance_path, 'exports', '*'))) - exports_before:
+        os.remove(path)
+
+    print(f"\nTier '{args.tier}', {args.iterations} iterations: {BASELINE} -> head")
+    print(f"{'endpoint':<18}{'p50 before':>12}{'p50 after':>12}{'speedup':>9}")
+    for name in cases:
+        b, a = before[name]['p50_ms'], after[name]['p50_ms']
+        print(f"{name:<18}{b:>12}{a:>12}{b / a if a else 0:>8.2f}x")
+
+    print('\nPlan changes:')
+    changed = 0
+    for fp, (case, plan_after) in after_plans.items():
+        plan_before = before_plans.get(fp, (case, None))[1]
+        if plan_before == plan_after:
+            continue
+        changed += 1
+        print(f"\n[{case}] {fp[:160]}")
+        for line in plan_before or ['(not captured)']:
+            print(f"   - {line}")
+        for line in plan_after or ['(not captured)']:
+            print(f"   + {line}")
+    print(f"\n{changed} statement plan(s) changed.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
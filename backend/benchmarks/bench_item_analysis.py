@@ -0,0 +1,258 @@
+# benchmarks/bench_item_analysis.py
+"""
+Item analysis correctness and speed.
+
+Seeds the small tier with stored answers, submits a quiz through the API and
+checks the answer rows it writes. Recomputes one quiz's statistics the slow
+way (a dense attempts x questions table, statistics.correlation) and checks
+analyze_quiz() agrees, with numpy and without.
+
+Then builds one quiz with --answers stored answers from a simple ability
+model, with two planted bad questions: one whose key is wrong (strong
+attempts pick a distractor) and one nobody gets right. Times the analysis
+with numpy and with the pure-Python loop, checks both agree and flag the
+planted questions, and that the admin endpoint serves the cached result.
+
+Usage (from backend/):
+    python -m benchmarks.bench_item_analysis [--answers 10000000] [--questions 20] [--skip-python]
+"""
+import argparse
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.run import build_app, make_tokens
+
+VOLATILE = ('engine', 'seconds', 'computed_at')
+
+
+def same(a, b):
+    return {k: v for k, v in a.items() if k not in VOLATILE} == {k: v for k, v in b.items() if k not in VOLATILE}
+
+
+def dense_check(db, quiz_id, result):
+    """Difficulty, corrected point-biserial and alpha from a full attempts x questions table."""
+    from core.models import AttemptAnswer
+    table = {}
+    for attempt_id, question_id, correct in db.session.query(
+            AttemptAnswer.attempt_id, AttemptAnswer.question_id, AttemptAnswer.is_correct)\
+            .filter(AttemptAnswer.quiz_id == quiz_id):
+        table.setdefault(attempt_id, {})[question_id] = int(correct)
+    questions = sorted({q for row in table.values() for q in row})
+    matrix = [[row[q] for q in questions] for row in table.values()]
+    totals = [sum(row) for row in matrix]
+    problems = []
+    for j, item in enumerate(result['questions']):
+        column = [row[j] for row in matrix]
+        rest = [t - x for t, x in zip(totals, column)]
+        p = sum(column) / len(column)
+        r = statistics.correlation(column, rest) if 0 < p < 1 else None
+        if abs(item['difficulty'] - p) > 1e-4 or (r is None) != (item['discrimination'] is None) \
+                or (r is not None and abs(item['discrimination'] - r) > 1e-4):
+            problems.append(f"question {item['question_id']}: {item['difficulty']}/{item['discrimination']} vs {p:.4f}/{r}")
+    k = len(questions)
+    variances = sum(statistics.pvariance([row[j] for row in matrix]) for j in range(k))
+    alpha = k / (k - 1) * (1 - variances / statistics.pvariance(totals))
+    if abs(result['alpha'] - alpha) > 1e-4:
+        problems.append(f"alpha {result['alpha']} vs {alpha:.4f}")
+    return problems
+
+
+def enforce_foreign_keys(engine):
+    """Turns on SQLite's foreign key checks for every connection the engine opens from now on."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'connect')
+    def _foreign_keys_on(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+    engine.dispose() # Pooled connections were opened without it
+
+
+def build_quiz(db, chapter_id, questions, attempts, rng):
+    """One quiz whose question 0 has the wrong key and question 1 can't be answered. Returns its id and question ids."""
+    from core.models import Option, Question, Quiz
+    quiz = Quiz(title='Item analysis bench', chapter_id=chapter_id, duration_minutes=30,
+                question_count=questions, attempt_count=attempts)
+    db.session.add(quiz)
+    db.session.flush()
+    sheet = []
+    for j in range(questions):
+        question = Question(text=f'Synthetic question {j}?', quiz_id=quiz.id)
+        db.session.add(question)
+        db.session.flush()
+        options = [Option(text=f'Option {o + 1}', is_correct=o == 0, question_id=question.id) for o in range(4)]
+        db.session.add_all(options)
+        db.session.flush()
+        sheet.append((question.id, [o.id for o in options]))
+    difficulty = [-1.5 + 3.0 * j / max(questions - 1, 1) for j in range(questions)]
+    base = 10_000_000 # Attempt ids clear of the seeded ones; attempt_answer has no foreign key to them
+    conn = db.session.connection()
+    batch = []
+    for i in range(attempts):
+        ability = rng.gauss(0, 1)
+        for j, (question_id, (key, *distractors)) in enumerate(sheet):
+            knows = rng.random() < 1 / (1 + math.exp(-1.7 * (ability - difficulty[j])))
+            if j == 0: # Miskeyed: those who know pick the first distractor; the key draws guessers
+                chosen = distractors[0] if knows else (key if rng.random() < 0.4 else rng.choice(distractors[1:]))
+            elif j == 1: # Nobody gets it right
+                chosen = rng.choice(distractors)
+            else:
+                chosen = key if knows else (None if rng.random() < 0.05 else rng.choice(distractors))
+            batch.append((base + i, question_id, quiz.id, chosen, chosen == key))
+        if len(batch) >= 100_000:
+            conn.exec_driver_sql('INSERT INTO attempt_answer (attempt_id, question_id, quiz_id, option_id, is_correct) '
+                                 'VALUES (?, ?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.exec_driver_sql('INSERT INTO attempt_answer (attempt_id, question_id, quiz_id, option_id, is_correct) '
+                             'VALUES (?, ?, ?, ?, ?)', batch)
+    db.session.commit()
+    return quiz.id, [question_id for question_id, _ in sheet]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Item analysis benchmark')
+    parser.add_argument('--answers', type=int, default=10_000_000, help='Stored answers in the synthetic quiz')
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--skip-python', action='store_true', help="Don't time the pure-Python loop on the big quiz")
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'items.db'), SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import create_open_attempt, seed_answers, seed_database
+    from core import item_analysis
+    from core.extensions import cache, db
+    from core.instrumentation import track_queries
+    from core.models import AttemptAnswer
+    from core.serializers import correct_option_ids
+    from jobs import analyze_quiz_items
+
+    if item_analysis.np is None:
+        print('numpy is not installed: only the pure-Python loop can be measured.')
+    failures = []
+    with app.app_context():
+        ctx = seed_database('small')
+        tokens = make_tokens(ctx)
+        seeded = seed_answers()
+    client = app.test_client()
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+
+    # Submit: one row per question, bogus option ids stored as skipped
+    quiz_id = ctx['quiz_ids'][0]
+    with app.app_context():
+        attempt_id = create_open_attempt(ctx['user_id'], quiz_id, ctx['questions_per_quiz'])
+        key = correct_option_ids(quiz_id)
+    questions = sorted(key)
+    wrong = key[questions[1]] + 1 if key[questions[1]] % 4 else key[questions[1]] - 1 # Seeded options come in fours
+    answers = {str(questions[0]): key[questions[0]], str(questions[1]): wrong,
+               str(questions[2]): key[questions[-1]]} # Right, wrong, another question's option; the rest skipped
+    client.post(f'/api/user/attempts/{attempt_id}', json={'answers': answers}, headers=user)
+    with app.app_context():
+        stored = {a.question_id: (a.option_id, a.is_correct) for a in AttemptAnswer.query.filter_by(attempt_id=attempt_id)}
+    expected = {q: (None, False) for q in questions}
+    expected[questions[0]] = (key[questions[0]], True)
+    expected[questions[1]] = (wrong, False)
+    if stored != expected:
+        failures.append(f'submit stored {stored}, expected {expected}')
+
+    # Seeded quiz: both engines against the dense recomputation
+    print(f"\nSmall tier: {seeded} seeded answers")
+    with app.app_context():
+        engines = ['python'] + (['numpy'] if item_analysis.np is not None else [])
+        results = {engine: item_analysis.analyze_quiz(quiz_id, engine=engine) for engine in engines}
+        failures += [f'quiz {quiz_id} ({e}): {p}' for e in engines for p in dense_check(db, quiz_id, results[e])]
+        if len(engines) == 2 and not same(*results.values()):
+            failures.append(f'numpy and python disagree on quiz {quiz_id}')
+
+    # Admin endpoint: computed once, then from the cache
+    with track_queries() as first:
+        response = client.get(f'/api/admin/quizzes/{quiz_id}/item-analysis', headers=admin)
+    with track_queries() as second:
+        again = client.get(f'/api/admin/quizzes/{quiz_id}/item-analysis', headers=admin)
+    if response.status_code != 200 or again.get_json() != response.get_json():
+        failures.append(f'GET item-analysis: {response.status_code}, cached copy differs')
+    print(f"GET item-analysis: {first.count} statements computing, {second.count} from the cache")
+
+    # The big quiz
+    print(f"\nBuilding a quiz with {args.answers} answers ({args.questions} questions)...")
+    attempts = max(args.answers // args.questions, 1)
+    with app.app_context():
+        started = time.perf_counter()
+        big_quiz, big_questions = build_quiz(db, 1, args.questions, attempts, random.Random(7))
+        print(f"  inserted in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        fetched = sum(len(chunk) for chunk in item_analysis._chunks(big_quiz))
+        fetch_s = time.perf_counter() - started
+        db.session.rollback()
+    print(f"{'':<24}{'seconds':>10}")
+    print(f"{'fetch rows only':<24}{fetch_s:>10.2f}")
+    big = {}
+    for engine in engines:
+        if engine == 'python' and args.skip_python:
+            continue
+        with app.app_context():
+            big[engine] = item_analysis.analyze_quiz(big_quiz, engine=engine)
+        print(f"{engine + ' analysis':<24}{big[engine]['seconds']:>10.2f}")
+    if len(big) == 2 and not same(*big.values()):
+        failures.append('numpy and python disagree on the big quiz')
+    result = next(iter(big.values()))
+    if result['answers'] != fetched or result['attempts'] != attempts:
+        failures.append(f"analysed {result['answers']} answers / {result['attempts']} attempts, stored {fetched} / {attempts}")
+    flags = {item['question_id']: item['flags'] for item in result['questions']}
+    if not {'negative_discrimination', 'distractor_outscores_key'} <= set(flags[big_questions[0]]):
+        failures.append(f'miskeyed question flagged {flags[big_questions[0]]}')
+    if 'nobody_correct' not in flags[big_questions[1]]:
+        failures.append(f'impossible question flagged {flags[big_questions[1]]}')
+    if any({'negative_discrimination', 'distractor_outscores_key'} & set(flags[q]) for q in big_questions[2:]):
+        failures.append('a sound question was flagged as miskeyed')
+    print(f"alpha {result['alpha']}; flags: " + ', '.join(f'q{i} {flags[q]}' for i, q in enumerate(big_questions) if flags[q]))
+
+    # The background task fills the cache the endpoint reads
+    with app.app_context():
+        analyze_quiz_items(big_quiz)
+    with track_queries() as cached:
+        started = time.perf_counter()
+        served = client.get(f'/api/admin/quizzes/{big_quiz}/item-analysis', headers=admin)
+        served_ms = (time.perf_counter() - started) * 1000
+    if served.status_code != 200 or served.get_json()['answers'] != fetched:
+        failures.append(f'GET item-analysis after the task: {served.status_code}')
+    print(f"GET item-analysis after the task: {served_ms:.1f} ms, {cached.count} statements")
+
+    # Fixing the planted key clears its flags: answers are graded against the current key
+    client.put(f'/api/questions/{big_questions[0]}', headers=admin, json={
+        'text': 'Synthetic question 0?', 'options': ['Option 1', 'Option 2', 'Option 3', 'Option 4'],
+        'correct_option_index': 2})
+    with app.app_context():
+        if cache.get(item_analysis.analysis_key(big_quiz)) is not None:
+            failures.append('changing the key left the old analysis cached')
+        fixed = item_analysis.analyze_quiz(big_quiz)['questions'][0]
+    if {'negative_discrimination', 'distractor_outscores_key'} & set(fixed['flags']) or fixed['discrimination'] <= 0:
+        failures.append(f"re-keyed question still flagged {fixed['flags']} ({fixed['discrimination']})")
+
+    # Deleting a question drops its answers and the cached analysis with them, also with
+    # foreign keys enforced as on Postgres: the answers that chose an option go before it
+    with app.app_context():
+        enforce_foreign_keys(db.engine)
+        analyze_quiz_items(big_quiz)
+    deleted = client.delete(f'/api/questions/{big_questions[-1]}', headers=admin)
+    if deleted.status_code != 200:
+        failures.append(f'DELETE answered question with foreign keys on: {deleted.status_code}')
+    with app.app_context():
+        if AttemptAnswer.query.filter_by(question_id=big_questions[-1]).count():
+            failures.append('deleting a question left its stored answers')
+        if cache.get(item_analysis.analysis_key(big_quiz)) is not None:
+            failures.append('deleting a question left the old analysis cached')
+        left = [item['question_id'] for item in item_analysis.analyze_quiz(big_quiz)['questions']]
+    if big_questions[-1] in left or len(left) != len(big_questions) - 1:
+        failures.append(f'analysis after deleting question {big_questions[-1]} covers {left}')
+
+    print('\nItem analysis matches a direct recomputation.' if not failures else '\n!! ' + '\n!! '.join(failures))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# benchmarks/bench_leaderboards.py
+"""
+Leaderboard correctness and latency.
+
+Seeds a tier and works out every quiz and subject ranking from the attempt
+rows in Python. Then archives attempts older than --horizon-days (so half the
+history only survives in the rollups), rebuilds the boards and checks each
+one holds exactly those scores. Submits a quiz through the API and checks the
+rank it returns, then compares top-10 plus "my rank" from the board against
+computing them in SQL on every request.
+
+Runs against the in-process boards (testing profile); with a Redis cache
+the same calls go to sorted sets.
+
+Usage (from backend/):
+    python -m benchmarks.bench_leaderboards [--tier medium] [--iterations 50]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.run import build_app, make_tokens, measure
+
+
+def expected_boards(db):
+    """{board key: {user_id: points}} from the live attempt rows."""
+    from core.leaderboards import attempt_points, board_key
+    from core.models import QuizAttempt
+
+    best = {}
+    rows = db.session.query(QuizAttempt.user_id, QuizAttempt.quiz_id, QuizAttempt.subject_id,
+                            QuizAttempt.score, QuizAttempt.total_questions)\
+        .filter(QuizAttempt.submitted_at.isnot(None))
+    for user_id, quiz_id, subject_id, score, total in rows:
+        points = attempt_points(score, total)
+        if points > best.get((user_id, quiz_id, subject_id), -1):
+            best[(user_id, quiz_id, subject_id)] = points
+    boards = defaultdict(lambda: defaultdict(int))
+    for (user_id, quiz_id, subject_id), points in best.items():
+        boards[board_key('quiz', quiz_id)][user_id] = points
+        boards[board_key('subject', subject_id)][user_id] += points
+    return boards
+
+
+def rank_of(board, user_id):
+    return 1 + sum(points > board[user_id] for points in board.values())
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Leaderboard benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--horizon-days', type=int, default=180)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'leaderboards.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import create_open_attempt, seed_database
+    from core.archive import archive_old_attempts
+    from core.extensions import db
+    from core.leaderboards import _boards, board_key, rebuild_leaderboards, standing, top
+    from core.models import QuizAttempt
+    from core.serializers import correct_option_ids
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+        boards = expected_boards(db)
+        with contextlib.redirect_stdout(io.StringIO()):
+            archived = archive_old_attempts(horizon_days=args.horizon_days)
+        started = time.perf_counter()
+        built = rebuild_leaderboards()
+        rebuild_s = time.perf_counter() - started
+    client = app.test_client()
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    failures = []
+
+    print(f"\nTier '{args.tier}': {archived} attempts archived, {built} boards rebuilt in {rebuild_s:.2f}s")
+    with app.app_context():
+        if built != len(boards):
+            failures.append(f'rebuilt {built} boards, expected {len(boards)}')
+        for key, expected in boards.items():
+            got = dict(_boards().top(key, len(expected) + 1))
+            if got != expected:
+                failures.append(f'{key} differs from a recount: {len(got)} vs {len(expected)} users')
+
+    # Submit with every answer right and check the rank that comes back
+    quiz_id, user_id = ctx['quiz_ids'][0], ctx['user_id']
+    with app.app_context():
+        attempt_id = create_open_attempt(user_id, quiz_id, ctx['questions_per_quiz'])
+        answers = {str(q): o for q, o in correct_option_ids(quiz_id).items()}
+        subject_id = db.session.get(QuizAttempt, attempt_id).subject_id
+    result = client.post(f'/api/user/attempts/{attempt_id}', json={'answers': answers}, headers=user).get_json()
+    quiz_board, subject_board = boards[board_key('quiz', quiz_id)], boards[board_key('subject', subject_id)]
+    subject_board[user_id] += 10000 - quiz_board.get(user_id, 0)
+    quiz_board[user_id] = 10000
+    expected = {'quiz': {'rank': rank_of(quiz_board, user_id), 'of': len(quiz_board), 'score': 100.0},
+                'subject': {'rank': rank_of(subject_board, user_id), 'of': len(subject_board),
+                            'score': subject_board[user_id] / 100.0}}
+    if result.get('leaderboard') != expected:
+        failures.append(f"submit returned {result.get('leaderboard')}, expected {expected}")
+    page = client.get(f'/api/user/leaderboards/quiz/{quiz_id}?limit=5', headers=user).get_json()
+    if page['me'] != expected['quiz'] or [e['rank'] for e in page['top']][:1] != [1]:
+        failures.append(f'GET /leaderboards/quiz/{quiz_id} disagrees: {page["me"]}')
+
+    # On demand: rank every user's best attempt on each request
+    def on_demand():
+        with app.app_context():
+            best = db.session.query(QuizAttempt.user_id, db.func.max(QuizAttempt.score * 1.0 / QuizAttempt.total_questions).label('best'))\
+                .filter(QuizAttempt.quiz_id == quiz_id, QuizAttempt.submitted_at.isnot(None), QuizAttempt.total_questions > 0)\
+                .group_by(QuizAttempt.user_id).subquery()
+            db.session.query(best).order_by(best.c.best.desc()).limit(10).all()
+            mine = db.session.query(best.c.best).filter(best.c.user_id == user_id).scalar_subquery()
+            db.session.query(db.func.count()).select_from(best).filter(best.c.best > mine).scalar()
+
+    def from_board():
+        with app.app_context():
+            top('quiz', quiz_id, 10), standing('quiz', quiz_id, user_id)
+
+    print(f"{'top-10 + my rank':<24}{'p50 ms':>10}{'p95 ms':>10}{'SQL':>6}")
+    for name, call in (('SQL per request', on_demand), ('sorted set', from_board),
+                       ('GET /leaderboards', lambda: client.get(f'/api/user/leaderboards/quiz/{quiz_id}', headers=user))):
+        stats = measure(None, call, args.iterations, warmup=3)
+        print(f"{name:<24}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['statements']:>6}")
+    print('Note: the SQL figures only cover live attempts; archived ones would add the rollups.')
+
+    print('\nLeaderboards match a recount of attempt history.' if not failures else '\n!! ' + '\n!! '.join(failures))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
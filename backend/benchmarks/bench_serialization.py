@@ -0,0 +1,131 @@
+# benchmarks/bench_serialization.py
+"""
+Response encoding benchmark.
+
+Captures the payloads of the largest endpoints (the objects handed to the JSON
+provider, datetimes included), then reports for each encoder - stdlib json,
+orjson, msgpack, whichever are installed - the encode time and body size, and
+the endpoint's end-to-end p50 when it serves that encoding.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--tier medium] [--iterations 30]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.run import build_app, make_tokens, measure
+
+
+def endpoints(app, ctx, tokens):
+    from benchmarks.seed import create_open_attempt
+
+    with app.app_context():
+        open_attempt = create_open_attempt(ctx['user_id'], ctx['quiz_ids'][0], ctx['questions_per_quiz'])
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    return {
+        'attempts_list': ('/api/attempts/', admin),
+        'quiz_list': ('/api/quizzes/', admin),
+        'quiz_questions': (f"/api/quizzes/{ctx['quiz_ids'][0]}/questions", admin),
+        'attempt_get': (f'/api/user/attempts/{open_attempt}', user),
+        'user_dashboard': ('/api/user/dashboard-data', user),
+        'admin_summary': ('/api/summary/', admin),
+    }
+
+
+def time_encode(encode, payload, budget_s=0.2):
+    """Median microseconds per call over a few timed rounds."""
+    rounds, n = [], 1
+    while True: # Calibrate so a round takes ~budget_s / 5
+        start = time.perf_counter()
+        for _ in range(n):
+            encode(payload)
+        elapsed = time.perf_counter() - start
+        if elapsed > budget_s / 5 or n >= 100000:
+            break
+        n *= 2
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(n):
+            encode(payload)
+        rounds.append((time.perf_counter() - start) / n * 1e6)
+    return statistics.median(rounds)
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Response encoding benchmark')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='medium')
+    parser.add_argument('--iterations', type=int, default=30)
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'serialization.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import seed_database
+    from core import json_provider
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+    client = app.test_client()
+    cases = endpoints(app, ctx, tokens)
+
+    # Capture each payload as the views hand it over
+    captured = {}
+    dumps_bytes = app.json.dumps_bytes
+
+    def recording_dumps_bytes(obj, indent=False):
+        captured.setdefault('obj', obj)
+        return dumps_bytes(obj, indent)
+    app.json.dumps_bytes = recording_dumps_bytes
+    payloads = {}
+    for name, (url, headers) in cases.items():
+        captured.clear()
+        client.get(url, headers=headers)
+        payloads[name] = captured['obj']
+    del app.json.dumps_bytes
+
+    stdlib = json_provider.FastJSONProvider(app)
+    stdlib.use_orjson = False
+    encoders = {'json': lambda o: stdlib.dumps_bytes(o)}
+    modes = {'json': ({'FAST_JSON_ENABLED': False}, 'application/json')}
+    if json_provider.orjson:
+        encoders['orjson'] = lambda o: app.json.dumps_bytes(o)
+        modes['orjson'] = ({'FAST_JSON_ENABLED': True}, 'application/json')
+    if json_provider.msgpack:
+        encoders['msgpack'] = json_provider.dumps_msgpack
+        modes['msgpack'] = ({'FAST_JSON_ENABLED': True}, json_provider.MSGPACK_MIMETYPE)
+    missing = [name for name in ('orjson', 'msgpack') if name not in encoders]
+
+    encode = {name: {enc: (time_encode(fn, payload), len(fn(payload))) for enc, fn in encoders.items()}
+              for name, payload in payloads.items()}
+
+    latency = {}
+    for mode, (config, accept) in modes.items():
+        app.config.update(config)
+        app.json = json_provider.FastJSONProvider(app)
+        for name, (url, headers) in cases.items():
+            hh = {**headers, 'Accept': accept}
+            latency[name, mode] = measure(None, lambda: client.get(url, headers=hh), args.iterations, warmup=2)['p50_ms']
+
+    print(f"\nTier '{args.tier}'" + (f" (not installed: {', '.join(missing)})" if missing else ''))
+    print(f"\n{'endpoint':<16}" + ''.join(f"{enc + ' us':>13}{enc + ' KiB':>13}{enc + ' p50':>13}" for enc in encoders))
+    for name in cases:
+        row = ''
+        for enc in encoders:
+            us, size = encode[name][enc]
+            row += f"{us:>13.1f}{size / 1024:>13.1f}{latency[name, enc]:>13.3f}"
+        print(f"{name:<16}{row}")
+    if 'orjson' in encoders:
+        speedup = statistics.fmean(encode[n]['json'][0] / encode[n]['orjson'][0] for n in cases)
+        print(f"\norjson encodes {speedup:.1f}x faster than json on average.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# benchmarks/bench_startup.py
+"""
+Startup time and memory per app profile.
+
+Each profile is built in a fresh interpreter (cold start, as a worker without
+preloading pays it). 'forked' measures a worker forked from a preloaded
+master, as gunicorn.conf.py does: time to first response and private memory.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--profiles development production worker]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = r'''
+import json, os, resource, time
+start = time.perf_counter()
+from app import create_app
+app = create_app(PROFILE, SQLALCHEMY_DATABASE_URI='sqlite://')
+ready = time.perf_counter() - start
+app.test_client().get('/api/no-such-route')
+print(json.dumps({'startup_ms': ready * 1000, 'first_request_ms': (time.perf_counter() - start) * 1000,
+                  'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+'''
+
+FORKED = r'''
+import json, os, time
+from app import create_app
+app = create_app(PROFILE, SQLALCHEMY_DATABASE_URI='sqlite://')
+read, write = os.pipe()
+start = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    app.test_client().get('/api/no-such-route')
+    elapsed = (time.perf_counter() - start) * 1000
+    private = 0
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith(('Private_Clean', 'Private_Dirty')):
+                    private += int(line.split()[1])
+    except OSError:
+        pass
+    os.write(write, json.dumps({'first_request_ms': elapsed, 'private_kib': private}).encode())
+    os._exit(0)
+os.waitpid(pid, 0)
+print(os.read(read, 4096).decode())
+'''
+
+
+def run_snippet(snippet, profile):
+    code = snippet.replace('PROFILE', repr(profile))
+    out = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def median_of(runs, snippet, profile):
+    samples = [run_snippet(snippet, profile) for _ in range(runs)]
+    return {key: sorted(s[key] for s in samples)[len(samples) // 2] for key in samples[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='App startup benchmark')
+    parser.add_argument('--profiles', nargs='+', default=['development', 'production', 'worker'])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'profile':<14}{'startup ms':>12}{'1st req ms':>12}{'max RSS KiB':>13}")
+    for profile in args.profiles:
+        r = median_of(args.runs, COLD_START, profile)
+        print(f"{profile:<14}{r['startup_ms']:>12.0f}{r['first_request_ms']:>12.0f}{r['max_rss_kib']:>13}")
+
+    if hasattr(os, 'fork'):
+        r = median_of(args.runs, FORKED, 'production')
+        print(f"\nforked worker from a preloaded production master: first request {r['first_request_ms']:.1f} ms, "
+              f"private memory {r['private_kib']} KiB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
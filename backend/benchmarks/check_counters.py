@@ -0,0 +1,170 @@
+# benchmarks/check_counters.py
+"""
+Counter cache consistency check.
+
+Seeds a tier, then drives every path that writes questions or attempts -
+starting a quiz, the admin attempt endpoints, single questions, bulk
+authoring and replacement, cloning, archiving, and set-based deletes (in one
+transaction and in small chunks) - and after each step checks that
+quiz.question_count, quiz.attempt_count, user.attempt_count and the score
+histograms still match a recount from the source tables. Then times the reads
+they replace.
+
+Usage (from backend/):
+    python -m benchmarks.check_counters [--tier small]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from benchmarks.run import build_app, make_tokens, measure
+
+
+def histogram_drift(db):
+    """Quizzes whose score histogram differs from a recount of their submitted attempts."""
+    from collections import Counter
+    from core.models import ArchivedQuizAttempt, QuizAttempt, ScoreHistogram, score_bin
+
+    expected = Counter()
+    for model in (QuizAttempt, ArchivedQuizAttempt):
+        for quiz_id, score, total in db.session.query(model.quiz_id, model.score, model.total_questions)\
+                .filter(model.submitted_at.isnot(None)):
+            expected[(quiz_id, score_bin(score, total))] += 1
+    stored = Counter({(q, b): n for q, b, n in db.session.query(
+        ScoreHistogram.quiz_id, ScoreHistogram.bin, ScoreHistogram.attempt_count) if n})
+    return sorted({quiz_id for (quiz_id, _bin), _count in set(expected.items()) ^ set(stored.items())})
+
+
+def drift(db):
+    """Rows whose counters differ from a recount, as {'quizzes': [...], 'users': [...], 'histograms': [...]}."""
+    from core.counters import attempt_count, question_count
+    from core.models import Quiz, User
+
+    quizzes = db.session.execute(db.select(Quiz.id).where(db.or_(
+        Quiz.question_count != question_count(Quiz.id),
+        Quiz.attempt_count != attempt_count(Quiz, 'quiz_id')))).scalars().all()
+    users = db.session.execute(db.select(User.id).where(
+        User.attempt_count != attempt_count(User, 'user_id'))).scalars().all()
+    return {'quizzes': quizzes, 'users': users, 'histograms': histogram_drift(db)}
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='Counter cache consistency check')
+    parser.add_argument('--tier', choices=sorted(TIERS), default='small')
+    args = parser.parse_args(argv)
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), 'counters.db'),
+                    SLOW_QUERY_THRESHOLD_MS=None)
+    from benchmarks.seed import seed_database
+    from core.archive import archive_old_attempts
+    from core.deletion import delete_in_chunks, delete_now
+    from core.extensions import db
+    from core.models import Question, Quiz, QuizAttempt, User
+
+    with app.app_context():
+        ctx = seed_database(args.tier)
+        tokens = make_tokens(ctx)
+    client = app.test_client()
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    quiz_id, other_quiz = ctx['quiz_ids'][0], ctx['quiz_ids'][1]
+    question = {'text': 'Counter check?', 'options': ['a', 'b', 'c', 'd'], 'correct_option_index': 1}
+
+    def in_app(func, *args, **kwargs):
+        def step():
+            with app.app_context():
+                func(*args, **kwargs)
+        return step
+
+    def last_question():
+        with app.app_context():
+            return db.session.scalar(db.select(db.func.max(Question.id)).where(Question.quiz_id == quiz_id))
+
+    def latest_attempt(submitted):
+        with app.app_context():
+            done = QuizAttempt.submitted_at.isnot(None) if submitted else QuizAttempt.submitted_at.is_(None)
+            return db.session.scalar(db.select(db.func.max(QuizAttempt.id)).where(QuizAttempt.user_id == ctx['user_id'], done))
+
+    def victim_user():
+        with app.app_context():
+            return db.session.scalar(db.select(db.func.max(User.id)))
+
+    def chapter_of(quiz):
+        with app.app_context():
+            return db.session.get(Quiz, quiz).chapter_id
+
+    steps = [
+        ('start quiz', lambda: client.post(f'/api/user/quizzes/{quiz_id}/start', headers=user)),
+        ('submit quiz', lambda: client.post(f'/api/user/attempts/{latest_attempt(False)}', headers=user,
+                                            json={'answers': {}})),
+        ('admin rescores attempt', lambda: client.put(f'/api/attempts/{latest_attempt(True)}', headers=admin,
+                                                      json={'score': 1})),
+        ('admin records submitted', lambda: client.post('/api/attempts/', headers=admin, json={
+            'user_id': ctx['user_id'], 'quiz_id': quiz_id, 'score': 3, 'total_questions': 4,
+            'submitted_at': '2026-01-05T10:00:00'})),
+        ('admin records attempt', lambda: client.post('/api/attempts/', headers=admin, json={
+            'user_id': ctx['user_id'], 'quiz_id': other_quiz, 'score': 1, 'total_questions': 1})),
+        ('admin deletes attempt', lambda: client.delete(
+            f"/api/attempts/{client.get('/api/attempts/', headers=admin).get_json()['attempts'][0]['id']}", headers=admin)),
+        ('add question', lambda: client.post(f'/api/quizzes/{quiz_id}/questions', headers=admin, json=question)),
+        ('delete question', lambda: client.delete(f'/api/questions/{last_question()}', headers=admin)),
+        ('bulk quiz', lambda: client.post('/api/quizzes/bulk', headers=admin, json={
+            'title': 'Counter check', 'chapter_id': 1, 'duration_minutes': 10, 'questions': [question] * 3})),
+        ('replace questions', lambda: client.put(f'/api/quizzes/{other_quiz}/questions?force=true', headers=admin,
+                                                 json={'questions': [question] * 2})),
+        ('clone quiz', lambda: client.post(f'/api/quizzes/{quiz_id}/clone', headers=admin)),
+        ('clone subject', lambda: client.post('/api/subjects/1/clone', headers=admin, json={'name': 'Counter copy'})),
+        ('archive', in_app(archive_old_attempts, horizon_days=90)),
+        ('delete quiz', in_app(delete_now, 'quiz', quiz_id)),
+        ('delete user', in_app(delete_now, 'user', ctx['user_id'])),
+        ('delete chapter in chunks', lambda: in_app(delete_in_chunks, 'chapter', chapter_of(other_quiz), chunk_size=7)()),
+        ('delete user in chunks', lambda: in_app(delete_in_chunks, 'user', victim_user(), chunk_size=7)()),
+    ]
+
+    failures = 0
+    print(f"\nTier '{args.tier}': counters after each write path")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, step in steps:
+            response = step()
+            status = getattr(response, 'status_code', None)
+            with app.app_context():
+                found = drift(db)
+            ok = not any(found.values()) and (status is None or status < 400)
+            failures += not ok
+            sys.__stdout__.write(f"  {name:<28}{'ok' if ok else f'!! HTTP {status}, drifted: {found}'}\n")
+
+    def timed(sql):
+        def call():
+            with app.app_context():
+                db.session.execute(db.text(sql)).all()
+        return measure(None, call, 30, warmup=3)['p50_ms']
+
+    reads = {
+        'empty quizzes': (
+            'SELECT id FROM quiz WHERE NOT EXISTS (SELECT 1 FROM question WHERE question.quiz_id = quiz.id)',
+            'SELECT id FROM quiz WHERE question_count = 0'),
+        'users by attempts': (
+            'SELECT u.id, coalesce(c.n, 0) AS n FROM user u LEFT JOIN (SELECT user_id, sum(n) AS n FROM ('
+            'SELECT user_id, count(*) AS n FROM quiz_attempt GROUP BY user_id UNION ALL '
+            'SELECT user_id, sum(attempt_count) FROM quiz_attempt_rollup GROUP BY user_id) GROUP BY user_id) c '
+            'ON c.user_id = u.id ORDER BY n DESC',
+            'SELECT id, attempt_count FROM user ORDER BY attempt_count DESC'),
+        'quiz percentile + mean': (
+            'SELECT sum(score * 100.0 / total_questions < 50) * 100.0 / count(*), avg(score * 100.0 / total_questions) '
+            f'FROM quiz_attempt WHERE quiz_id = {other_quiz} AND submitted_at IS NOT NULL AND total_questions > 0',
+            f'SELECT bin, attempt_count, percentage_sum FROM quiz_score_histogram WHERE quiz_id = {other_quiz}'),
+    }
+    print(f"\n{'read':<28}{'recount p50':>14}{'counter p50':>14}")
+    for name, (recount, counter) in reads.items():
+        print(f"{name:<28}{timed(recount):>14.3f}{timed(counter):>14.3f}")
+    print('\nCounter caches and histograms match a recount after every write path.' if not failures else f'\n{failures} step(s) failed.')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/check_query_counts.py
+"""
+Locks in the statement counts of the nested read endpoints.
+
+Seeds two tiers whose quizzes differ in size (small: 10 questions per quiz,
+medium: 15, with more subjects, chapters and attempts) and runs every case once
+per tier with SQL_STRICT on, so a request that exceeds its @query_budget or
+repeats a statement SQL_REPEAT_THRESHOLD times fails outright. Exits non-zero
+when a case errors, or when its count changes with the data size (an N+1).
+
+Usage (from backend/):
+    python -m benchmarks.check_query_counts [--tiers small medium]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from benchmarks.run import build_app, make_tokens
+
+
+def cases(app, ctx, tokens):
+    from benchmarks.seed import create_open_attempt
+    from core.activity import rebuild_activity
+
+    quiz_id, per_quiz = ctx['quiz_ids'][0], ctx['questions_per_quiz']
+    answers = {str(q): (q - 1) * 4 + 1 for q in range((quiz_id - 1) * per_quiz + 1, quiz_id * per_quiz + 1)}
+    with app.app_context():
+        open_attempt = create_open_attempt(ctx['user_id'], quiz_id, per_quiz)
+        submit_attempt = create_open_attempt(ctx['user_id'], quiz_id, per_quiz)
+        rebuild_activity()
+    user = {'Authorization': f"Bearer {tokens['user']}"}
+    admin = {'Authorization': f"Bearer {tokens['admin']}"}
+    return {
+        'quiz_questions': ('get', f'/api/quizzes/{quiz_id}/questions', admin, None),
+        'question_detail': ('get', f'/api/questions/{(quiz_id - 1) * per_quiz + 1}', admin, None),
+        'attempt_get': ('get', f'/api/user/attempts/{open_attempt}', user, None),
+        'attempt_submit': ('post', f'/api/user/attempts/{submit_attempt}', user, {'answers': answers}),
+        'user_dashboard': ('get', '/api/user/dashboard-data', user, None),
+        'user_summary': ('get', '/api/user/summary-data', user, None),
+        'admin_summary': ('get', '/api/summary/', admin, None),
+        'quiz_list': ('get', '/api/quizzes/', admin, None),
+        'quiz_detail': ('get', f'/api/quizzes/{quiz_id}', admin, None),
+        'chapter_list': ('get', '/api/chapters/', admin, None),
+        'admin_search': ('get', '/api/search/?q=Quiz', admin, None),
+        'user_activity': ('get', f"/api/admin/users/{ctx['user_id']}/activity", admin, None),
+        'admin_activity': ('get', '/api/summary/activity?start=2024-01-01&end=2026-12-31', admin, None),
+    }
+
+
+def count_tier(tier):
+    from benchmarks.seed import seed_database
+    from core.instrumentation import track_queries
+
+    app = build_app(os.path.join(tempfile.mkdtemp(prefix='quizapp-bench-'), f'{tier}.db'),
+                    SQL_STRICT=True, SLOW_QUERY_THRESHOLD_MS=None)
+    with app.app_context():
+        ctx = seed_database(tier)
+        tokens = make_tokens(ctx)
+    client = app.test_client()
+
+    counts = {}
+    for name, (method, url, headers, body) in cases(app, ctx, tokens).items():
+        client.get('/api/user/dashboard-data', headers=headers) # Warm the identity cache
+        with track_queries() as stats, contextlib.redirect_stdout(io.StringIO()):
+            try:
+                response = getattr(client, method)(url, headers=headers, json=body)
+                counts[name] = stats.count if response.status_code < 400 else f'HTTP {response.status_code}'
+            except Exception as e: # QueryBudgetExceeded
+                counts[name] = f'{type(e).__name__}: {str(e)[:120]}'
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Statement count check for nested endpoints')
+    parser.add_argument('--tiers', nargs='+', default=['small', 'medium'])
+    args = parser.parse_args(argv)
+
+    results = {tier: count_tier(tier) for tier in args.tiers}
+    failures = 0
+    print(f"\n{'endpoint':<18}" + ''.join(f'{tier:>10}' for tier in args.tiers))
+    for name in results[args.tiers[0]]:
+        row = [results[tier][name] for tier in args.tiers]
+        bad = any(not isinstance(c, int) for c in row) or len(set(row)) > 1
+        failures += bad
+        print(f"{name:<18}" + ''.join(f'{str(c)[:10]:>10}' for c in row) + ('   <-- FAIL' if bad else ''))
+        for c in row:
+            if not isinstance(c, int):
+                print(f"    {c}")
+    print(f"\n{failures} failing endpoint(s)." if failures else '\nStatement counts are constant across tiers.')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
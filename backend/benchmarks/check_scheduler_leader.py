@@ -0,0 +1,104 @@
+# benchmarks/check_scheduler_leader.py
+"""
+Multi-process check for scheduler leader election.
+
+Starts several app processes sharing one lock file. Each process registers the
+same two one-shot jobs. The parent kills whichever process won the election
+between the first and second job. A follower must take over, and each job must
+run exactly once across all processes.
+
+Usage (from backend/):
+    python -m benchmarks.check_scheduler_leader [--processes 4]
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import os, sys, time
+from datetime import datetime
+from app import create_app
+from core.scheduler import init_scheduler
+
+lock_path, out_path, first_at, second_at = sys.argv[1], sys.argv[2], float(sys.argv[3]), float(sys.argv[4])
+
+def record(name):
+    def job():
+        with open(out_path, 'a') as f:
+            f.write(f'{name} {os.getpid()}\n')
+    job.__name__ = name
+    return job
+
+app = create_app('testing', SCHEDULER_LOCK_FILE=lock_path, SCHEDULER_LEADER_RETRY=0.2)
+jobs = [dict(id=name, func=record(name), trigger='date', run_date=datetime.fromtimestamp(at))
+        for name, at in (('first', first_at), ('second', second_at))]
+election = init_scheduler(app, jobs=jobs)
+print('leader' if election.is_leader else 'follower', flush=True)
+time.sleep(600)
+'''
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='scheduler leader election check')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--startup', type=float, default=10.0,
+                        help='Seconds allowed for every process to start before the first job fires')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='quizapp-sched-')
+    lock_path, out_path = os.path.join(workdir, 'scheduler.lock'), os.path.join(workdir, 'runs.txt')
+    first_at = time.time() + args.startup
+    second_at = first_at + 3
+
+    procs = [subprocess.Popen([sys.executable, '-c', CHILD, lock_path, out_path, str(first_at), str(second_at)],
+                              cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True)
+             for _ in range(args.processes)]
+    failures = []
+    try:
+        roles = {p.pid: p.stdout.readline().strip() for p in procs}
+        if time.time() > first_at:
+            failures.append('processes took longer than --startup to come up; rerun with a larger value')
+        leaders = [pid for pid, role in roles.items() if role == 'leader']
+        print(f'started {len(procs)} processes, leaders at startup: {leaders}')
+        if len(leaders) != 1:
+            failures.append(f'expected exactly one leader at startup, got {len(leaders)}')
+
+        time.sleep(max(0, first_at - time.time()) + 1)
+        for pid in leaders:
+            print(f'killing leader {pid}')
+            os.kill(pid, signal.SIGKILL)
+        time.sleep(max(0, second_at - time.time()) + 1.5)
+    finally:
+        for p in procs:
+            p.kill()
+            p.wait()
+
+    runs = {}
+    if os.path.exists(out_path):
+        with open(out_path) as f:
+            for line in f:
+                name, pid = line.split()
+                runs.setdefault(name, []).append(int(pid))
+    for name in ('first', 'second'):
+        pids = runs.get(name, [])
+        print(f'{name:<8} ran {len(pids)}x in {pids}')
+        if len(pids) != 1:
+            failures.append(f"job '{name}' ran {len(pids)} times, expected exactly once")
+    if runs.get('second') and runs['second'][0] in leaders:
+        failures.append('second job ran in the killed leader')
+
+    for failure in failures:
+        print(f'FAILED: {failure}')
+    if not failures:
+        print('OK: one scheduler at a time, failover took over the second job')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+# benchmarks/run.py
+"""
+Endpoint benchmark suite.
+
+Seeds a throwaway SQLite database at a scale tier, drives the hot endpoints
+through the Flask test client with real JWTs and reports p50/p95/p99 latency,
+SQL statements per request and peak Python memory for each one.
+
+Usage (from backend/):
+    python -m benchmarks.run --tier small --save benchmarks/baseline.json
+    python -m benchmarks.run --tier small --compare benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Relative slack allowed before a metric counts as a regression.
+LATENCY_TOLERANCE = 1.0
+MEMORY_TOLERANCE = 0.25
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def build_app(db_path, **overrides):
+    """Builds a testing-profile app against a scratch database instead of instance/app.db."""
+    warnings.filterwarnings('ignore', module='jwt')
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    from app import create_app
+    return create_app('testing', SQLALCHEMY_DATABASE_URI=f'sqlite:///{db_path}', **overrides)
+
+
+def define_cases(app, client, ctx, tokens):
+    """Returns {name: (setup, call)}; setup runs outside the timed window."""
+    from benchmarks.seed import create_open_attempt
+    from jobs import export_user_attempts_csv
+
+    user_headers = {'Authorization': f"Bearer {tokens['user']}"}
+    admin_headers = {'Authorization': f"Bearer {tokens['admin']}"}
+    quiz_id = ctx['quiz_ids'][0]
+    per_quiz = ctx['questions_per_quiz']
+    question_ids = range((quiz_id - 1) * per_quiz + 1, quiz_id * per_quiz + 1)
+    answers = {str(q): (q - 1) * 4 + 1 for q in question_ids}
+    with app.app_context():
+        open_attempt = create_open_attempt(ctx['user_id'], quiz_id, per_quiz)
+    state = {}
+
+    def new_attempt():
+        with app.app_context():
+            state['attempt_id'] = create_open_attempt(ctx['user_id'], quiz_id, per_quiz)
+
+    def get(url, headers):
+        return lambda: client.get(url, headers=headers)
+
+    def submit():
+        return client.post(f"/api/user/attempts/{state['attempt_id']}",
+                           json={'answers': answers}, headers=user_headers)
+
+    def export():
+        # Run inside this app's context so the task doesn't bind a worker app of its own.
+        with app.app_context():
+            return export_user_attempts_csv(ctx['user_id'])
+
+    return {
+        'user_dashboard': (None, get('/api/user/dashboard-data', user_headers)),
+        'user_summary': (None, get('/api/user/summary-data', user_headers)),
+        'attempt_get': (None, get(f'/api/user/attempts/{open_attempt}', user_headers)),
+        'attempt_submit': (new_attempt, submit),
+        'admin_summary': (None, get('/api/summary/', admin_headers)),
+        'admin_search': (None, get(f"/api/search/?q={ctx['search_term']}", admin_headers)),
+        'attempts_list': (None, get('/api/attempts/', user_headers)),
+        'export_task': (None, export),
+    }
+
+
+def make_tokens(ctx):
+    """Access tokens for the seeded admin and user, with the claims login would issue."""
+    from flask_jwt_extended import create_access_token
+    from core.extensions import db
+    from core.models import User
+
+    tokens = {}
+    for role, user_id in (('admin', ctx['admin_id']), ('user', ctx['user_id'])):
+        user = db.session.get(User, user_id)
+        claims = {'roles': [r.name for r in user.roles], 'username': user.username}
+        tokens[role] = create_access_token(identity=user.fs_uniquifier, additional_claims=claims)
+    return tokens
+
+
+def measure(setup, call, iterations, warmup):
+    """Runs one case and returns its latency, statement and memory figures."""
+    from core.instrumentation import track_queries
+
+    def run_once():
+        if setup:
+            setup()
+        with track_queries() as stats:
+            start = time.perf_counter()
+            result = call()
+            elapsed = (time.perf_counter() - start) * 1000.0
+        status = getattr(result, 'status_code', 200)
+        if status >= 400:
+            raise RuntimeError(f'request failed with HTTP {status}: {result.get_data(as_text=True)[:200]}')
+        return elapsed, stats.count
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            run_once()
+        samples, statements = [], []
+        for _ in range(iterations):
+            elapsed, count = run_once()
+            samples.append(elapsed)
+            statements.append(count)
+
+        # Peak memory is taken in a separate pass so tracing does not skew latency.
+        if setup:
+            setup()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'statements': max(statements),
+        'peak_kib': round(peak / 1024.0, 1),
+    }
+
+
+def run_tier(tier, iterations, warmup, only=None):
+    from benchmarks.seed import seed_database
+
+    workdir = tempfile.mkdtemp(prefix='quizapp-bench-')
+    app = build_app(os.path.join(workdir, 'bench.db'))
+    exports_before = set(glob.glob(os.path.join(app.instance_path, 'exports', '*')))
+
+    results = {}
+    with app.app_context():
+        started = time.perf_counter()
+        ctx = seed_database(tier)
+        seed_seconds = time.perf_counter() - started
+        tokens = make_tokens(ctx)
+
+    # Requests run without an outer app context so each one gets a fresh `g`, as in production.
+    client = app.test_client()
+    for name, (setup, call) in define_cases(app, client, ctx, tokens).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(setup, call, iterations, warmup)
+
+    for path in set(glob.glob(os.path.join(app.instance_path, 'exports', '*'))) - exports_before:
+        os.remove(path)
+    return {'seed_seconds': round(seed_seconds, 2), 'iterations': iterations, 'endpoints': results}
+
+
+def compare(current, baseline, latency_tolerance=LATENCY_TOLERANCE):
+    """Returns a list of human-readable regressions of current against baseline."""
+    regressions = []
+    for name, now in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        if now['statements'] > before['statements']:
+            regressions.append(f"{name}: SQL statements {before['statements']} -> {now['statements']}")
+        if now['p95_ms'] > before['p95_ms'] * (1 + latency_tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now['peak_kib'] > before['peak_kib'] * (1 + MEMORY_TOLERANCE):
+            regressions.append(f"{name}: peak memory {before['peak_kib']}KiB -> {now['peak_kib']}KiB")
+    return regressions
+
+
+def print_report(tier, result):
+    print(f"\nTier '{tier}' (seeded in {result['seed_seconds']}s, {result['iterations']} iterations)")
+    print(f"{'endpoint':<18}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'SQL':>7}{'peak KiB':>11}")
+    for name, r in result['endpoints'].items():
+        print(f"{name:<18}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['statements']:>7}{r['peak_kib']:>11}")
+
+
+def main(argv=None):
+    from benchmarks.seed import TIERS
+
+    parser = argparse.ArgumentParser(description='QuizApp endpoint benchmarks')
+    parser.add_argument('--tier', choices=sorted(TIERS), action='append',
+                        help='Scale tier to run (repeatable, default: small)')
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', action='append', help='Run only the named endpoint case (repeatable)')
+    parser.add_argument('--save', metavar='PATH', help='Write results to a JSON baseline file')
+    parser.add_argument('--compare', metavar='PATH', nargs='?', const=DEFAULT_BASELINE,
+                        help='Compare against a baseline file and exit non-zero on regressions')
+    parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE,
+                        help='Allowed relative p95 growth before failing (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    tiers = args.tier or ['small']
+    report = {'tiers': {}}
+    for tier in tiers:
+        report['tiers'][tier] = run_tier(tier, args.iterations, args.warmup, args.only)
+        print_report(tier, report['tiers'][tier])
+
+    if args.save:
+        existing = {'tiers': {}}
+        if os.path.exists(args.save):
+            with open(args.save) as f:
+                existing = json.load(f)
+        existing['tiers'].update(report['tiers'])
+        with open(args.save, 'w') as f:
+            json.dump(existing, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = []
+        for tier, result in report['tiers'].items():
+            if tier in baseline.get('tiers', {}):
+                regressions += [f'[{tier}] {r}' for r in compare(result, baseline['tiers'][tier], args.latency_tolerance)]
+        if regressions:
+            print('\nPERFORMANCE REGRESSIONS DETECTED:')
+            for line in regressions:
+                print(f'  !! {line}')
+            return 1
+        print('\nNo regressions against baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
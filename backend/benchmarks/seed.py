@@ -0,0 +1,169 @@
+# benchmarks/seed.py
+import random
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select, update
+from werkzeug.security import generate_password_hash
+
+from core.extensions import db
+from core.models import (User, Role, SecretQuestion, Subject, Chapter, Quiz, Question, Option,
+                         QuizAttempt, AttemptAnswer, ScoreHistogram, score_bin, user_roles)
+
+# --- Scale Tiers ---
+# Every tier keeps 4 options per question. 'attempts' is the total number of
+# quiz_attempt rows; the benchmark user gets its fair share of them.
+TIERS = {
+    'small':  {'users': 50,   'subjects': 5,  'chapters': 4, 'quizzes': 5,  'questions': 10, 'attempts': 5_000},
+    'medium': {'users': 500,  'subjects': 10, 'chapters': 5, 'quizzes': 10, 'questions': 15, 'attempts': 50_000},
+    'large':  {'users': 2000, 'subjects': 20, 'chapters': 8, 'quizzes': 10, 'questions': 20, 'attempts': 500_000},
+}
+
+BENCH_PASSWORD = 'Bench@123'
+BATCH_SIZE = 10_000
+
+
+def _bulk_insert(model_or_table, rows):
+    """Inserts rows in executemany batches, bypassing the ORM unit of work."""
+    for i in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(insert(model_or_table), rows[i:i + BATCH_SIZE])
+
+
+def seed_database(tier_name, rng_seed=42):
+    """
+    Creates the schema and fills it with deterministic data for a scale tier.
+    Returns the ids the benchmark runner needs (users, quizzes, search term).
+    """
+    tier = TIERS[tier_name]
+    rng = random.Random(rng_seed)
+    db.drop_all()
+    db.create_all()
+
+    admin_role = Role(name='admin', description='Administrator')
+    user_role = Role(name='user', description='Regular User')
+    secret_question = SecretQuestion(text='What was the name of your first pet?')
+    db.session.add_all([admin_role, user_role, secret_question])
+    db.session.flush()
+
+    # Hashing is deliberately slow, so every seeded account shares one hash.
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    users = [{
+        'id': 1, 'username': 'bench_admin', 'email': 'bench_admin@example.com',
+        'password_hash': password_hash, 'secret_answer_hash': password_hash,
+        'secret_question_id': secret_question.id, 'active': True,
+        'fs_uniquifier': 'bench-admin-uniquifier', 'created_at': now,
+    }]
+    for i in range(tier['users']):
+        users.append({
+            'id': i + 2, 'username': f'user{i:05d}', 'email': f'user{i:05d}@example.com',
+            'password_hash': password_hash, 'secret_answer_hash': password_hash,
+            'secret_question_id': secret_question.id, 'active': True,
+            'fs_uniquifier': f'bench-user-uniquifier-{i:05d}', 'created_at': now,
+        })
+    _bulk_insert(User, users)
+    _bulk_insert(user_roles, [{'user_id': 1, 'role_id': admin_role.id}] +
+                 [{'user_id': u['id'], 'role_id': user_role.id} for u in users[1:]])
+
+    subjects, chapters, quizzes, questions, options = [], [], [], [], []
+    for s in range(tier['subjects']):
+        subject_id = s + 1
+        subjects.append({'id': subject_id, 'name': f'Subject {s:03d}',
+                         'description': f'Benchmark subject number {s}', 'created_at': now})
+        for c in range(tier['chapters']):
+            chapter_id = len(chapters) + 1
+            chapters.append({'id': chapter_id, 'name': f'Chapter {c:03d}',
+                             'subject_id': subject_id, 'created_at': now})
+            for _ in range(tier['quizzes']):
+                quiz_id = len(quizzes) + 1
+                quizzes.append({'id': quiz_id, 'title': f'Quiz {quiz_id:05d}', 'chapter_id': chapter_id,
+                                'subject_id': subject_id, 'duration_minutes': 30, 'is_active': True, 'created_at': now,
+                                'question_count': tier['questions']})
+                for _ in range(tier['questions']):
+                    question_id = len(questions) + 1
+                    questions.append({'id': question_id, 'text': f'Question {question_id}?', 'quiz_id': quiz_id})
+                    correct = rng.randrange(4)
+                    for o in range(4):
+                        options.append({'id': len(options) + 1, 'text': f'Option {o + 1}',
+                                        'is_correct': o == correct, 'question_id': question_id})
+    _bulk_insert(Subject, subjects)
+    _bulk_insert(Chapter, chapters)
+    _bulk_insert(Quiz, quizzes)
+    _bulk_insert(Question, questions)
+    _bulk_insert(Option, options)
+
+    attempts = []
+    user_ids = [u['id'] for u in users[1:]]
+    for i in range(tier['attempts']):
+        start = now - timedelta(days=rng.randrange(365), minutes=rng.randrange(1440))
+        quiz = quizzes[rng.randrange(len(quizzes))]
+        attempts.append({
+            'id': i + 1, 'user_id': user_ids[i % len(user_ids)],
+            'quiz_id': quiz['id'], 'chapter_id': quiz['chapter_id'], 'subject_id': quiz['subject_id'],
+            'score': rng.randrange(tier['questions'] + 1), 'total_questions': tier['questions'],
+            'start_time': start, 'submitted_at': start + timedelta(minutes=rng.randrange(1, 30)),
+        })
+    _bulk_insert(QuizAttempt, attempts)
+    # Counter caches: the bulk inserts bypass the ORM events that maintain them
+    for model, key in ((Quiz, 'quiz_id'), (User, 'user_id')):
+        counts = Counter(a[key] for a in attempts)
+        db.session.execute(update(model), [{'id': k, 'attempt_count': n} for k, n in counts.items()])
+    # Score histograms, likewise
+    bins = defaultdict(lambda: [0, 0.0])
+    for a in attempts:
+        entry = bins[(a['quiz_id'], score_bin(a['score'], a['total_questions']))]
+        entry[0] += 1
+        entry[1] += a['score'] * 100.0 / a['total_questions']
+    _bulk_insert(ScoreHistogram, [{'quiz_id': quiz_id, 'bin': b, 'attempt_count': n, 'percentage_sum': total}
+                                  for (quiz_id, b), (n, total) in bins.items()])
+    db.session.commit()
+
+    return {
+        'admin_id': 1,
+        'user_id': user_ids[0],
+        'quiz_ids': [q['id'] for q in quizzes],
+        'questions_per_quiz': tier['questions'],
+        'search_term': 'Quiz 0001',
+    }
+
+
+def seed_answers(rng_seed=43):
+    """
+    Fills attempt_answer for the seeded attempts: `score` random questions
+    right, the others a random wrong option or, one time in ten, skipped.
+    Separate from seed_database() because the large tier would add 10M rows.
+    Returns how many answers it wrote.
+    """
+    rng = random.Random(rng_seed)
+    sheets = defaultdict(dict) # quiz_id -> {question_id: [correct option, [wrong options]]}
+    rows = db.session.execute(select(Question.quiz_id, Question.id, Option.id, Option.is_correct)
+                              .join(Option, Option.question_id == Question.id).order_by(Question.id, Option.id))
+    for quiz_id, question_id, option_id, is_correct in rows:
+        entry = sheets[quiz_id].setdefault(question_id, [None, []])
+        if is_correct:
+            entry[0] = option_id
+        else:
+            entry[1].append(option_id)
+    attempts = db.session.execute(select(QuizAttempt.id, QuizAttempt.quiz_id, QuizAttempt.score)
+                                  .where(QuizAttempt.submitted_at.is_not(None)).order_by(QuizAttempt.id)).all()
+    written, batch = 0, []
+    for attempt_id, quiz_id, score in attempts:
+        questions = list(sheets[quiz_id].items())
+        right = set(rng.sample(range(len(questions)), min(score, len(questions))))
+        for i, (question_id, (correct, wrong)) in enumerate(questions):
+            option = correct if i in right else (rng.choice(wrong) if wrong and rng.random() >= 0.1 else None)
+            batch.append({'attempt_id': attempt_id, 'question_id': question_id, 'quiz_id': quiz_id,
+                          'option_id': option, 'is_correct': i in right})
+        if len(batch) >= BATCH_SIZE:
+            _bulk_insert(AttemptAnswer, batch)
+            written, batch = written + len(batch), []
+    _bulk_insert(AttemptAnswer, batch)
+    db.session.commit()
+    return written + len(batch)
+
+
+def create_open_attempt(user_id, quiz_id, total_questions):
+    """Inserts an unsubmitted attempt, as StartQuizAPI would, and returns its id."""
+    attempt = QuizAttempt(user_id=user_id, quiz_id=quiz_id, score=0, total_questions=total_questions)
+    db.session.add(attempt)
+    db.session.commit()
+    return attempt.id
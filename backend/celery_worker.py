@@ -1,3 +1,54 @@
-from celery import Celery
+# celery_worker.py
+from celery import Celery, Task
+from celery.schedules import crontab
+from flask import current_app, has_app_context
+from config import Config
 
-celery = Celery(__name__)
\ No newline at end of file
+_flask_app = None
+
+
+def get_flask_app():
+    """The app tasks run against; a Celery worker process builds its own on first use."""
+    global _flask_app
+    if _flask_app is None:
+        from app import create_app
+        _flask_app = create_app('worker')
+    return _flask_app
+
+
+class ContextTask(Task):
+    def __call__(self, *args, **kwargs):
+        if has_app_context():
+            return self.run(*args, **kwargs)
+        with get_flask_app().app_context():
+            return self.run(*args, **kwargs)
+
+
+# Start a worker with: celery -A celery_worker.celery worker --beat
+celery = Celery(__name__, task_cls=ContextTask, include=['jobs'])
+
+# Define the Celery Beat schedule here
+celery.conf.beat_schedule = {
+    'send-monthly-reports': {
+        'task': 'jobs.send_monthly_reports', 
+        'schedule': crontab(day_of_month='1', hour=8, minute=0), 
+    },
+}
+
+
+def init_celery(app):
+    """Points Celery at the app's broker/backend and runs tasks inside this app's context."""
+    global _flask_app
+    _flask_app = app
+    celery.conf.broker_url = app.config['CELERY_BROKER_URL']
+    celery.conf.result_backend = app.config['CELERY_RESULT_BACKEND']
+    return celery
+
+
+# Web processes import this module on first use from inside a request, so bind to
+# that app; a bare `celery worker` process falls back to the static config.
+if has_app_context():
+    init_celery(current_app._get_current_object())
+else:
+    celery.conf.broker_url = Config.CELERY_BROKER_URL
+    celery.conf.result_backend = Config.CELERY_RESULT_BACKEND
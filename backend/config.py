@@ -7,10 +7,29 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'change-this-jwt-secret-key-now'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    JWT_IDENTITY_CACHE_TTL = 300 # Seconds a resolved token identity (user + roles) stays cached
+    AUTHZ_AUDIT_LOG = os.environ.get('AUTHZ_AUDIT_LOG') # File path; enables the async authorization audit log
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'a-very-secret-key-please-change'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'instance', 'app.db') # Store DB in instance folder
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Engine tuning (see core/database.py). Pool settings apply to file SQLite and DATABASE_URL servers alike.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = 10         # Seconds to wait for a pooled connection before failing
+    DB_POOL_RECYCLE = 1800       # Server databases only
+    SQLITE_TUNING = True         # Apply the pragmas below on every new SQLite connection
+    SQLITE_WAL = True            # journal_mode=WAL + synchronous=NORMAL
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KIB = 16 * 1024 # Per connection
+    # Read routing (see core/routing.py): read_only() views use a replica, or a query_only SQLite connection in WAL mode
+    READ_ROUTING_ENABLED = True
+    SQLALCHEMY_READ_DATABASE_URI = os.environ.get('READ_DATABASE_URL')
+    READ_MAX_STALENESS = 5       # Seconds of replica lag tolerated by default; beyond it reads go to the primary
+    READ_LAG_CHECK_INTERVAL = 1  # Seconds between replica lag measurements
+    READ_POOL_SIZE = 5
+    READ_MAX_OVERFLOW = 10
     WTF_CSRF_ENABLED = True
     SECURITY_PASSWORD_SALT = os.environ.get('SECURITY_PASSWORD_SALT') or 'a-very-secret-salt-change-this'
     REMEMBER_COOKIE_DURATION = timedelta(days=14)
@@ -19,8 +38,77 @@ class Config:
 
     CELERY_BROKER_URL = 'redis://localhost:6379/1' 
     CELERY_RESULT_BACKEND = 'redis://localhost:6379/2'
+    # CSV export jobs (see core/export_jobs.py)
+    EXPORT_EVENTS_URL = 'redis://localhost:6379/0' # Pub/sub for job changes; None makes long-polls re-read the row
+    EXPORT_WAIT_SECONDS = 25       # Longest long-poll; keep it under gunicorn's worker timeout (30 s)
+    EXPORT_WAIT_POLL_INTERVAL = 1.0
+    EXPORT_PROGRESS_EVERY = 1000   # Rows written between progress updates
 
+    # Flask-Caching Configuration for Redis 
+    CACHE_TYPE = 'RedisCache' 
+    CACHE_REDIS_HOST = 'localhost' 
+    CACHE_REDIS_PORT = 6379      
+    CACHE_REDIS_DB = 0         
+    CACHE_REDIS_URL = 'redis://localhost:6379/0' 
+
+    SCHEDULER_ENABLED = True     # Run APScheduler jobs (daily reminders) in this process
     SCHEDULER_API_ENABLED = True
+    SCHEDULER_LOCK_FILE = os.environ.get('SCHEDULER_LOCK_FILE') # Leader-election lock, defaults to instance/scheduler.lock
+    SCHEDULER_LEADER_RETRY = 30  # Seconds between follower lock attempts / leader heartbeats
+    # Attempt archival (see core/archive.py): a nightly job moves old attempts out of quiz_attempt
+    ARCHIVE_ENABLED = True
+    ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', 365)) # Never less than 62 (monthly reports)
+    ARCHIVE_BATCH_SIZE = 1000    # Attempts moved per transaction
+    ARCHIVE_HOUR = 3             # Local hour the archival job runs at
+    # Counter caches (see core/counters.py)
+    COUNTER_RECONCILE_ENABLED = True
+    COUNTER_RECONCILE_HOUR = 4   # Local hour the nightly reconciler runs at
+    BULK_QUIZ_MAX_QUESTIONS = 500 # Per bulk quiz document / question replacement (see core/quiz_authoring.py)
+    # Set-based deletes (see core/deletion.py)
+    DELETE_SYNC_MAX_ROWS = 20000 # Bigger subject/chapter/quiz/user deletes run as a background task
+    DELETE_CHUNK_SIZE = 5000     # Rows per transaction in the background task
+    CLONE_SYNC_MAX_ROWS = 20000  # Bigger quiz/chapter/subject clones run as a background task (see core/cloning.py)
+    # Item analysis (see core/item_analysis.py)
+    ITEM_ANALYSIS_SYNC_MAX_ANSWERS = 200000 # Bigger quizzes are analysed by a background task
+    ITEM_ANALYSIS_CACHE_SECONDS = 3600
+    # Activity trend rollups (see core/activity.py)
+    ACTIVITY_ROLLUP_ENABLED = True
+    ACTIVITY_ROLLUP_MINUTES = 5  # How often the scheduler adds new attempts to the rollups
+    ACTIVITY_ROLLUP_LAG_SECONDS = 120 # Stay this far behind now so attempts still committing aren't skipped
+    ACTIVITY_ROLLUP_BATCH_SIZE = 5000 # Attempts per transaction
+    ACTIVITY_MAX_POINTS = 400    # Default (and ceiling) for buckets per trend series
+    ACTIVITY_LOCK_FILE = None    # flock serializing refreshes/rebuilds off Postgres, defaults to instance/activity.lock
+    # Response encoding (see core/json_provider.py)
+    FAST_JSON_ENABLED = True     # Encode/decode with orjson when it's installed
+    MSGPACK_ENABLED = True       # Serve `Accept: application/msgpack` when msgpack is installed
+    # Compression (see core/compression.py) and the frontend bundle (core/static_assets.py)
+    COMPRESSION_ENABLED = True   # gzip/brotli dynamic responses the client accepts
+    COMPRESS_MIN_SIZE = 1024     # Bytes; smaller bodies aren't worth it
+    COMPRESS_MIMETYPES = ['application/json', 'application/msgpack', 'text/html', 'text/css', 'text/plain',
+                          'text/csv', 'text/javascript', 'application/javascript', 'image/svg+xml']
+    COMPRESS_LEVEL = 6           # gzip
+    COMPRESS_BR_QUALITY = 4      # brotli; precompressed assets use the maximum (11)
+    STATIC_PRECOMPRESS_ON_START = False # `flask precompress-static` after `npm run build` does it once
+    SWAGGER_ENABLED = True       # Serve /apidocs/; the spec itself is built on first request
+    DEBUG_TB_ENABLED = False
+
+    # Per-request SQL instrumentation (see core/instrumentation.py)
+    SQL_INSTRUMENTATION = True
+    SQL_QUERY_BUDGET = None      # Max statements per request, None = unlimited
+    SQL_REPEAT_THRESHOLD = 10    # Flag a statement fingerprint repeated this many times (N+1)
+    SQL_STRICT = False           # Raise QueryBudgetExceeded instead of logging a warning
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 200) # None disables the slow query log
+    SLOW_QUERY_EXPLAIN_TTL = 600 # Seconds before a fingerprint's EXPLAIN plan is captured again
+    SLOW_QUERY_MAX_FINGERPRINTS = 500
+
+    # Opt-in request profiler (see core/profiling.py); when disabled no hooks are installed
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    PROFILING_HEADER = 'X-Profile'   # Admin tokens sending this header get their request profiled
+    PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE') or 0) # Fraction of all requests
+    PROFILING_MODE = 'sampling'      # 'sampling' (collapsed stacks) or 'cprofile' (pstats dump)
+    PROFILING_INTERVAL = 0.001       # Seconds between stack samples
+    PROFILING_DIR = None             # Defaults to instance/profiles
+    PROFILING_MAX_FILES = 200        # Oldest profiles are pruned beyond this
 
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
@@ -35,4 +123,40 @@ class Config:
     "specs_route": "/apidocs/"
 }
 
-DevelopmentConfig = Config 
\ No newline at end of file
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    # Flask-DebugToolbar Configuration
+    DEBUG_TB_ENABLED = True
+    DEBUG_TB_INTERCEPT_REDIRECTS = False
+
+
+class ProductionConfig(Config):
+    DEBUG = False
+    SCHEDULER_API_ENABLED = False
+    SWAGGER_ENABLED = os.environ.get('SWAGGER_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+
+class WorkerConfig(ProductionConfig):
+    """Celery workers: no HTTP-facing extras and never a scheduler of their own."""
+    SCHEDULER_ENABLED = False
+    SWAGGER_ENABLED = False
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'
+    WTF_CSRF_ENABLED = False
+    CACHE_TYPE = 'SimpleCache'
+    EXPORT_EVENTS_URL = None
+    SCHEDULER_ENABLED = False
+    SCHEDULER_API_ENABLED = False
+    SWAGGER_ENABLED = False
+
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'worker': WorkerConfig,
+    'testing': TestingConfig,
+} 
\ No newline at end of file
@@ -0,0 +1,353 @@
+# core/activity.py
+"""
+Activity trends for the admin charts: submitted attempts per subject and
+active users, by hour, day, week and month.
+
+activity_rollup has one row per (level, bucket, subject) - subject 0 being
+every subject together - with the attempt count, score and question sums and
+the number of distinct users. refresh_activity() runs every
+ACTIVITY_ROLLUP_MINUTES on the scheduler and reads only the attempts
+submitted since its watermark (rollup_watermark), in pages ordered by
+(submitted_at, id). Each page is added to all four levels and committed
+together with the new watermark. The job stops ACTIVITY_ROLLUP_LAG_SECONDS
+short of now, so a submission that is still committing isn't skipped.
+Distinct users are counted through activity_presence, which only keeps
+buckets that are still open. Refreshes and rebuilds hold one lock (a
+Postgres advisory lock, or an flock on ACTIVITY_LOCK_FILE elsewhere), so a
+scheduler tick that finds a rebuild running skips instead of counting the
+same attempts twice.
+
+Rollups record activity as it happened. Deleting attempts, quizzes or users
+doesn't take it back. Attempts an admin records with a submitted_at behind
+the watermark only show up after `flask rebuild-activity-rollups`, which
+recomputes everything from quiz_attempt and quiz_attempt_archive.
+
+series() uses the finest level that fits the range in `max_points` buckets,
+so a chart reads at most max_points rows per subject, whether it covers a
+week or three years.
+"""
+import logging
+import os
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, bindparam, delete, insert, or_, select, text, tuple_, update
+from core.extensions import db
+from core.models import ActivityPresence, ActivityRollup, ArchivedQuizAttempt, QuizAttempt, RollupWatermark
+
+try:
+    import fcntl
+except ImportError: # Windows: no flock, runs aren't serialized (as with the scheduler's leader lock)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ('hour', 'day', 'week', 'month') # Finest first
+WATERMARK = 'activity'
+ALL_SUBJECTS = 0
+LOOKUP_CHUNK = 2000 # Buckets or users per IN list
+LOCK_KEY = 0x61637476 # pg_advisory_lock key ('actv')
+
+
+# --- Buckets ---
+
+def bucket(level, moment):
+    """Start of the `level` bucket holding `moment` (naive UTC). Weeks start on Monday."""
+    if level == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if level == 'day':
+        return day
+    if level == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def next_bucket(level, start):
+    if level == 'hour':
+        return start + timedelta(hours=1)
+    if level == 'day':
+        return start + timedelta(days=1)
+    if level == 'week':
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def bucket_count(level, start, end):
+    """How many `level` buckets from the one holding `start` to the one holding `end`."""
+    first, last = bucket(level, start), bucket(level, end)
+    if level == 'month':
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    step = {'hour': 3600, 'day': 86400, 'week': 7 * 86400}[level]
+    return int((last - first).total_seconds()) // step + 1
+
+
+def _naive_utc(moment):
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+
+
+# --- Incremental rollup ---
+
+def _parts(values, size=LOOKUP_CHUNK):
+    """`values` in slices, keeping IN lists under the driver's bind parameter limit."""
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _add(rows):
+    """Adds (id, user_id, subject_id, score, total_questions, submitted_at) attempt rows to every level."""
+    sums = defaultdict(lambda: [0, 0, 0]) # (level, start, subject) -> attempts, score, questions
+    users = set()                          # (level, start, subject, user_id)
+    for _, user_id, subject_id, score, total_questions, submitted_at in rows:
+        submitted_at = _naive_utc(submitted_at)
+        for level in LEVELS:
+            start = bucket(level, submitted_at)
+            for subject in {ALL_SUBJECTS, subject_id or ALL_SUBJECTS}:
+                entry = sums[(level, start, subject)]
+                entry[0] += 1
+                entry[1] += score
+                entry[2] += total_questions
+                users.add((level, start, subject, user_id))
+    buckets = list({(level, start) for level, start, _ in sums})
+
+    presence = ActivityPresence.__table__
+    user_ids = list({user_id for *_, user_id in users})
+    counted = set()
+    for part in _parts(buckets):
+        for users_part in _parts(user_ids):
+            counted.update(db.session.execute(
+                select(presence.c.level, presence.c.bucket_start, presence.c.subject_id, presence.c.user_id)
+                .where(tuple_(presence.c.level, presence.c.bucket_start).in_(part), presence.c.user_id.in_(users_part))))
+    new_users = users - counted
+    if new_users:
+        db.session.execute(insert(presence), [{'level': level, 'bucket_start': start, 'subject_id': subject, 'user_id': user_id}
+                                              for level, start, subject, user_id in new_users])
+    active = Counter((level, start, subject) for level, start, subject, _ in new_users)
+
+    rollup = ActivityRollup.__table__
+    existing = set()
+    for part in _parts(buckets):
+        existing.update(db.session.execute(select(rollup.c.level, rollup.c.bucket_start, rollup.c.subject_id)
+                                           .where(tuple_(rollup.c.level, rollup.c.bucket_start).in_(part))))
+    updates, inserts = [], []
+    for key, (attempts, score, questions) in sums.items():
+        if key in existing:
+            updates.append({'b_level': key[0], 'b_start': key[1], 'b_subject': key[2], 'b_attempts': attempts,
+                            'b_score': score, 'b_total': questions, 'b_active': active[key]})
+        else:
+            inserts.append({'level': key[0], 'bucket_start': key[1], 'subject_id': key[2], 'attempts': attempts,
+                            'score_sum': score, 'total_sum': questions, 'active_users': active[key]})
+    if updates:
+        db.session.execute(
+            update(rollup).where(rollup.c.level == bindparam('b_level'), rollup.c.bucket_start == bindparam('b_start'),
+                                 rollup.c.subject_id == bindparam('b_subject'))
+            .values(attempts=rollup.c.attempts + bindparam('b_attempts'), score_sum=rollup.c.score_sum + bindparam('b_score'),
+                    total_sum=rollup.c.total_sum + bindparam('b_total'),
+                    active_users=rollup.c.active_users + bindparam('b_active')), updates)
+    if inserts:
+        db.session.execute(insert(rollup), inserts)
+
+
+def _columns(model):
+    return select(model.id, model.user_id, model.subject_id, model.score, model.total_questions, model.submitted_at)
+
+
+def _live_page(after_at, after_id, horizon, batch_size):
+    """The next attempts submitted after (after_at, after_id) and no later than `horizon`, oldest first."""
+    after = or_(QuizAttempt.submitted_at > after_at, and_(QuizAttempt.submitted_at == after_at, QuizAttempt.id > after_id))
+    return db.session.execute(
+        _columns(QuizAttempt).where(QuizAttempt.submitted_at >= after_at, QuizAttempt.submitted_at <= horizon, after)
+        .order_by(QuizAttempt.submitted_at, QuizAttempt.id).limit(batch_size)).all()
+
+
+def _prune(horizon):
+    """Forgets who was counted in buckets that ended before `horizon`: nothing can land in them any more."""
+    presence = ActivityPresence.__table__
+    db.session.execute(delete(presence).where(or_(*[
+        and_(presence.c.level == level, presence.c.bucket_start < bucket(level, horizon)) for level in LEVELS])))
+
+
+def _settings(batch_size, now):
+    config = current_app.config
+    now = _naive_utc(now) if now else datetime.now(timezone.utc).replace(tzinfo=None)
+    return (batch_size or config.get('ACTIVITY_ROLLUP_BATCH_SIZE', 5000),
+            now - timedelta(seconds=config.get('ACTIVITY_ROLLUP_LAG_SECONDS', 120)))
+
+
+@contextmanager
+def _exclusive(wait):
+    """
+    Holds the rollup lock for the block; yields False if `wait` is off and
+    someone else has it. The work inside commits page by page, so on Postgres
+    the session-level advisory lock lives on a connection of its own.
+    """
+    engine = db.engine
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as conn:
+            held = conn.execute(text('SELECT pg_advisory_lock(:key)' if wait else 'SELECT pg_try_advisory_lock(:key)'),
+                                {'key': LOCK_KEY}).scalar() is not False
+            try:
+                yield held
+            finally:
+                if held:
+                    conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': LOCK_KEY})
+        return
+    if fcntl is None:
+        yield True
+        return
+    # SQLite lives on one host, so a file lock covers every writer
+    path = current_app.config.get('ACTIVITY_LOCK_FILE') or os.path.join(current_app.instance_path, 'activity.lock')
+    with open(path, 'a') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _catch_up(mark, horizon, batch_size):
+    """Adds live attempts past the watermark up to `horizon`, one committed page at a time. Returns how many."""
+    added = 0
+    while True:
+        rows = _live_page(mark.submitted_at, mark.attempt_id, horizon, batch_size)
+        if rows:
+            _add(rows)
+            mark.submitted_at, mark.attempt_id = rows[-1].submitted_at, rows[-1].id
+        db.session.commit()
+        added += len(rows)
+        if len(rows) < batch_size:
+            return added
+
+
+def refresh_activity(batch_size=None, now=None):
+    """
+    Adds the attempts submitted since the last run to the rollups. The first
+    run (no watermark yet) rebuilds from all history. Skips, returning 0, when
+    another refresh or a rebuild is running. Needs an app context; returns
+    how many attempts it added.
+    """
+    batch_size, horizon = _settings(batch_size, now)
+    with _exclusive(wait=False) as held:
+        if not held:
+            logger.info("Activity rollups are being refreshed or rebuilt elsewhere; skipping this run.")
+            return 0
+        db.session.expire_all() # The watermark as the last holder left it
+        mark = db.session.get(RollupWatermark, WATERMARK)
+        if mark is None:
+            return _rebuild(batch_size, horizon)
+        added = _catch_up(mark, horizon, batch_size)
+        _prune(horizon)
+        db.session.commit()
+        return added
+
+
+def rebuild_activity(batch_size=None, now=None):
+    """
+    Recomputes the rollups from quiz_attempt_archive and quiz_attempt, a
+    page per transaction, and resets the watermark. Waits for a running
+    refresh to finish; refreshes skip until it's done. Charts are incomplete
+    while it runs. Needs an app context; returns how many attempts it added.
+    """
+    batch_size, horizon = _settings(batch_size, now)
+    with _exclusive(wait=True):
+        return _rebuild(batch_size, horizon)
+
+
+def _rebuild(batch_size, horizon):
+    """rebuild_activity with the lock held."""
+    for model in (ActivityRollup, ActivityPresence, RollupWatermark):
+        db.session.execute(delete(model))
+    db.session.commit()
+
+    added, after = 0, 0
+    while True: # Archived attempts by id: the archive has no submitted_at index, and order doesn't matter here
+        rows = db.session.execute(
+            _columns(ArchivedQuizAttempt).where(ArchivedQuizAttempt.id > after, ArchivedQuizAttempt.submitted_at.is_not(None),
+                                                ArchivedQuizAttempt.submitted_at <= horizon)
+            .order_by(ArchivedQuizAttempt.id).limit(batch_size)).all()
+        if rows:
+            _add(rows)
+            after = rows[-1].id
+        db.session.commit()
+        added += len(rows)
+        if len(rows) < batch_size:
+            break
+
+    mark = RollupWatermark(name=WATERMARK, submitted_at=datetime(1970, 1, 1), attempt_id=0)
+    db.session.add(mark)
+    added += _catch_up(mark, horizon, batch_size)
+    _prune(horizon)
+    db.session.commit()
+    logger.info(f"Rebuilt activity rollups from {added} attempts.")
+    return added
+
+
+@click.command('rebuild-activity-rollups')
+@click.option('--batch-size', type=int, default=None, help='Attempts per transaction (default: ACTIVITY_ROLLUP_BATCH_SIZE)')
+@with_appcontext
+def rebuild_activity_command(batch_size):
+    """Recompute the activity trend rollups from attempt history."""
+    print(f"Rebuilt activity rollups from {rebuild_activity(batch_size)} attempts.")
+
+
+# --- Reads ---
+
+def choose_level(start, end, max_points):
+    """The finest level that covers start..end in at most max_points buckets; months otherwise."""
+    for level in LEVELS:
+        if bucket_count(level, start, end) <= max_points:
+            return level
+    return LEVELS[-1]
+
+
+def series(start, end, subject_ids=None, max_points=None):
+    """
+    Trend data from `start` to `end` (naive UTC, both included): one label
+    per bucket, and per bucket the attempts of each subject (all of them, or
+    `subject_ids`), all attempts, active users and the average percentage.
+    Empty buckets are zeros. Reads only activity_rollup.
+    """
+    max_points = max_points or current_app.config.get('ACTIVITY_MAX_POINTS', 400)
+    level = choose_level(start, end, max_points)
+    labels, moment = [], bucket(level, start)
+    while moment <= end and len(labels) < max_points:
+        labels.append(moment)
+        moment = next_bucket(level, moment)
+    position = {label: i for i, label in enumerate(labels)}
+
+    rollup = ActivityRollup.__table__
+    query = select(rollup.c.bucket_start, rollup.c.subject_id, rollup.c.attempts, rollup.c.score_sum,
+                   rollup.c.total_sum, rollup.c.active_users)\
+        .where(rollup.c.level == level, rollup.c.bucket_start >= labels[0], rollup.c.bucket_start <= labels[-1])
+    if subject_ids is not None:
+        query = query.where(rollup.c.subject_id.in_([ALL_SUBJECTS, *subject_ids]))
+    empty = lambda: [0] * len(labels)
+    subjects = defaultdict(empty)
+    attempts, active_users, score_sums, total_sums = empty(), empty(), empty(), empty()
+    for start_at, subject_id, count, score_sum, total_sum, active in db.session.execute(query):
+        i = position.get(start_at)
+        if i is None:
+            continue
+        if subject_id == ALL_SUBJECTS:
+            attempts[i], active_users[i], score_sums[i], total_sums[i] = count, active, score_sum, total_sum
+        else:
+            subjects[subject_id][i] = count
+    return {
+        'level': level, 'labels': [label.isoformat() for label in labels],
+        'attempts': attempts, 'active_users': active_users,
+        'average_percentage': [round(s * 100.0 / t, 2) if t else None for s, t in zip(score_sums, total_sums)],
+        'subjects': dict(subjects),
+    }
+
+
+def watermark():
+    """When the rollups were last brought up to date to: the newest attempt they include."""
+    mark = db.session.get(RollupWatermark, WATERMARK)
+    return mark.submitted_at if mark is not None else None
@@ -0,0 +1,49 @@
+# core/analytics_keys.py
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, or_, select, update
+from core.extensions import db
+from core.models import Chapter, Quiz, QuizAttempt
+
+
+def backfill_analytics_keys(batch_size=5000):
+    """
+    Fills in (and repairs) the denormalized quiz.subject_id and
+    quiz_attempt.chapter_id/subject_id from quiz -> chapter -> subject.
+
+    Attempts are walked in id ranges of `batch_size` with a commit after each,
+    so the writer lock is only ever held briefly. Rows that already match are
+    left alone, which makes the job safe to re-run. Needs an app context.
+    Returns the number of quizzes and attempts that were changed.
+    """
+    chapter_subject = select(Chapter.subject_id).where(Chapter.id == Quiz.chapter_id).scalar_subquery()
+    quizzes = db.session.execute(
+        update(Quiz).where(Quiz.subject_id.is_distinct_from(chapter_subject))
+        .values(subject_id=chapter_subject)
+        .execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+
+    quiz_chapter = select(Quiz.chapter_id).where(Quiz.id == QuizAttempt.quiz_id).scalar_subquery()
+    quiz_subject = select(Quiz.subject_id).where(Quiz.id == QuizAttempt.quiz_id).scalar_subquery()
+    attempts = 0
+    low, high = db.session.query(func.min(QuizAttempt.id), func.max(QuizAttempt.id)).one()
+    if low is not None:
+        for start in range(low, high + 1, batch_size):
+            attempts += db.session.execute(
+                update(QuizAttempt)
+                .where(QuizAttempt.id >= start, QuizAttempt.id < start + batch_size,
+                       or_(QuizAttempt.chapter_id.is_distinct_from(quiz_chapter),
+                           QuizAttempt.subject_id.is_distinct_from(quiz_subject)))
+                .values(chapter_id=quiz_chapter, subject_id=quiz_subject)
+                .execution_options(synchronize_session=False)).rowcount
+            db.session.commit()
+    return {'quizzes': quizzes, 'attempts': attempts}
+
+
+@click.command('backfill-analytics-keys')
+@click.option('--batch-size', default=5000, show_default=True, help='Attempts updated per transaction')
+@with_appcontext
+def backfill_analytics_keys_command(batch_size):
+    """Fill in the denormalized subject/chapter ids on quizzes and attempts."""
+    counts = backfill_analytics_keys(batch_size)
+    print(f"Updated {counts['quizzes']} quizzes and {counts['attempts']} attempts.")
@@ -0,0 +1,176 @@
+# core/archive.py
+import logging
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, func, insert, literal, select, tuple_, union_all
+from core.extensions import db
+from core.models import ArchivedQuizAttempt, AttemptRollup, Chapter, Quiz, QuizAttempt, Subject
+
+logger = logging.getLogger(__name__)
+
+# The monthly reports read last month's attempts from quiz_attempt.
+MIN_HORIZON_DAYS = 62
+
+_ARCHIVED_COLUMNS = ('id', 'user_id', 'quiz_id', 'score', 'total_questions', 'start_time', 'submitted_at')
+
+
+# --- Archival ---
+
+def _merge_rollup(rollup, row):
+    rollup.attempt_count += 1
+    if rollup.best_score is None or row.score > rollup.best_score:
+        rollup.best_score, rollup.best_total = row.score, row.total_questions
+    if row.total_questions > 0:
+        rollup.score_sum += row.score
+        rollup.total_sum += row.total_questions
+        percentage = row.score * 100.0 / row.total_questions
+        if rollup.max_percentage is None or percentage > rollup.max_percentage:
+            rollup.max_percentage = percentage
+    if row.submitted_at is not None and (rollup.last_submitted_at is None or row.submitted_at > rollup.last_submitted_at):
+        rollup.last_submitted_at = row.submitted_at
+    rollup.chapter_id, rollup.subject_id = row.quiz_chapter_id, row.quiz_subject_id
+
+
+def _archive_batch(condition, batch_size):
+    """Moves up to `batch_size` attempts matching `condition` in one transaction; returns how many."""
+    rows = db.session.execute(
+        select(*[getattr(QuizAttempt, c) for c in _ARCHIVED_COLUMNS],
+               Quiz.chapter_id.label('quiz_chapter_id'), Quiz.subject_id.label('quiz_subject_id'))
+        .join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+        .where(condition)
+        .order_by(QuizAttempt.submitted_at, QuizAttempt.id) # Index order, no sort
+        .limit(batch_size)).all()
+    if not rows:
+        return 0
+
+    keys = {(r.user_id, r.quiz_id) for r in rows}
+    rollups = {(r.user_id, r.quiz_id): r for r in AttemptRollup.query.filter(
+        tuple_(AttemptRollup.user_id, AttemptRollup.quiz_id).in_(keys))}
+    for row in rows:
+        rollup = rollups.get((row.user_id, row.quiz_id))
+        if rollup is None:
+            rollup = rollups[(row.user_id, row.quiz_id)] = AttemptRollup(
+                user_id=row.user_id, quiz_id=row.quiz_id, attempt_count=0, score_sum=0, total_sum=0)
+            db.session.add(rollup)
+        _merge_rollup(rollup, row)
+
+    now = datetime.utcnow()
+    db.session.execute(insert(ArchivedQuizAttempt), [
+        dict({c: getattr(r, c) for c in _ARCHIVED_COLUMNS},
+             chapter_id=r.quiz_chapter_id, subject_id=r.quiz_subject_id, archived_at=now)
+        for r in rows])
+    db.session.execute(delete(QuizAttempt).where(QuizAttempt.id.in_([r.id for r in rows]))
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    return len(rows)
+
+
+def archive_old_attempts(horizon_days=None, batch_size=None):
+    """
+    Moves attempts submitted more than `horizon_days` ago (and unsubmitted ones
+    started that long ago) to quiz_attempt_archive, folding each one into
+    quiz_attempt_rollup in the same transaction. Works in batches so the hot
+    table stays writable. Needs an app context; returns the number archived.
+    """
+    config = current_app.config
+    horizon_days = max(horizon_days or config.get('ARCHIVE_HORIZON_DAYS', 365), MIN_HORIZON_DAYS)
+    batch_size = batch_size or config.get('ARCHIVE_BATCH_SIZE', 1000)
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=horizon_days)
+
+    archived = 0
+    # Two conditions rather than COALESCE(submitted_at, start_time) so both use ix_quiz_attempt_submitted_at.
+    for condition in (QuizAttempt.submitted_at < cutoff,
+                      and_(QuizAttempt.submitted_at.is_(None), QuizAttempt.start_time < cutoff)):
+        while True:
+            moved = _archive_batch(condition, batch_size)
+            archived += moved
+            if moved < batch_size:
+                break
+    logger.info(f"Archived {archived} quiz attempts older than {horizon_days} days.")
+    return archived
+
+
+@click.command('archive-attempts')
+@click.option('--horizon-days', type=int, default=None, help='Archive attempts older than this (default: ARCHIVE_HORIZON_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Attempts moved per transaction (default: ARCHIVE_BATCH_SIZE)')
+@with_appcontext
+def archive_attempts_command(horizon_days, batch_size):
+    """Move old quiz attempts to the archive table."""
+    print(f"Archived {archive_old_attempts(horizon_days, batch_size)} attempts.")
+
+
+# --- Live + archived aggregates for the dashboards ---
+
+def subject_attempt_stats():
+    """Subquery of (subject_id, top_score, attempt_count) over live and archived attempts."""
+    combined = union_all(
+        select(QuizAttempt.subject_id.label('subject_id'), func.max(QuizAttempt.score).label('top_score'),
+               func.count().label('attempt_count'))
+        .group_by(QuizAttempt.subject_id),
+        select(AttemptRollup.subject_id, func.max(AttemptRollup.best_score), func.sum(AttemptRollup.attempt_count))
+        .group_by(AttemptRollup.subject_id),
+    ).subquery()
+    return select(combined.c.subject_id, func.max(combined.c.top_score).label('top_score'),
+                  func.sum(combined.c.attempt_count).label('attempt_count'))\
+        .group_by(combined.c.subject_id).subquery()
+
+
+def user_subject_stats(user_id):
+    """
+    Subquery of (subject_id, max_percentage, score_sum, total_sum) for one user's
+    attempts with total_questions > 0, live and archived.
+    """
+    live = and_(QuizAttempt.user_id == user_id, QuizAttempt.total_questions > 0)
+    combined = union_all(
+        select(QuizAttempt.subject_id.label('subject_id'),
+               func.max(QuizAttempt.score * 100.0 / QuizAttempt.total_questions).label('max_percentage'),
+               func.sum(QuizAttempt.score).label('score_sum'),
+               func.sum(QuizAttempt.total_questions).label('total_sum'))
+        .where(live).group_by(QuizAttempt.subject_id),
+        select(AttemptRollup.subject_id, func.max(AttemptRollup.max_percentage),
+               func.sum(AttemptRollup.score_sum), func.sum(AttemptRollup.total_sum))
+        .where(AttemptRollup.user_id == user_id, AttemptRollup.total_sum > 0)
+        .group_by(AttemptRollup.subject_id),
+    ).subquery()
+    return select(combined.c.subject_id, func.max(combined.c.max_percentage).label('max_percentage'),
+                  func.sum(combined.c.score_sum).label('score_sum'),
+                  func.sum(combined.c.total_sum).label('total_sum'))\
+        .group_by(combined.c.subject_id).subquery()
+
+
+def user_quiz_best(user_id):
+    """{quiz_id: {'score', 'total'}} of one user's best archived attempt per quiz."""
+    return {r.quiz_id: {'score': r.best_score, 'total': r.best_total}
+            for r in db.session.query(AttemptRollup.quiz_id, AttemptRollup.best_score, AttemptRollup.best_total)
+                                .filter(AttemptRollup.user_id == user_id)}
+
+
+def attempt_history(user_id, include_archived=False):
+    """
+    Select of one user's attempts, newest first, as (id, quiz_id, score,
+    total_questions, start_time, submitted_at, archived) rows. Archived attempts
+    are only read when asked for.
+    """
+    columns = [getattr(QuizAttempt, c) for c in _ARCHIVED_COLUMNS if c != 'user_id']
+    history = select(*columns, literal(False).label('archived')).where(QuizAttempt.user_id == user_id)
+    if include_archived:
+        archived = [getattr(ArchivedQuizAttempt, c) for c in _ARCHIVED_COLUMNS if c != 'user_id']
+        history = union_all(
+            history,
+            select(*archived, literal(True)).where(ArchivedQuizAttempt.user_id == user_id))
+    history = history.subquery()
+    return select(history).order_by(history.c.submitted_at.desc(), history.c.id.desc())
+
+
+def quiz_labels(quiz_ids):
+    """{quiz_id: row with title, chapter_id, chapter_name, subject_name} in one query."""
+    if not quiz_ids:
+        return {}
+    rows = db.session.query(Quiz.id, Quiz.title, Quiz.chapter_id, Chapter.name.label('chapter_name'),
+                            Subject.name.label('subject_name'))\
+        .join(Chapter, Chapter.id == Quiz.chapter_id).join(Subject, Subject.id == Chapter.subject_id)\
+        .filter(Quiz.id.in_(set(quiz_ids))).all()
+    return {r.id: r for r in rows}
@@ -0,0 +1,78 @@
+# core/authz.py
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from flask import request
+from flask_jwt_extended import get_current_user, get_jwt
+
+logger = logging.getLogger('quizapp.authz')
+audit_logger = logging.getLogger('quizapp.audit')
+
+# --- Role Bits ---
+# One bit per role name; a user's roles collapse into a single int so every
+# authorization check is a bitwise AND.
+ROLE_USER = 1 << 0
+ROLE_ADMIN = 1 << 1
+ROLE_BITS = {'user': ROLE_USER, 'admin': ROLE_ADMIN}
+
+_audit_listener = None
+
+
+def role_mask(role_names):
+    """Collapses an iterable of role names into a bitmask; unknown roles are ignored."""
+    mask = 0
+    for name in role_names:
+        mask |= ROLE_BITS.get(name, 0)
+    return mask
+
+
+def current_identity():
+    """The active user behind the verified token (core/identity.py), or None if it's gone or deactivated."""
+    identity = get_current_user()
+    return identity if identity is not None and identity.active else None
+
+
+def current_access():
+    """
+    (identity, role bitmask) of the token's user. The mask comes from the cached
+    identity (core/identity.py), worked out when it was loaded, rather than the
+    token's `roles` claim, so invalidate_identity() revokes a demoted or
+    deactivated admin straight away. (None, 0) for a deleted or deactivated user.
+    """
+    identity = current_identity()
+    return (identity, identity.role_mask) if identity is not None else (None, 0)
+
+
+def current_role_mask():
+    """Role bitmask of the token's user (0 if it's gone or deactivated)."""
+    return current_access()[1]
+
+
+def audit_enabled():
+    return _audit_listener is not None
+
+
+def audit(decision, required):
+    """Queues an audit record; the file write happens on the listener thread."""
+    audit_logger.info('%s %s %s %s required=%s', decision, get_jwt().get('sub'),
+                      request.method, request.path, required)
+
+
+def init_authz_audit(app):
+    """Starts the asynchronous audit log when AUTHZ_AUDIT_LOG names a file."""
+    global _audit_listener
+    path = app.config.get('AUTHZ_AUDIT_LOG')
+    if not path or _audit_listener is not None:
+        return
+
+    records = queue.SimpleQueue()
+    file_handler = logging.FileHandler(path, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    audit_logger.addHandler(QueueHandler(records))
+    audit_logger.setLevel(logging.INFO)
+    audit_logger.propagate = False
+
+    _audit_listener = QueueListener(records, file_handler)
+    _audit_listener.start()
+    atexit.register(_audit_listener.stop)
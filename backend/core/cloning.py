@@ -0,0 +1,183 @@
+# core/cloning.py
+"""
+Server-side copies of a quiz, chapter or subject with everything under it.
+
+Each level is copied with one `INSERT ... SELECT`, so the rows never leave the
+database. Ids are remapped by offset: every table gets an offset that puts
+the copies above its current max id, and a child's new parent id is its old
+parent id plus the parent table's offset. That only holds if nobody else
+inserts between reading max(id) and the INSERT ... SELECT, so the tables are
+locked first: on Postgres with LOCK TABLE ... IN EXCLUSIVE MODE (reads go on,
+writes wait), on SQLite by the write lock the top-level insert takes. The
+whole clone is one transaction, so the locks last until it commits; past
+CLONE_SYNC_MAX_ROWS rows the views hand it to the `jobs.clone_content` task.
+Attempts are never copied, so the copies' attempt counters start at 0.
+"""
+import logging
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, insert, literal, select, text
+from core.counters import question_count
+from core.extensions import db
+from core.models import Chapter, Option, Question, Quiz, Subject
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('subject', 'chapter', 'quiz')
+# Tables each kind of clone writes, parents first (a fixed order, so concurrent clones can't deadlock)
+WRITES = {'subject': ('subject', 'chapter', 'quiz', 'question', 'option'),
+          'chapter': ('chapter', 'quiz', 'question', 'option'),
+          'quiz': ('quiz', 'question', 'option')}
+
+
+def _sources(kind, obj_id):
+    """Selects of the source chapter, quiz, question and option ids (chapters None for a quiz)."""
+    if kind == 'subject':
+        chapter_ids = select(Chapter.id).where(Chapter.subject_id == obj_id)
+    elif kind == 'chapter':
+        chapter_ids = select(Chapter.id).where(Chapter.id == obj_id)
+    elif kind == 'quiz':
+        chapter_ids = None
+    else:
+        raise ValueError(f"Unknown kind {kind!r}, expected one of {KINDS}")
+    quiz_ids = (select(Quiz.id).where(Quiz.id == obj_id) if chapter_ids is None
+                else select(Quiz.id).where(Quiz.chapter_id.in_(chapter_ids)))
+    question_ids = select(Question.id).where(Question.quiz_id.in_(quiz_ids))
+    option_ids = select(Option.id).where(Option.question_id.in_(question_ids))
+    return {'chapters': chapter_ids, 'quizzes': quiz_ids, 'questions': question_ids, 'options': option_ids}
+
+
+def count_rows(kind, obj_id):
+    """{level: rows a clone would copy}."""
+    counts = {}
+    for label, ids in _sources(kind, obj_id).items():
+        if ids is not None:
+            counts[label] = db.session.execute(select(func.count()).select_from(ids.subquery())).scalar()
+    if kind == 'subject':
+        counts = {'subject': 1, **counts}
+    return counts
+
+
+def needs_background(counts):
+    return sum(counts.values()) > current_app.config.get('CLONE_SYNC_MAX_ROWS', 20000)
+
+
+def _offset(model, source_ids):
+    """What to add to a source id so the copies land above every existing row."""
+    top = db.session.execute(select(func.coalesce(func.max(model.id), 0))).scalar()
+    low = db.session.execute(select(func.min(source_ids.subquery().c.id))).scalar()
+    return top - low + 1 if low is not None else 0
+
+
+def _lock_tables(tables):
+    """
+    Keeps other writers out of `tables` until the transaction ends, so the
+    max(id) an offset is built from is still the max when the rows go in.
+    SQLite needs nothing: the first insert takes the database-wide write lock.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    db.session.execute(text('LOCK TABLE ' + ', '.join(f'"{t}"' for t in tables) + ' IN EXCLUSIVE MODE'))
+
+
+def _sync_sequences(tables):
+    """Postgres hands out ids from a sequence, which the explicit ids above skipped past."""
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for table in tables:
+        db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                f"(SELECT coalesce(max(id), 1) FROM \"{table}\"))"))
+
+
+def _clone(kind, obj_id, name, parent_id):
+    now = datetime.utcnow()
+    sources = _sources(kind, obj_id)
+    copied = {}
+    _lock_tables(WRITES[kind])
+
+    # Top level: a single row whose new id tells us its offset
+    if kind == 'subject':
+        source = db.session.get(Subject, obj_id)
+        new_id = db.session.execute(insert(Subject).values(
+            name=name, description=source.description, created_at=now).returning(Subject.id)).scalar_one()
+        subject_id, copied['subject'] = new_id, 1
+    elif kind == 'chapter':
+        source = db.session.get(Chapter, obj_id)
+        subject_id = parent_id or source.subject_id
+        new_id = db.session.execute(insert(Chapter).values(
+            name=name or source.name, subject_id=subject_id, created_at=now).returning(Chapter.id)).scalar_one()
+        chapter_offset, copied['chapters'] = new_id - obj_id, 1
+    else:
+        source = db.session.get(Quiz, obj_id)
+        chapter = db.session.get(Chapter, parent_id or source.chapter_id)
+        new_id = db.session.execute(insert(Quiz).values(
+            title=name or source.title, chapter_id=chapter.id, subject_id=chapter.subject_id, created_at=now,
+            duration_minutes=source.duration_minutes, is_active=source.is_active,
+            scheduled_date=source.scheduled_date, question_count=question_count(obj_id)).returning(Quiz.id)).scalar_one()
+        quiz_offset, copied['quizzes'] = new_id - obj_id, 1
+
+    if kind == 'subject':
+        chapter_offset = _offset(Chapter, sources['chapters'])
+        copied['chapters'] = db.session.execute(insert(Chapter).from_select(
+            ['id', 'name', 'subject_id', 'created_at'],
+            select(Chapter.id + chapter_offset, Chapter.name, literal(subject_id), literal(now))
+            .where(Chapter.id.in_(sources['chapters'])))).rowcount
+
+    if kind in ('subject', 'chapter'):
+        quiz_offset = _offset(Quiz, sources['quizzes'])
+        copied['quizzes'] = db.session.execute(insert(Quiz).from_select(
+            ['id', 'title', 'chapter_id', 'subject_id', 'created_at', 'duration_minutes', 'is_active', 'scheduled_date',
+             'question_count'],
+            select(Quiz.id + quiz_offset, Quiz.title, Quiz.chapter_id + chapter_offset, literal(subject_id), literal(now),
+                   Quiz.duration_minutes, Quiz.is_active, Quiz.scheduled_date, question_count(Quiz.id))
+            .where(Quiz.id.in_(sources['quizzes'])))).rowcount
+
+    question_offset = _offset(Question, sources['questions'])
+    copied['questions'] = db.session.execute(insert(Question).from_select(
+        ['id', 'text', 'quiz_id'],
+        select(Question.id + question_offset, Question.text, Question.quiz_id + quiz_offset)
+        .where(Question.id.in_(sources['questions'])))).rowcount
+
+    option_offset = _offset(Option, sources['options'])
+    copied['options'] = db.session.execute(insert(Option).from_select(
+        ['id', 'text', 'is_correct', 'question_id'],
+        select(Option.id + option_offset, Option.text, Option.is_correct, Option.question_id + question_offset)
+        .where(Option.id.in_(sources['options'])))).rowcount
+
+    _sync_sequences(WRITES[kind])
+    return new_id, copied
+
+
+def clone_now(kind, obj_id, name=None, parent_id=None):
+    """
+    Copies in a single transaction; returns (new id, {level: rows copied}).
+    `name` is the copy's name/title (required for a subject, whose names are
+    unique); `parent_id` is the chapter (quiz) or subject (chapter) to put it
+    in, defaulting to the source's own.
+    """
+    try:
+        new_id, copied = _clone(kind, obj_id, name, parent_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Cloned {kind} {obj_id} as {new_id}: {copied}")
+    return new_id, copied
+
+
+def clone_or_enqueue(kind, obj_id, name=None, parent_id=None):
+    """
+    What the clone views call. Returns (body, status): 201 with the new id and
+    the rows copied, or 202 with the `jobs.clone_content` task to poll (its
+    result carries `new_id`).
+    """
+    counts = count_rows(kind, obj_id)
+    if not needs_background(counts):
+        new_id, copied = clone_now(kind, obj_id, name, parent_id)
+        return {'id': new_id, 'copied': copied}, 201
+    # Imported on first use so web workers don't load Celery at startup.
+    from jobs import clone_content
+    task = clone_content.delay(kind, obj_id, name, parent_id)
+    logger.info(f"Queued clone of {kind} {obj_id} ({sum(counts.values())} rows) as task {task.id}")
+    return {'task_id': task.id, 'status_url': f'/api/tasks/{task.id}/status', 'rows': counts}, 202
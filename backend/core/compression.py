@@ -0,0 +1,75 @@
+# core/compression.py
+"""
+gzip/brotli for dynamic responses.
+
+An after_request hook compresses bodies of an allowlisted type once they reach
+COMPRESS_MIN_SIZE, using the best encoding the client accepts: brotli when the
+optional `brotli` package is installed, gzip otherwise. File responses
+(send_file / static assets) are left alone; the static ones come precompressed
+from core/static_assets.py.
+"""
+import gzip
+import logging
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def available_encodings():
+    """Supported Content-Encodings, best first."""
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+
+def choose_encoding(accept_encodings, offered):
+    """The first of `offered` the client accepts with the highest quality, or None."""
+    best, best_q = None, 0
+    for encoding in offered:
+        q = accept_encodings[encoding] # Honours '*' and q=0
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config.get('COMPRESS_BR_QUALITY', 4))
+    return gzip.compress(data, compresslevel=config.get('COMPRESS_LEVEL', 6), mtime=0)
+
+
+def init_compression(app):
+    if not app.config.get('COMPRESSION_ENABLED'):
+        return
+    config = app.config
+    mimetypes = frozenset(config.get('COMPRESS_MIMETYPES', ()))
+    min_size = config.get('COMPRESS_MIN_SIZE', 1024)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or request.method == 'HEAD'
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers or response.mimetype not in mimetypes):
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.content_length is not None and response.content_length < min_size:
+            return response
+        encoding = choose_encoding(request.accept_encodings, available_encodings())
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding, config))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag: # A different representation needs a different tag
+            response.set_etag(f'{etag}-{encoding}', weak)
+        return response
+
+    logger.debug(f"Response compression on ({', '.join(available_encodings())}, >= {min_size} bytes)")
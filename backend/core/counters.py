@@ -0,0 +1,101 @@
+# core/counters.py
+"""
+Counter caches: quiz.question_count, quiz.attempt_count and user.attempt_count.
+
+The ORM events at the bottom of core/models.py keep them current for questions
+and attempts written through the session. Writes that go around the ORM
+(bulk authoring, cloning, set-based deletes) adjust them here in the same
+transaction. An attempt counts from the moment it is started until it is
+deleted; archiving doesn't change the counts, because the rollups carry the
+archived attempts. reconcile_counters() recomputes everything from the
+source tables, and runs nightly as a safety net.
+"""
+import logging
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, or_, select, update
+from core.extensions import db
+from core.models import AttemptRollup, Question, Quiz, QuizAttempt, User
+
+logger = logging.getLogger(__name__)
+
+# Counter owner -> the QuizAttempt / AttemptRollup column pointing at it
+_OWNERS = {'quiz': (Quiz, 'quiz_id'), 'user': (User, 'user_id')}
+
+
+def add_questions(quiz_id, delta):
+    """For questions inserted or deleted with Core statements."""
+    db.session.execute(update(Quiz).where(Quiz.id == quiz_id).values(question_count=Quiz.question_count + delta)
+                       .execution_options(synchronize_session=False))
+
+
+def question_count(quiz_id):
+    """The count from the question table, as a scalar subquery. `quiz_id` may be a column."""
+    return select(func.count()).where(Question.quiz_id == quiz_id).scalar_subquery()
+
+
+def _release(table, counted, where, owners):
+    for owner in owners:
+        model, key = _OWNERS[owner]
+        fk = getattr(table.c, key)
+        gone = select(counted).select_from(table).where(where, fk == model.id).scalar_subquery()
+        db.session.execute(
+            update(model).where(model.id.in_(select(fk).where(where)))
+            .values(attempt_count=model.attempt_count - gone)
+            .execution_options(synchronize_session=False))
+
+
+def release_attempts(where, owners):
+    """Before a set-based delete of the quiz_attempt rows matching `where`: takes them off the `owners`' counters."""
+    _release(QuizAttempt.__table__, func.count(), where, owners)
+
+
+def release_rollups(where, owners):
+    """Same for quiz_attempt_rollup rows, which stand for all of their archived attempts."""
+    table = AttemptRollup.__table__
+    _release(table, func.coalesce(func.sum(table.c.attempt_count), 0), where, owners)
+
+
+def attempt_count(model, key):
+    """Live plus archived attempts of each `model` row, as a correlated scalar subquery."""
+    live = select(func.count()).where(getattr(QuizAttempt, key) == model.id).scalar_subquery()
+    rolled = select(func.coalesce(func.sum(AttemptRollup.attempt_count), 0))\
+        .where(getattr(AttemptRollup, key) == model.id).scalar_subquery()
+    return live + rolled
+
+
+def reconcile_counters(batch_size=1000):
+    """
+    Recomputes every counter from the question, attempt and rollup tables and
+    fixes the rows that drifted, `batch_size` ids per transaction. Counters
+    that already match are left alone, so this is cheap to run and safe to
+    re-run. Needs an app context. Returns {'quizzes': n, 'users': n} fixed.
+    """
+    fixed = {}
+    for label, model in (('quizzes', Quiz), ('users', User)):
+        values = {'attempt_count': attempt_count(model, 'quiz_id' if model is Quiz else 'user_id')}
+        if model is Quiz:
+            values['question_count'] = question_count(Quiz.id)
+        drifted = or_(*[getattr(model, column) != expected for column, expected in values.items()])
+        fixed[label] = 0
+        low, high = db.session.query(func.min(model.id), func.max(model.id)).one()
+        if low is None:
+            continue
+        for start in range(low, high + 1, batch_size):
+            fixed[label] += db.session.execute(
+                update(model).where(model.id >= start, model.id < start + batch_size, drifted)
+                .values(values).execution_options(synchronize_session=False)).rowcount
+            db.session.commit()
+    if any(fixed.values()):
+        logger.warning(f"Counter caches had drifted; fixed {fixed['quizzes']} quizzes and {fixed['users']} users.")
+    return fixed
+
+
+@click.command('reconcile-counters')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows checked per transaction')
+@with_appcontext
+def reconcile_counters_command(batch_size):
+    """Recompute the question and attempt counter caches and fix any drift."""
+    fixed = reconcile_counters(batch_size)
+    print(f"Fixed {fixed['quizzes']} quizzes and {fixed['users']} users.")
@@ -0,0 +1,117 @@
+# core/database.py
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and how far it overflows."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.slow_checkouts = 0 # Waited longer than 10ms for a connection
+        self.timeouts = 0
+        self.max_overflow_seen = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            entry = super()._do_get()
+        except Exception:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._metrics_lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            if waited > 0.01:
+                self.slow_checkouts += 1
+            self.max_overflow_seen = max(self.max_overflow_seen, self.overflow())
+        return entry
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'pool_size': self.size(),
+                'checked_out': self.checkedout(),
+                'idle': self.checkedin(),
+                'overflow': self.overflow(),
+                'max_overflow': self._max_overflow,
+                'max_overflow_seen': self.max_overflow_seen,
+                'checkouts': self.checkouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000.0, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000.0, 3),
+                'slow_checkouts': self.slow_checkouts,
+                'timeouts': self.timeouts,
+            }
+
+
+def build_engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database URL. File-backed SQLite
+    and server databases (Postgres via DATABASE_URL) get a bounded, instrumented
+    pool; in-memory SQLite keeps Flask-SQLAlchemy's single shared connection.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {}
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return options
+        # pysqlite's own busy wait; the PRAGMA below sets the same value per connection.
+        options['connect_args'] = {'timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000.0}
+    else:
+        options['pool_pre_ping'] = True
+        options['pool_recycle'] = config.get('DB_POOL_RECYCLE', 1800)
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.get('DB_POOL_SIZE', 10),
+        max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+        pool_timeout=config.get('DB_POOL_TIMEOUT', 10),
+    )
+    return options
+
+
+def _sqlite_pragmas(config):
+    pragmas = []
+    if config.get('SQLITE_WAL', True):
+        # Readers no longer block the writer (and vice versa); NORMAL is durable in WAL mode
+        # except for the last transactions before a power loss.
+        pragmas += ['PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL']
+    pragmas += [
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 0))}",
+        f"PRAGMA cache_size=-{int(config.get('SQLITE_CACHE_SIZE_KIB', 2000))}", # negative = KiB
+        'PRAGMA temp_store=MEMORY',
+    ]
+    return pragmas
+
+
+def init_engine(app, engine):
+    """Installs the per-connection SQLite pragmas on a freshly created engine."""
+    if engine.dialect.name != 'sqlite' or not app.config.get('SQLITE_TUNING', True):
+        return
+    pragmas = _sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def pool_metrics(engine):
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.metrics()
+    return {'pool_class': type(pool).__name__, 'status': pool.status()}
@@ -0,0 +1,194 @@
+# core/deletion.py
+"""
+Set-based deletes of a subject, chapter, quiz or user and everything under it.
+
+The models' ORM cascades load every child row and delete them one by one,
+which doesn't scale to a subject with millions of attempts. Here each table is
+cleared with a single `DELETE ... WHERE <fk> IN (subquery)`, children first, so
+foreign keys hold at every step. Small deletes run in one transaction
+(delete_now). Past DELETE_SYNC_MAX_ROWS rows the views hand the work to the
+`jobs.delete_content` task instead, which calls delete_in_chunks: it deletes
+DELETE_CHUNK_SIZE rows per transaction and reports its progress. Attempts and
+rollups are taken off the other side's counter caches (users' for a quiz
+delete, quizzes' for a user delete) chunk by chunk, just before they go, and
+a user's attempts off the quizzes' score histograms.
+"""
+import logging
+from functools import partial
+
+from flask import current_app
+from sqlalchemy import delete, func, or_, select, update
+from core.counters import release_attempts, release_rollups
+from core.extensions import db
+from core.histograms import release_histograms
+from core.identity import invalidate_identity
+from core.models import (ArchivedQuizAttempt, AttemptAnswer, AttemptRollup, Chapter, ExportJob, Option, Question,
+                         Quiz, QuizAttempt, ScoreHistogram, Subject, User, user_roles)
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('subject', 'chapter', 'quiz', 'user')
+
+
+class Step:
+    """One table's share of a delete: rows of `table` matching `where`."""
+    __slots__ = ('label', 'table', 'where', 'chunk_key', 'release')
+
+    def __init__(self, label, table, where, chunk_key=None, release=None):
+        self.label = label
+        self.table = table
+        self.where = where
+        self.chunk_key = chunk_key # Column to delete by in chunks; None deletes in one statement
+        self.release = release # Called with the rows' condition before they are deleted (counter caches, histograms)
+
+    def count(self):
+        return db.session.execute(select(func.count()).select_from(self.table).where(self.where)).scalar()
+
+    def delete(self, limit=None):
+        where = self.where
+        if limit and self.chunk_key is not None:
+            # Ordered, so release() and the DELETE pick the same rows
+            where = self.chunk_key.in_(
+                select(self.chunk_key).where(self.where).order_by(self.chunk_key).limit(limit).scalar_subquery())
+        if self.release is not None:
+            self.release(where)
+        return db.session.execute(delete(self.table).where(where).execution_options(synchronize_session=False)).rowcount
+
+
+def _releases(*releases):
+    """Several release callbacks as one."""
+    def release(where):
+        for fn in releases:
+            fn(where)
+    return release
+
+
+def _quiz_steps(quiz_ids):
+    """Everything hanging off the quizzes in `quiz_ids` (a select of ids), quizzes last."""
+    question_ids = select(Question.id).where(Question.quiz_id.in_(quiz_ids))
+    return [
+        Step('answers', AttemptAnswer.__table__, AttemptAnswer.quiz_id.in_(quiz_ids), AttemptAnswer.attempt_id),
+        Step('options', Option.__table__, Option.question_id.in_(question_ids), Option.id),
+        Step('questions', Question.__table__, Question.quiz_id.in_(quiz_ids), Question.id),
+        Step('attempts', QuizAttempt.__table__, QuizAttempt.quiz_id.in_(quiz_ids), QuizAttempt.id,
+             partial(release_attempts, owners=('user',))),
+        Step('archived_attempts', ArchivedQuizAttempt.__table__, ArchivedQuizAttempt.quiz_id.in_(quiz_ids),
+             ArchivedQuizAttempt.id),
+        Step('attempt_rollups', AttemptRollup.__table__, AttemptRollup.quiz_id.in_(quiz_ids),
+             release=partial(release_rollups, owners=('user',))),
+        Step('score_histograms', ScoreHistogram.__table__, ScoreHistogram.quiz_id.in_(quiz_ids)),
+        Step('quizzes', Quiz.__table__, Quiz.id.in_(quiz_ids), Quiz.id),
+    ]
+
+
+def plan_delete(kind, obj_id):
+    """The ordered Steps that delete one subject, chapter, quiz or user."""
+    if kind == 'subject':
+        chapter_ids = select(Chapter.id).where(Chapter.subject_id == obj_id)
+        return _quiz_steps(select(Quiz.id).where(Quiz.chapter_id.in_(chapter_ids))) + [
+            Step('chapters', Chapter.__table__, Chapter.subject_id == obj_id),
+            Step('subject', Subject.__table__, Subject.id == obj_id),
+        ]
+    if kind == 'chapter':
+        return _quiz_steps(select(Quiz.id).where(Quiz.chapter_id == obj_id)) + [
+            Step('chapter', Chapter.__table__, Chapter.id == obj_id),
+        ]
+    if kind == 'quiz':
+        return _quiz_steps(select(Quiz.id).where(Quiz.id == obj_id))
+    if kind == 'user':
+        attempt_ids = or_(AttemptAnswer.attempt_id.in_(select(QuizAttempt.id).where(QuizAttempt.user_id == obj_id)),
+                          AttemptAnswer.attempt_id.in_(select(ArchivedQuizAttempt.id).where(ArchivedQuizAttempt.user_id == obj_id)))
+        return [
+            Step('answers', AttemptAnswer.__table__, attempt_ids, AttemptAnswer.attempt_id),
+            Step('attempts', QuizAttempt.__table__, QuizAttempt.user_id == obj_id, QuizAttempt.id,
+                 _releases(partial(release_attempts, owners=('quiz',)),
+                           partial(release_histograms, QuizAttempt.__table__))),
+            Step('archived_attempts', ArchivedQuizAttempt.__table__, ArchivedQuizAttempt.user_id == obj_id,
+                 ArchivedQuizAttempt.id, partial(release_histograms, ArchivedQuizAttempt.__table__)),
+            Step('attempt_rollups', AttemptRollup.__table__, AttemptRollup.user_id == obj_id,
+                 release=partial(release_rollups, owners=('quiz',))),
+            Step('export_jobs', ExportJob.__table__, ExportJob.user_id == obj_id),
+            Step('roles', user_roles, user_roles.c.user_id == obj_id),
+            Step('user', User.__table__, User.id == obj_id),
+        ]
+    raise ValueError(f"Unknown kind {kind!r}, expected one of {KINDS}")
+
+
+def count_rows(kind, obj_id):
+    """{step label: rows it would delete}."""
+    return {step.label: step.count() for step in plan_delete(kind, obj_id)}
+
+
+def needs_background(counts):
+    return sum(counts.values()) > current_app.config.get('DELETE_SYNC_MAX_ROWS', 20000)
+
+
+def deactivate(kind, obj_id):
+    """Takes the content out of use while a background delete runs: no new attempts or logins."""
+    if kind == 'user':
+        fs_uniquifier = db.session.execute(update(User).where(User.id == obj_id).values(active=False)
+                                           .returning(User.fs_uniquifier)).scalar()
+        db.session.commit()
+        invalidate_identity(fs_uniquifier) # Its tokens stop working now, not when the cached identity expires
+        return
+    elif kind in ('subject', 'chapter', 'quiz'):
+        scope = {'subject': Quiz.chapter_id.in_(select(Chapter.id).where(Chapter.subject_id == obj_id)),
+                 'chapter': Quiz.chapter_id == obj_id, 'quiz': Quiz.id == obj_id}[kind]
+        db.session.execute(update(Quiz).where(scope).values(is_active=False).execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def delete_now(kind, obj_id):
+    """Deletes in a single transaction; returns {step label: rows deleted}."""
+    try:
+        deleted = {step.label: step.delete() for step in plan_delete(kind, obj_id)}
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    return deleted
+
+
+def delete_in_chunks(kind, obj_id, chunk_size=None, progress=None):
+    """
+    Deletes `chunk_size` rows per transaction, so locks stay short and memory
+    flat however much is underneath. `progress(done, total, label)` is called
+    after every chunk. Safe to re-run after a failure: it picks up where the
+    committed chunks left off. Returns {step label: rows deleted}.
+    """
+    chunk_size = chunk_size or current_app.config.get('DELETE_CHUNK_SIZE', 5000)
+    steps = plan_delete(kind, obj_id)
+    total = sum(step.count() for step in steps)
+    done, deleted = 0, {}
+    for step in steps:
+        deleted[step.label] = 0
+        while True:
+            moved = step.delete(limit=chunk_size)
+            db.session.commit()
+            deleted[step.label] += moved
+            done += moved
+            if progress:
+                progress(done, total, step.label)
+            if step.chunk_key is None or moved < chunk_size:
+                break
+    db.session.expire_all()
+    logger.info(f"Deleted {kind} {obj_id}: {deleted}")
+    return deleted
+
+
+def delete_or_enqueue(kind, obj_id):
+    """
+    What the DELETE views call. Deletes right away when the content is small;
+    otherwise takes it out of use and queues `jobs.delete_content`. Returns
+    (body, status): 200 with the rows deleted, or 202 with the task to poll.
+    """
+    counts = count_rows(kind, obj_id)
+    if not needs_background(counts):
+        return {'deleted': delete_now(kind, obj_id)}, 200
+    # Imported on first use so web workers don't load Celery at startup.
+    from jobs import delete_content
+    deactivate(kind, obj_id)
+    task = delete_content.delay(kind, obj_id)
+    logger.info(f"Queued deletion of {kind} {obj_id} ({sum(counts.values())} rows) as task {task.id}")
+    return {'task_id': task.id, 'status_url': f'/api/tasks/{task.id}/status', 'rows': counts}, 202
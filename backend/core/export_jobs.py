@@ -0,0 +1,130 @@
+# core/export_jobs.py
+"""
+CSV export jobs: status in the export_job table, change events over Redis.
+
+The Celery task records every state change with update_job(), which bumps the
+row's `version` and publishes it on `export-job:<id>`. The status endpoint
+long-polls with wait_for_job(): it answers as soon as the version differs from
+the one the client already has, or after EXPORT_WAIT_SECONDS with the state
+unchanged. Waiters block on the pub/sub socket, not on the database, and give
+their pooled connection back first. Without Redis (EXPORT_EVENTS_URL unset or
+unreachable) they re-read the row every EXPORT_WAIT_POLL_INTERVAL seconds
+instead.
+
+Each waiter still occupies a sync gunicorn worker for the length of the wait;
+run gunicorn with GUNICORN_WORKER_CLASS=gevent to make that a greenlet.
+"""
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import update
+from core.extensions import db
+from core.models import ExportJob
+
+try:
+    import redis
+except ImportError: # Long-polls fall back to re-reading the row
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ('SUCCESS', 'FAILURE')
+
+
+def _channel(job_id):
+    return f'export-job:{job_id}'
+
+
+def _events(app=None):
+    """The app's Redis client for job events, or None."""
+    app = app or current_app
+    if 'export_events' not in app.extensions:
+        url = app.config.get('EXPORT_EVENTS_URL')
+        app.extensions['export_events'] = redis.Redis.from_url(url) if redis is not None and url else None
+    return app.extensions['export_events']
+
+
+def create_job(user_id):
+    job = ExportJob(id=str(uuid.uuid4()), user_id=user_id, status='PENDING')
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def update_job(job_id, **values):
+    """Commits a state change and tells any waiters about it."""
+    now = datetime.utcnow()
+    if values.get('status') in FINISHED:
+        values['finished_at'] = now
+    db.session.execute(update(ExportJob).where(ExportJob.id == job_id)
+                       .values(version=ExportJob.version + 1, updated_at=now, **values)
+                       .execution_options(synchronize_session=False))
+    db.session.commit()
+    events = _events()
+    if events is not None:
+        try:
+            events.publish(_channel(job_id), '1')
+        except redis.RedisError as e: # Waiters still see it at their timeout
+            logger.warning(f"Could not publish export job event for {job_id}: {e}")
+
+
+def serialize_job(job):
+    return {
+        'id': job.id, 'status': job.status, 'version': job.version,
+        'done': job.done, 'total': job.total,
+        'progress': round(job.done * 100.0 / job.total, 1) if job.total else (100.0 if job.status == 'SUCCESS' else 0.0),
+        'filename': job.filename, 'download_url': f'/exports/{job.filename}' if job.filename else None,
+        'error': job.error, 'created_at': job.created_at, 'finished_at': job.finished_at,
+    }
+
+
+def _load(job_id, user_id):
+    job = db.session.get(ExportJob, job_id, populate_existing=True)
+    return serialize_job(job) if job is not None and job.user_id == user_id else None
+
+
+def _changed(job, version):
+    return job is None or job['version'] != version or job['status'] in FINISHED
+
+
+def wait_for_job(job_id, user_id, version=None, timeout=0):
+    """
+    The job as a dict (None if it isn't this user's), once its version differs
+    from `version` or `timeout` seconds have passed. `version=None` or a zero
+    timeout answers right away.
+    """
+    timeout = min(timeout, current_app.config.get('EXPORT_WAIT_SECONDS', 25))
+    job = _load(job_id, user_id)
+    if version is None or timeout <= 0 or _changed(job, version):
+        return job
+    db.session.close() # Don't hold a pooled connection while waiting
+    deadline = time.monotonic() + timeout
+
+    events = _events()
+    if events is not None:
+        pubsub = events.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(_channel(job_id))
+            job = _load(job_id, user_id) # Re-read once subscribed, so a change in between isn't missed
+            db.session.close()
+            while not _changed(job, version) and time.monotonic() < deadline:
+                if pubsub.get_message(timeout=max(deadline - time.monotonic(), 0.01)) is not None:
+                    job = _load(job_id, user_id)
+                    db.session.close()
+            return job
+        except redis.RedisError as e:
+            logger.warning(f"Export job events unavailable, polling instead: {e}")
+        finally:
+            pubsub.close()
+
+    interval = current_app.config.get('EXPORT_WAIT_POLL_INTERVAL', 1.0)
+    while time.monotonic() < deadline:
+        time.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+        job = _load(job_id, user_id)
+        db.session.close()
+        if _changed(job, version):
+            break
+    return job
@@ -3,8 +3,13 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_caching import Cache
 from flask_wtf.csrf import CSRFProtect
 from flask_mail import Mail
+from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
+from core.routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession}) # read_only() views may read from a replica
 cache = Cache()
 csrf = CSRFProtect() 
-mail = Mail()
\ No newline at end of file
+mail = Mail()
+jwt = JWTManager()
+migrate = Migrate()
@@ -0,0 +1,125 @@
+# core/histograms.py
+"""
+Per-quiz score histograms: percentile rank, mean and distribution without
+scanning quiz_attempt.
+
+quiz_score_histogram holds, for each quiz, SCORE_BINS bins over
+score/total_questions with the number of submitted attempts in each and the
+sum of their percentages. The ORM events in core/models.py keep it current as
+attempts are submitted, re-scored and deleted; set-based deletes call
+release_histograms(). Reading a quiz's distribution is one primary-key range
+of at most SCORE_BINS rows, however many attempts there are.
+
+rebuild_histograms() recomputes everything from quiz_attempt and
+quiz_attempt_archive (`flask rebuild-score-histograms`, or the
+jobs.rebuild_score_histograms task).
+"""
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, case, delete, func, insert, literal, select, union_all, update
+from core.extensions import db
+from core.models import SCORE_BINS, ArchivedQuizAttempt, Quiz, QuizAttempt, ScoreHistogram, score_bin
+
+BIN_WIDTH = 100.0 / SCORE_BINS
+
+
+def bin_expr(score, total_questions):
+    """score_bin() in SQL; integer division on SQLite and Postgres alike."""
+    return case((total_questions <= 0, literal(0)),
+                (score >= total_questions, literal(SCORE_BINS - 1)),
+                else_=score * SCORE_BINS // total_questions)
+
+
+def percentage_expr(score, total_questions):
+    return case((total_questions > 0, score * 100.0 / total_questions), else_=literal(0.0))
+
+
+def release_histograms(table, where):
+    """Before a set-based delete of the attempt rows of `table` (live or archived) matching `where`."""
+    hist = ScoreHistogram.__table__
+    leaving = and_(where, table.c.submitted_at.is_not(None), table.c.quiz_id == hist.c.quiz_id,
+                   bin_expr(table.c.score, table.c.total_questions) == hist.c.bin)
+    count = select(func.count()).select_from(table).where(leaving).scalar_subquery()
+    percentages = select(func.coalesce(func.sum(percentage_expr(table.c.score, table.c.total_questions)), 0))\
+        .select_from(table).where(leaving).scalar_subquery()
+    db.session.execute(
+        update(hist).where(hist.c.quiz_id.in_(select(table.c.quiz_id).where(where)))
+        .values(attempt_count=hist.c.attempt_count - count, percentage_sum=hist.c.percentage_sum - percentages)
+        .execution_options(synchronize_session=False))
+
+
+# --- Reads ---
+
+def load_histograms(quiz_ids):
+    """{quiz_id: ([count per bin], percentage sum)} for the given quizzes, in one query."""
+    histograms = {}
+    hist = ScoreHistogram.__table__ # Core rows: a summary page can read a thousand of these
+    rows = db.session.execute(select(hist.c.quiz_id, hist.c.bin, hist.c.attempt_count, hist.c.percentage_sum)
+                              .where(hist.c.quiz_id.in_(list(quiz_ids)), hist.c.attempt_count > 0))
+    for quiz_id, bin, count, percentages in rows:
+        if quiz_id not in histograms:
+            histograms[quiz_id] = ([0] * SCORE_BINS, [0.0])
+        counts, total = histograms[quiz_id]
+        if 0 <= bin < SCORE_BINS:
+            counts[bin] = count
+        total[0] += percentages
+    return {quiz_id: (counts, total[0]) for quiz_id, (counts, total) in histograms.items()}
+
+
+def describe(histogram, score=None, total_questions=None):
+    """
+    Attempt count, mean percentage and bin counts of one histogram, plus the
+    percentile rank of `score` out of `total_questions` if given: the share of
+    attempts in lower bins, counting half of those in the same bin.
+    """
+    counts, percentages = histogram or ([0] * SCORE_BINS, 0.0)
+    attempts = sum(counts)
+    result = {'attempts': attempts, 'mean': round(percentages / attempts, 2) if attempts else None,
+              'bin_width': BIN_WIDTH, 'bins': counts}
+    if score is not None:
+        own = score_bin(score, total_questions)
+        result['percentile_rank'] = round((sum(counts[:own]) + counts[own] / 2.0) * 100 / attempts, 1) if attempts else None
+    return result
+
+
+def quiz_distribution(quiz_id, score=None, total_questions=None):
+    return describe(load_histograms([quiz_id]).get(quiz_id), score, total_questions)
+
+
+# --- Rebuild ---
+
+def _rebuild_range(start, stop):
+    in_range = lambda column: and_(column >= start, column < stop)
+    db.session.execute(delete(ScoreHistogram).where(in_range(ScoreHistogram.quiz_id))
+                       .execution_options(synchronize_session=False))
+    attempts = union_all(*[
+        select(model.quiz_id.label('quiz_id'), bin_expr(model.score, model.total_questions).label('bin'),
+               percentage_expr(model.score, model.total_questions).label('percentage'))
+        .where(model.submitted_at.is_not(None), in_range(model.quiz_id))
+        for model in (QuizAttempt, ArchivedQuizAttempt)]).subquery()
+    db.session.execute(insert(ScoreHistogram).from_select(
+        ['quiz_id', 'bin', 'attempt_count', 'percentage_sum'],
+        select(attempts.c.quiz_id, attempts.c.bin, func.count(), func.sum(attempts.c.percentage))
+        .group_by(attempts.c.quiz_id, attempts.c.bin)))
+    db.session.commit()
+
+
+def rebuild_histograms(batch_size=200):
+    """
+    Recomputes every quiz's histogram from the live and archived attempts,
+    `batch_size` quiz ids per transaction. Needs an app context. Returns how
+    many quizzes have one.
+    """
+    low, high = db.session.query(func.min(Quiz.id), func.max(Quiz.id)).one()
+    if low is not None:
+        for start in range(low, high + 1, batch_size):
+            _rebuild_range(start, start + batch_size)
+    return db.session.query(func.count(func.distinct(ScoreHistogram.quiz_id))).scalar()
+
+
+@click.command('rebuild-score-histograms')
+@click.option('--batch-size', default=200, show_default=True, help='Quizzes rebuilt per transaction')
+@with_appcontext
+def rebuild_histograms_command(batch_size):
+    """Recompute the per-quiz score histograms from attempt history."""
+    print(f"Rebuilt score histograms for {rebuild_histograms(batch_size)} quizzes.")
@@ -0,0 +1,93 @@
+# core/identity.py
+import logging
+from flask import current_app, g
+from sqlalchemy.orm import joinedload
+from core.authz import role_mask
+from core.extensions import cache
+from core.models import User
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_IDENTITY_PREFIX = 'jwt_identity_' # Will be suffixed with the user's fs_uniquifier
+
+
+class UserIdentity:
+    """Lightweight, cacheable stand-in for the User row behind a JWT."""
+    __slots__ = ('id', 'username', 'email', 'active', 'fs_uniquifier', 'roles', 'role_mask')
+    CACHED = ('id', 'username', 'email', 'active', 'fs_uniquifier', 'roles')
+
+    def __init__(self, id, username, email, active, fs_uniquifier, roles):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.active = active
+        self.fs_uniquifier = fs_uniquifier
+        self.roles = frozenset(roles)
+        self.role_mask = role_mask(self.roles) # What authorization checks read (core/authz.py)
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.active, user.fs_uniquifier,
+                   [role.name for role in user.roles])
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.CACHED}
+        data['roles'] = sorted(self.roles)
+        return data
+
+    def has_role(self, role_name):
+        return role_name in self.roles
+
+    def __repr__(self):
+        return f'<UserIdentity {self.username}>'
+
+
+def _cache_get(key):
+    # Authentication must keep working when the cache backend (Redis) is down.
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Identity cache read failed: {e}")
+        return None
+
+
+def _cache_set(key, value):
+    try:
+        cache.set(key, value, timeout=current_app.config.get('JWT_IDENTITY_CACHE_TTL', 300))
+    except Exception as e:
+        logger.warning(f"Identity cache write failed: {e}")
+
+
+def load_identity(fs_uniquifier):
+    """
+    Resolves the identity behind a token subject. The result is memoized on `g` for the
+    rest of the request and cached across requests for JWT_IDENTITY_CACHE_TTL seconds.
+    None for a deactivated user (e.g. one being deleted), so its tokens are refused.
+    """
+    memo = g.setdefault('jwt_identities', {})
+    if fs_uniquifier in memo:
+        return memo[fs_uniquifier]
+
+    cache_key = f'{CACHE_KEY_IDENTITY_PREFIX}{fs_uniquifier}'
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        identity = UserIdentity(**cached)
+    else:
+        user = User.query.options(joinedload(User.roles)).filter_by(fs_uniquifier=fs_uniquifier).first()
+        identity = UserIdentity.from_user(user) if user else None
+        if identity:
+            _cache_set(cache_key, identity.as_dict())
+
+    if identity is not None and not identity.active:
+        identity = None
+    memo[fs_uniquifier] = identity
+    return identity
+
+
+def invalidate_identity(fs_uniquifier):
+    """Drops a cached identity; call whenever a user's account, roles or password change."""
+    g.get('jwt_identities', {}).pop(fs_uniquifier, None)
+    try:
+        cache.delete(f'{CACHE_KEY_IDENTITY_PREFIX}{fs_uniquifier}')
+    except Exception as e:
+        logger.warning(f"Identity cache invalidation failed: {e}")
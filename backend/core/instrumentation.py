@@ -0,0 +1,196 @@
+# core/instrumentation.py
+import contextvars
+import json
+import logging
+import re
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('quizapp.sql')
+
+_current_stats = contextvars.ContextVar('quizapp_query_stats', default=None)
+# Engine -> SlowQueryRecorder (core/slow_queries.py); looked up only once a statement has finished
+_slow_query_recorders = weakref.WeakKeyDictionary()
+
+# --- Statement Fingerprinting ---
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PYFORMAT_PARAM = re.compile(r'%\(\w+\)s')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """Normalizes a SQL statement so that calls differing only in literals compare equal."""
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _PYFORMAT_PARAM.sub('?', statement)
+    statement = _IN_LIST.sub('(?)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request exceeds its query budget or repeats a statement."""
+
+
+class QueryStats:
+    """Statement count, DB time and fingerprints gathered for one unit of work."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, duration):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.total_time += duration
+            stats.statements[statement] += 1
+            stats = stats.parent
+
+    @property
+    def fingerprints(self):
+        # Bound parameters keep ORM statements textually identical, so raw text is
+        # counted on the hot path and only normalized when someone asks.
+        merged = Counter()
+        for statement, n in self.statements.items():
+            merged[fingerprint(statement)] += n
+        return merged
+
+    def repeated(self, threshold):
+        """Fingerprints issued at least `threshold` times - the usual N+1 signature."""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+    def as_dict(self, repeat_threshold=2):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.total_time * 1000.0, 3),
+            'repeated': [{'statement': fp, 'count': n} for fp, n in self.repeated(repeat_threshold)],
+        }
+
+
+def current_stats():
+    """Returns the QueryStats collecting for the active request or block, if any."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries():
+    """Collects statements issued inside the block (nested blocks also count towards outer ones)."""
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def query_budget(max_queries):
+    """Overrides SQL_QUERY_BUDGET for a single view or flask-restful method."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            g.query_budget = max_queries
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- SQLAlchemy Engine Events ---
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('quizapp_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('quizapp_query_start')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+    if _slow_query_recorders:
+        recorder = _slow_query_recorders.get(conn.engine)
+        if recorder is not None and duration >= recorder.threshold:
+            recorder.record(statement, parameters, duration, executemany)
+
+
+def install_engine_listeners():
+    """Registers the cursor timing listeners once per process, for every Engine."""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def register_slow_query_recorder(engine, recorder):
+    install_engine_listeners()
+    _slow_query_recorders[engine] = recorder
+
+
+def _check_budget(app, stats):
+    """Returns a list of budget violations for the finished request."""
+    problems = []
+    budget = g.get('query_budget', app.config.get('SQL_QUERY_BUDGET'))
+    if budget is not None and stats.count > budget:
+        problems.append(f'{stats.count} queries exceeds the budget of {budget}')
+    threshold = app.config.get('SQL_REPEAT_THRESHOLD')
+    if threshold:
+        for fp, n in stats.repeated(threshold):
+            problems.append(f'statement repeated {n} times: {fp[:200]}')
+    return problems
+
+
+def init_query_instrumentation(app):
+    """Counts and times every statement per request; exposes it via Server-Timing and the log."""
+    if not app.config.get('SQL_INSTRUMENTATION', True):
+        return
+
+    install_engine_listeners()
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats(parent=_current_stats.get())
+        g.query_stats_token = _current_stats.set(g.query_stats)
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        timing = f'db;dur={stats.total_time * 1000.0:.2f};desc="{stats.count} queries"'
+        existing = response.headers.get('Server-Timing')
+        response.headers['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        problems = _check_budget(app, stats)
+        # Clean requests are only logged at DEBUG: a line per request is overhead we don't want in production
+        if not problems and not logger.isEnabledFor(logging.DEBUG):
+            return response
+        record = {'endpoint': request.endpoint, 'method': request.method, 'path': request.path,
+                  'status': response.status_code, **stats.as_dict()}
+        if problems:
+            record['violations'] = problems
+            logger.warning(json.dumps(record))
+            if app.config.get('SQL_STRICT'):
+                raise QueryBudgetExceeded(f'{request.method} {request.path}: ' + '; '.join(problems))
+        else:
+            logger.debug(json.dumps(record))
+        return response
+
+    @app.teardown_request
+    def _stop_query_stats(exc):
+        token = g.pop('query_stats_token', None)
+        if token is not None:
+            try:
+                _current_stats.reset(token)
+            except ValueError:
+                _current_stats.set(None)
@@ -0,0 +1,297 @@
+# core/item_analysis.py
+"""
+Item analysis over the stored answers (attempt_answer): how hard each
+question is, how well it separates strong from weak attempts, how often each
+option is picked, and the quiz's reliability.
+
+Choices are graded against the current answer key, not the stored
+is_correct, so fixing a key shows up in the next analysis. Per question,
+over the attempts that answered it:
+  difficulty      share answered correctly (p)
+  discrimination  point-biserial correlation between getting it right and the
+                  rest of the attempt's score (the question itself left out)
+  options         share of attempts picking each option, plus `skipped`, and
+                  the choosers' average score on the rest of the quiz
+and for the quiz, Cronbach's alpha (KR-20, the items being right/wrong).
+
+Everything is derived from a few sums per question - answers, correct
+answers, and the sums of attempt totals, squared totals and totals of the
+correct ones - so answers are streamed in chunks ordered by attempt and
+never held in memory at once. With numpy installed each chunk is reduced
+with bincount; without it a plain loop produces exactly the same sums.
+
+Results are cached per quiz for ITEM_ANALYSIS_CACHE_SECONDS. Quizzes with
+more than ITEM_ANALYSIS_SYNC_MAX_ANSWERS answers are analysed by the
+jobs.analyze_quiz_items task instead of in the request.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from math import sqrt
+
+from flask import current_app
+from sqlalchemy import func, select
+from core.extensions import cache, db
+from core.models import AttemptAnswer, Option, Question
+
+try:
+    import numpy as np
+except ImportError: # The pure-Python loop gives the same results, slower
+    np = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = 'item_analysis_'
+CHUNK_SIZE = 100000 # Answers fetched and reduced at a time
+
+# Flag thresholds
+TOO_EASY = 0.95
+TOO_HARD = 0.2
+WEAK_DISCRIMINATION = 0.2
+MIN_DISTRACTOR_RATE = 0.05 # Rarer distractors are too noisy to compare with the key
+
+
+def analysis_key(quiz_id):
+    return f'{CACHE_KEY_PREFIX}{quiz_id}'
+
+
+def forget_analysis(quiz_id):
+    """After a quiz's questions change; the next request recomputes."""
+    cache.delete(analysis_key(quiz_id))
+
+
+# --- Sums ---
+
+class _Sums:
+    """What the statistics need, per question index and over attempts."""
+    def __init__(self, questions, options):
+        self.answered = [0] * questions
+        self.correct = [0] * questions
+        self.totals = [0] * questions         # Sum of the answering attempts' totals
+        self.squares = [0] * questions        # ... of their squares
+        self.correct_totals = [0] * questions # ... of the totals of attempts answering correctly
+        self.picks = [[0] * (options + 1) for _ in range(questions)] # Column 0 is "skipped"
+        self.pick_totals = [[0] * (options + 1) for _ in range(questions)] # Sum of the choosers' totals
+        self.attempts = 0
+        self.attempt_totals = 0
+        self.attempt_squares = 0
+
+
+def _chunks(quiz_id):
+    """
+    Lists of (attempt_id, question_id, option_id or 0) ordered by attempt,
+    never splitting one: keyset pages of CHUNK_SIZE rows off the covering index,
+    less the trailing attempt, which starts the next page. Plain DBAPI tuples -
+    building a Row per answer would cost more than all the arithmetic.
+    """
+    t = AttemptAnswer.__table__
+    columns = select(t.c.attempt_id, t.c.question_id, func.coalesce(t.c.option_id, 0))\
+        .where(t.c.quiz_id == quiz_id).order_by(t.c.attempt_id).limit(CHUNK_SIZE)
+    after = None
+    while True:
+        result = db.session.execute(columns if after is None else columns.where(t.c.attempt_id > after))
+        rows = result.cursor.fetchall()
+        result.close()
+        if len(rows) < CHUNK_SIZE:
+            if rows:
+                yield rows
+            return
+        cut = len(rows)
+        while cut and rows[cut - 1][0] == rows[-1][0]:
+            cut -= 1
+        # An attempt has at most BULK_QUIZ_MAX_QUESTIONS answers, far below a page, so cut > 0
+        yield rows[:cut or len(rows)]
+        after = rows[(cut or len(rows)) - 1][0]
+
+
+def _python_sums(chunks, question_index, option_index, keys, sums):
+    def close(group):
+        total = sum(correct for _, _, correct in group)
+        sums.attempts += 1
+        sums.attempt_totals += total
+        sums.attempt_squares += total * total
+        for q, o, correct in group:
+            sums.answered[q] += 1
+            sums.totals[q] += total
+            sums.squares[q] += total * total
+            sums.picks[q][o] += 1
+            sums.pick_totals[q][o] += total
+            if correct:
+                sums.correct[q] += 1
+                sums.correct_totals[q] += total
+
+    current, group = None, []
+    for chunk in chunks:
+        for attempt_id, question_id, option_id in chunk:
+            q = question_index.get(question_id)
+            if q is None:
+                continue
+            if attempt_id != current:
+                if group:
+                    close(group)
+                current, group = attempt_id, []
+            o = option_index.get(option_id, 0)
+            group.append((q, o, o in keys))
+    if group:
+        close(group)
+
+
+def _numpy_sums(chunks, question_index, option_index, keys, sums):
+    question_ids = np.array(sorted(question_index), dtype=np.int64)
+    option_ids = np.array(sorted(option_index), dtype=np.int64) # Includes 0, "skipped"
+    questions, width = len(question_ids), len(option_ids)
+    is_key = np.array([option_index[option_id] in keys for option_id in option_ids.tolist()])
+    acc = {name: np.zeros(questions) for name in ('answered', 'correct', 'totals', 'squares', 'correct_totals')}
+    picks, pick_totals = np.zeros(questions * width), np.zeros(questions * width)
+    for chunk in chunks:
+        rows = np.fromiter(chain.from_iterable(chunk), dtype=np.int64, count=3 * len(chunk)).reshape(-1, 3)
+        _reduce(rows, question_ids, option_ids, is_key, acc, picks, pick_totals, sums)
+    for name, values in acc.items():
+        setattr(sums, name, [int(v) for v in values])
+    # Rows of `picks` follow the sorted question ids; map them back to question_index order
+    picks, pick_totals = picks.reshape(questions, width), pick_totals.reshape(questions, width)
+    for position, question_id in enumerate(question_ids.tolist()):
+        q = question_index[question_id]
+        for column, option_id in enumerate(option_ids.tolist()):
+            sums.picks[q][option_index[option_id]] = int(picks[position, column])
+            sums.pick_totals[q][option_index[option_id]] = int(pick_totals[position, column])
+
+
+def _reduce(rows, question_ids, option_ids, is_key, acc, picks, pick_totals, sums):
+    if not len(rows):
+        return
+    q = np.searchsorted(question_ids, rows[:, 1])
+    known = (q < len(question_ids)) & (question_ids[np.minimum(q, len(question_ids) - 1)] == rows[:, 1])
+    rows, q = rows[known], q[known]
+    if not len(rows):
+        return
+    o = np.searchsorted(option_ids, rows[:, 2])
+    o = np.where((o < len(option_ids)) & (option_ids[np.minimum(o, len(option_ids) - 1)] == rows[:, 2]), o, 0)
+    correct = is_key[o].astype(np.float64)
+    # Rows are ordered by attempt: number the attempts, then total them
+    starts = np.flatnonzero(np.r_[True, rows[1:, 0] != rows[:-1, 0]])
+    attempt = np.cumsum(np.r_[True, rows[1:, 0] != rows[:-1, 0]]) - 1
+    per_attempt = np.add.reduceat(correct, starts)
+    total = per_attempt[attempt]
+    n = len(question_ids)
+    acc['answered'] += np.bincount(q, minlength=n)
+    acc['correct'] += np.bincount(q, weights=correct, minlength=n)
+    acc['totals'] += np.bincount(q, weights=total, minlength=n)
+    acc['squares'] += np.bincount(q, weights=total * total, minlength=n)
+    acc['correct_totals'] += np.bincount(q, weights=correct * total, minlength=n)
+    choice = q * len(option_ids) + o
+    picks += np.bincount(choice, minlength=len(picks))
+    pick_totals += np.bincount(choice, weights=total, minlength=len(picks))
+    sums.attempts += len(starts)
+    sums.attempt_totals += int(per_attempt.sum())
+    sums.attempt_squares += int((per_attempt * per_attempt).sum())
+
+
+# --- Statistics ---
+
+def _item(question, options, sums, q):
+    n, right = sums.answered[q], sums.correct[q]
+    item = {'question_id': question.id, 'text': question.text, 'answered': n,
+            'difficulty': None, 'discrimination': None, 'skipped': None, 'options': [], 'flags': []}
+    if not n:
+        return item, 0.0
+    p = right / n
+    variance = p * (1 - p)
+    mean_total = sums.totals[q] / n
+    cov_total = sums.correct_totals[q] / n - p * mean_total
+    total_variance = sums.squares[q] / n - mean_total * mean_total
+    rest_variance = total_variance + variance - 2 * cov_total # Variance of the score without this question
+    r = (cov_total - variance) / sqrt(variance * rest_variance) if variance > 0 and rest_variance > 1e-12 else None
+    picks, pick_totals = sums.picks[q], sums.pick_totals[q]
+    # Each option's choosers' average score on the rest of the quiz
+    rests = [(pick_totals[column] - (picks[column] if option.is_correct else 0)) / picks[column] if picks[column] else None
+             for option, column in options]
+    item.update(difficulty=round(p, 4), discrimination=round(r, 4) if r is not None else None,
+                skipped=round(picks[0] / n, 4),
+                options=[{'option_id': option.id, 'text': option.text, 'is_correct': option.is_correct,
+                          'rate': round(picks[column] / n, 4), 'mean_rest_score': round(rest, 4) if rest is not None else None}
+                         for (option, column), rest in zip(options, rests)])
+    flags = item['flags']
+    if right == 0:
+        flags.append('nobody_correct')
+    elif p < TOO_HARD:
+        flags.append('too_hard')
+    elif p >= TOO_EASY:
+        flags.append('too_easy')
+    if r is not None and r < 0:
+        flags.append('negative_discrimination') # Stronger attempts get it wrong more often: check the key
+    elif r is not None and r < WEAK_DISCRIMINATION:
+        flags.append('weak_discrimination')
+    key = max((rest for (option, _), rest in zip(options, rests) if option.is_correct and rest is not None), default=None)
+    if key is not None and any(not option.is_correct and picks[column] >= MIN_DISTRACTOR_RATE * n and rest > key
+                               for (option, column), rest in zip(options, rests)):
+        flags.append('distractor_outscores_key') # Its choosers do better on the rest of the quiz than the key's
+    return item, variance
+
+
+def analyze_quiz(quiz_id, engine=None):
+    """
+    Item statistics for one quiz from its stored answers. `engine` forces
+    'numpy' or 'python'; by default numpy is used when it's installed.
+    """
+    started = time.perf_counter()
+    engine = engine or ('numpy' if np is not None else 'python')
+    questions = Question.query.filter_by(quiz_id=quiz_id).order_by(Question.id).all()
+    question_index = {question.id: q for q, question in enumerate(questions)}
+    options = {}
+    for option in db.session.query(Option).filter(Option.question_id.in_(list(question_index))).order_by(Option.id):
+        options.setdefault(option.question_id, []).append(option)
+    option_index = {0: 0}
+    for option_list in options.values():
+        for option in option_list:
+            option_index[option.id] = len(option_index)
+    keys = {option_index[option.id] for option_list in options.values() for option in option_list if option.is_correct}
+    sums = _Sums(len(questions), len(option_index) - 1)
+    (_numpy_sums if engine == 'numpy' else _python_sums)(_chunks(quiz_id), question_index, option_index, keys, sums)
+
+    items, variances = [], 0.0
+    for q, question in enumerate(questions):
+        item, variance = _item(question, [(o, option_index[o.id]) for o in options.get(question.id, [])], sums, q)
+        items.append(item)
+        variances += variance
+    scored = sum(1 for item in items if item['answered'])
+    alpha = None
+    if sums.attempts and scored > 1:
+        mean = sums.attempt_totals / sums.attempts
+        total_variance = sums.attempt_squares / sums.attempts - mean * mean
+        if total_variance > 1e-12:
+            alpha = round(scored / (scored - 1) * (1 - variances / total_variance), 4)
+    return {'quiz_id': quiz_id, 'attempts': sums.attempts, 'answers': sum(sums.answered), 'alpha': alpha,
+            'questions': items, 'engine': engine, 'seconds': round(time.perf_counter() - started, 3),
+            'computed_at': datetime.now(timezone.utc).isoformat()}
+
+
+# --- Cached entry points ---
+
+def analyze_now(quiz_id):
+    """Computes, caches and returns a quiz's analysis."""
+    result = analyze_quiz(quiz_id)
+    cache.set(analysis_key(quiz_id), result, timeout=current_app.config.get('ITEM_ANALYSIS_CACHE_SECONDS', 3600))
+    return result
+
+
+def analysis_or_enqueue(quiz, refresh=False):
+    """
+    What the admin view calls. Returns (body, status): 200 with the cached or
+    freshly computed analysis, or 202 with the `jobs.analyze_quiz_items` task
+    to poll - the result is cached when it finishes, so asking again serves it.
+    """
+    if not refresh:
+        cached = cache.get(analysis_key(quiz.id))
+        if cached is not None:
+            return cached, 200
+    # Answers are at most attempts x questions; the counter caches say so without counting rows
+    estimate = (quiz.attempt_count or 0) * (quiz.question_count or 0)
+    if estimate <= current_app.config.get('ITEM_ANALYSIS_SYNC_MAX_ANSWERS', 200000):
+        return analyze_now(quiz.id), 200
+    # Imported on first use so web workers don't load Celery at startup.
+    from jobs import analyze_quiz_items
+    task = analyze_quiz_items.delay(quiz.id)
+    logger.info(f"Queued item analysis of quiz {quiz.id} (up to {estimate} answers) as task {task.id}")
+    return {'task_id': task.id, 'status_url': f'/api/tasks/{task.id}/status', 'answers': estimate}, 202
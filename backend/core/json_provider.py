@@ -0,0 +1,111 @@
+# core/json_provider.py
+"""
+JSON (and MessagePack) encoding for every response.
+
+FastJSONProvider replaces Flask's provider, so jsonify(), request.get_json()
+and the flask-restful representations (core/restful.py) all share one encoder:
+orjson when it's installed, the stdlib otherwise. Both write datetimes as ISO
+8601, like .isoformat(), so views can return datetime values as they are.
+
+MessagePack (`Accept: application/msgpack`) needs the msgpack package; without
+it clients just get JSON.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask import g
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0 # Dicts keyed by ids, e.g. correct_answers
+
+
+def _default(o):
+    """Types neither encoder handles natively (the stdlib handles none of these)."""
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def msgpack_available(app):
+    return msgpack is not None and app.config.get('MSGPACK_ENABLED', True)
+
+
+def dumps_msgpack(obj):
+    return msgpack.packb(obj, default=_default)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False # Keep the order the views build their dicts in (and skip the sort)
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and app.config.get('FAST_JSON_ENABLED', True)
+
+    def _indent(self):
+        return (self.compact is None and self._app.debug) or self.compact is False
+
+    def dumps_bytes(self, obj, indent=False):
+        if self.use_orjson:
+            option = _ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if self.sort_keys else 0)
+            return orjson.dumps(obj, default=_default, option=option)
+        return self._dumps_stdlib(obj, indent).encode()
+
+    def _dumps_stdlib(self, obj, indent=False, **kwargs):
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        if indent:
+            kwargs.setdefault('indent', 2)
+        else:
+            kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode()
+        return self._dumps_stdlib(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        """jsonify(); packs MessagePack instead when the Api view negotiated it (see core/restful.py)."""
+        obj = self._prepare_response_obj(args, kwargs)
+        if g.get('response_mimetype') == MSGPACK_MIMETYPE:
+            return self._app.response_class(dumps_msgpack(obj), mimetype=MSGPACK_MIMETYPE)
+        body = self.dumps_bytes(obj, indent=self._indent()) + b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Installs FastJSONProvider as app.json."""
+    app.json = FastJSONProvider(app)
+    app.logger.debug(f"JSON encoder: {'orjson' if app.json.use_orjson else 'json'}, "
+                     f"msgpack {'on' if msgpack_available(app) else 'off'}")
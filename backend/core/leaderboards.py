@@ -0,0 +1,268 @@
+# core/leaderboards.py
+"""
+Per-quiz and per-subject leaderboards, kept in sorted sets.
+
+A quiz board ranks users by their best percentage on that quiz; a subject
+board by the sum of their best percentages over its quizzes. Scores are
+stored in hundredths of a percent so the subject sums stay exact integers.
+record_attempt() updates both boards when an attempt is submitted and
+returns the user's standing on each, so nothing ever sorts quiz_attempt.
+
+With a Redis cache (CACHE_TYPE='RedisCache') the boards are Redis sorted sets
+on the cache's own connection: one Lua call per submission, O(log n) rank
+lookups, top-k with ZREVRANGE. Otherwise (SimpleCache in tests and local
+runs) they live in this process, in bisect-sorted lists.
+
+Only submissions add to a board. Deleted attempts, quizzes and users stay on
+it until the next rebuild (`flask rebuild-leaderboards` or the
+jobs.rebuild_leaderboards task), which streams all history back in;
+deleted users are skipped when a board is read.
+"""
+import logging
+import threading
+from bisect import bisect_left, insort
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Integer, case, cast, func, literal, select, union_all
+from core.extensions import cache, db
+from core.models import AttemptRollup, Quiz, QuizAttempt
+
+try:
+    import redis
+except ImportError: # Only the in-process boards are available
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('quiz', 'subject')
+
+
+def board_key(kind, obj_id):
+    return f'leaderboard:{kind}:{obj_id}'
+
+
+def attempt_points(score, total_questions):
+    """An attempt's percentage in hundredths, rounded half up. rebuild_leaderboards() computes the same in SQL."""
+    return (score * 20000 + total_questions) // (2 * total_questions) if total_questions > 0 else 0
+
+
+# --- Backends ---
+
+# Raises a member's quiz score to `points` if that's a new best, adds the
+# difference to its subject score, and returns score, rank and board size
+# for both (the subject ones are nil without a subject key).
+_RECORD = """
+local member, points = ARGV[1], tonumber(ARGV[2])
+local old = tonumber(redis.call('ZSCORE', KEYS[1], member))
+if old == nil or points > old then
+    redis.call('ZADD', KEYS[1], points, member)
+    if KEYS[2] then redis.call('ZINCRBY', KEYS[2], points - (old or 0), member) end
+end
+local out = {}
+for i, key in ipairs(KEYS) do
+    local score = redis.call('ZSCORE', key, member)
+    out[#out + 1] = score
+    out[#out + 1] = redis.call('ZCOUNT', key, '(' .. score, '+inf') + 1
+    out[#out + 1] = redis.call('ZCARD', key)
+end
+return out
+"""
+
+_STANDING = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score then return {false, false, redis.call('ZCARD', KEYS[1])} end
+return {score, redis.call('ZCOUNT', KEYS[1], '(' .. score, '+inf') + 1, redis.call('ZCARD', KEYS[1])}
+"""
+
+
+class _RedisBoards:
+    def __init__(self, client):
+        self.client = client
+        self._record = client.register_script(_RECORD)
+        self._standing = client.register_script(_STANDING)
+
+    def record(self, keys, member, points):
+        out = self._record(keys=keys, args=[member, points])
+        return [(int(float(out[i])), out[i + 1], out[i + 2]) for i in range(0, len(out), 3)]
+
+    def standing(self, key, member):
+        score, rank, size = self._standing(keys=[key], args=[member])
+        return (int(float(score)) if score else None), rank, size
+
+    def top(self, key, limit):
+        return [(int(member), int(score)) for member, score in self.client.zrevrange(key, 0, limit - 1, withscores=True)]
+
+    def rebuild(self, batches):
+        """Loads (key, member, points) batches into fresh keys, then swaps them in for all current boards."""
+        for stale in self.client.scan_iter(match='leaderboard:*:rebuild', count=1000):
+            self.client.delete(stale)
+        built = set()
+        for batch in batches:
+            pipe = self.client.pipeline(transaction=False)
+            for key, member, points in batch:
+                pipe.zincrby(f'{key}:rebuild', points, member)
+                built.add(key)
+            pipe.execute()
+        pipe = self.client.pipeline() # MULTI: readers see the old boards or the new ones
+        for key in self.client.scan_iter(match='leaderboard:*', count=1000):
+            key = key.decode() if isinstance(key, bytes) else key
+            if key not in built and not key.endswith(':rebuild'):
+                pipe.delete(key)
+        for key in built:
+            pipe.rename(f'{key}:rebuild', key)
+        pipe.execute()
+        return len(built)
+
+
+class _Board:
+    """A sorted set: member -> points, plus (-points, member) pairs kept in order for rank and top-k."""
+    def __init__(self):
+        self.points = {}
+        self.order = []
+
+    def add(self, member, points):
+        old = self.points.get(member)
+        if old is not None:
+            del self.order[bisect_left(self.order, (-old, member))]
+        self.points[member] = points
+        insort(self.order, (-points, member))
+
+    def standing(self, member):
+        points = self.points.get(member)
+        rank = bisect_left(self.order, (-points,)) + 1 if points is not None else None
+        return points, rank, len(self.order)
+
+
+class _MemoryBoards:
+    """The same operations on per-process boards, for tests and single-process runs."""
+    def __init__(self):
+        self.boards = {}
+        self.lock = threading.Lock()
+
+    def record(self, keys, member, points):
+        with self.lock:
+            quiz = self.boards.setdefault(keys[0], _Board())
+            old = quiz.points.get(member)
+            if old is None or points > old:
+                quiz.add(member, points)
+                if len(keys) > 1:
+                    subject = self.boards.setdefault(keys[1], _Board())
+                    subject.add(member, subject.points.get(member, 0) + points - (old or 0))
+            return [self.boards[key].standing(member) for key in keys]
+
+    def standing(self, key, member):
+        with self.lock:
+            return self.boards.get(key, _Board()).standing(member)
+
+    def top(self, key, limit):
+        with self.lock:
+            return [(int(member), -points) for points, member in self.boards.get(key, _Board()).order[:limit]]
+
+    def rebuild(self, batches):
+        boards = {}
+        for batch in batches:
+            for key, member, points in batch:
+                board = boards.setdefault(key, _Board())
+                board.add(member, board.points.get(member, 0) + points)
+        with self.lock:
+            self.boards = boards
+        return len(boards)
+
+
+def _boards(app=None):
+    app = app or current_app
+    if 'leaderboards' not in app.extensions:
+        client = getattr(cache.cache, '_write_client', None) # Set only by the Redis cache backends
+        app.extensions['leaderboards'] = _RedisBoards(client) if client is not None and redis is not None else _MemoryBoards()
+    return app.extensions['leaderboards']
+
+
+def _errors():
+    return (redis.RedisError,) if redis is not None else ()
+
+
+# --- Reads and writes ---
+
+def _standing(points, rank, size):
+    return {'rank': rank, 'of': size, 'score': points / 100.0 if points is not None else None}
+
+
+def record_attempt(attempt):
+    """
+    Puts a submitted attempt on its quiz's and subject's boards. Returns the
+    user's {'quiz': standing, 'subject': standing}, or None if the boards are
+    unreachable - the submission itself has already been committed.
+    """
+    if attempt.submitted_at is None:
+        return None
+    keys = [board_key('quiz', attempt.quiz_id)]
+    if attempt.subject_id is not None:
+        keys.append(board_key('subject', attempt.subject_id))
+    try:
+        standings = _boards().record(keys, str(attempt.user_id), attempt_points(attempt.score, attempt.total_questions))
+    except _errors() as e:
+        logger.warning(f"Leaderboard update failed for attempt {attempt.id}: {e}")
+        return None
+    return dict(zip(KINDS, [_standing(*s) for s in standings]))
+
+
+def standing(kind, obj_id, user_id):
+    """{'rank', 'of', 'score'} for one user; rank and score are None if they aren't on the board."""
+    return _standing(*_boards().standing(board_key(kind, obj_id), str(user_id)))
+
+
+def top(kind, obj_id, limit=10):
+    """The first `limit` entries as [{'rank', 'user_id', 'score'}]; equal scores share a rank."""
+    entries = []
+    for position, (user_id, points) in enumerate(_boards().top(board_key(kind, obj_id), limit)):
+        rank = entries[-1]['rank'] if entries and points == entries[-1]['points'] else position + 1
+        entries.append({'rank': rank, 'user_id': user_id, 'points': points})
+    return [{'rank': e['rank'], 'user_id': e['user_id'], 'score': e['points'] / 100.0} for e in entries]
+
+
+# --- Rebuild ---
+
+def _best_rows():
+    """Each user's best points per quiz, over submitted live attempts and archived rollups."""
+    live = select(QuizAttempt.user_id, QuizAttempt.quiz_id, case(
+        (QuizAttempt.total_questions > 0,
+         (QuizAttempt.score * 20000 + QuizAttempt.total_questions) // (2 * QuizAttempt.total_questions)),
+        else_=literal(0)).label('points')).where(QuizAttempt.submitted_at.is_not(None))
+    archived = select(AttemptRollup.user_id, AttemptRollup.quiz_id,
+                      cast(func.coalesce(AttemptRollup.max_percentage, 0) * 100 + 0.5, Integer).label('points'))
+    every = union_all(live, archived).subquery()
+    best = select(every.c.user_id, every.c.quiz_id, func.max(every.c.points).label('points'))\
+        .group_by(every.c.user_id, every.c.quiz_id).subquery()
+    return select(best.c.quiz_id, Quiz.subject_id, best.c.user_id, best.c.points)\
+        .join(Quiz, Quiz.id == best.c.quiz_id)
+
+
+def _batches(batch_size):
+    rows = db.session.execute(_best_rows().execution_options(yield_per=batch_size))
+    for chunk in rows.partitions():
+        batch = []
+        for quiz_id, subject_id, user_id, points in chunk:
+            batch.append((board_key('quiz', quiz_id), str(user_id), points))
+            if subject_id is not None:
+                batch.append((board_key('subject', subject_id), str(user_id), points))
+        yield batch
+
+
+def rebuild_leaderboards(batch_size=5000):
+    """
+    Recomputes every board from quiz_attempt and quiz_attempt_rollup, streaming
+    `batch_size` rows at a time, and replaces the current boards with them.
+    Submissions that land while it runs may be missing afterwards; they're
+    back on the next rebuild. Needs an app context. Returns how many boards.
+    """
+    return _boards().rebuild(_batches(batch_size))
+
+
+@click.command('rebuild-leaderboards')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows streamed per batch')
+@with_appcontext
+def rebuild_leaderboards_command(batch_size):
+    """Rebuild the quiz and subject leaderboards from attempt history."""
+    print(f"Rebuilt {rebuild_leaderboards(batch_size)} leaderboards.")
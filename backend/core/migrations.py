@@ -0,0 +1,30 @@
+# core/migrations.py
+import click
+import sqlalchemy as sa
+from flask.cli import with_appcontext
+from flask_migrate import stamp, upgrade
+from core.extensions import db
+
+# Revision matching the schema db.create_all() produced before migrations existed.
+BASELINE_REVISION = '0001_baseline'
+
+
+def upgrade_database(revision='head'):
+    """
+    Migrates the bound database to `revision`. A database that predates
+    migrations (tables present, no alembic_version) is stamped at the baseline
+    first, so only the later revisions run against it. Needs an app context.
+    """
+    tables = set(sa.inspect(db.engine).get_table_names())
+    if 'alembic_version' not in tables and 'user' in tables:
+        print(f"Existing database has no migration history; stamping it at {BASELINE_REVISION}.")
+        stamp(revision=BASELINE_REVISION)
+    upgrade(revision=revision)
+
+
+@click.command('upgrade-db')
+@click.option('--revision', default='head', help='Target revision (default: head)')
+@with_appcontext
+def upgrade_db_command(revision):
+    """Stamp a pre-migration database if needed, then upgrade it."""
+    upgrade_database(revision)
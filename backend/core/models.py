@@ -1,17 +1,35 @@
 from core.extensions import db 
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timezone
 import uuid
-from flask_security import UserMixin, RoleMixin 
+# Flask-Security is never initialized on the app, so the (much lighter) Flask-Login
+# mixin provides everything these models use.
+from flask_login import UserMixin
 
 
 
+def percentage_score(score, total_questions):
+    return round((score / total_questions) * 100, 2) if total_questions > 0 else 0
+
+
+SCORE_BINS = 20 # Score histogram bins, 5 percentage points each; changing it needs `flask rebuild-score-histograms`
+
+
+def score_bin(score, total_questions):
+    """The histogram bin of score/total_questions; a full score goes in the last bin. core/histograms.py has the SQL twin."""
+    if total_questions <= 0:
+        return 0
+    return SCORE_BINS - 1 if score >= total_questions else score * SCORE_BINS // total_questions
+
+
 user_roles = db.Table('user_roles',
     db.Column('user_id', db.Integer(), db.ForeignKey('user.id'), primary_key=True),
     db.Column('role_id', db.Integer(), db.ForeignKey('role.id'), primary_key=True)
 )
 
-class Role(db.Model, RoleMixin):
+class Role(db.Model):
     """Model for user roles (Admin, User)."""
     __tablename__ = 'role'
     id = db.Column(db.Integer(), primary_key=True)
@@ -36,8 +54,10 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    active = db.Column(db.Boolean(), default=True, nullable=False) # Required by Flask-Security
+    active = db.Column(db.Boolean(), default=True, nullable=False) # Inactive users can't log in or use their tokens
     fs_uniquifier = db.Column(db.String(64), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    # Counter cache: live plus archived attempts (see core/counters.py)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
 
     # Many-to-Many relationship with Role
     roles = db.relationship('Role', secondary=user_roles,
@@ -91,6 +111,8 @@ class Subject(db.Model):
 
     # One-to-Many relationship with Chapter
     chapters = db.relationship('Chapter', backref='subject', lazy='dynamic', cascade="all, delete-orphan")
+    # Loadable (selectinload/joinedload) read-only variant of `chapters`, see core/serializers.py
+    chapter_list = db.relationship('Chapter', order_by='Chapter.name', viewonly=True)
 
     def __repr__(self):
         return f'<Subject {self.name}>'
@@ -103,11 +125,14 @@ class Chapter(db.Model):
     name = db.Column(db.String(100), nullable=False)
     subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Covers subject.chapters ordered by name and the duplicate-name check
+    __table_args__ = (db.Index('ix_chapter_subject_id_name', 'subject_id', 'name'),)
     # Optional: Link to the admin who created it
     # created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
     # One-to-Many relationship with Quiz
     quizzes = db.relationship('Quiz', backref='chapter', lazy='dynamic', cascade="all, delete-orphan")
+    quiz_list = db.relationship('Quiz', order_by='Quiz.title', viewonly=True)
 
     def __repr__(self):
         return f'<Chapter {self.name} in {self.subject.name}>'
@@ -119,14 +144,21 @@ class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
+    # Denormalized from chapter.subject_id (kept in sync by the events at the bottom of this module)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     duration_minutes = db.Column(db.Integer, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
 
     scheduled_date = db.Column(db.DateTime, nullable=True) # Allows for optional scheduling
+    # Counter caches (see core/counters.py)
+    question_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    __table_args__ = (db.Index('ix_quiz_chapter_id_title', 'chapter_id', 'title'),)
 
     # One-to-Many relationship with Question
     questions = db.relationship('Question', backref='quiz', lazy='dynamic', cascade="all, delete-orphan")
+    question_list = db.relationship('Question', order_by='Question.id', viewonly=True)
     # One-to-Many relationship with QuizAttempt
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy='dynamic', cascade="all, delete-orphan")
 
@@ -139,10 +171,11 @@ class Question(db.Model):
     __tablename__ = 'question'
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
 
     # One-to-Many relationship with Option
     options = db.relationship('Option', backref='question', lazy='dynamic', cascade="all, delete-orphan")
+    option_list = db.relationship('Option', order_by='Option.id', viewonly=True)
 
     # You need a way to get the correct option. Using the relationship is one way.
     def get_correct_option(self):
@@ -159,6 +192,8 @@ class Option(db.Model):
     text = db.Column(db.String(255), nullable=False)
     is_correct = db.Column(db.Boolean, default=False, nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    # Options per question, and the correct option lookup when grading
+    __table_args__ = (db.Index('ix_option_question_id_is_correct', 'question_id', 'is_correct'),)
 
     def __repr__(self):
         return f'<Option {self.id}: {self.text} Correct={self.is_correct}>'
@@ -170,14 +205,25 @@ class QuizAttempt(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    # Denormalized from the quiz so subject/chapter analytics don't need the quiz -> chapter -> subject joins
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=True)
     score = db.Column(db.Integer, nullable=False) 
     total_questions = db.Column(db.Integer, nullable=False) 
     start_time = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     submitted_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_user_id_submitted_at', 'user_id', 'submitted_at'), # A user's history, newest first
+        db.Index('ix_quiz_attempt_quiz_id_score', 'quiz_id', 'score'),              # Per-quiz/subject aggregates
+        db.Index('ix_quiz_attempt_submitted_at', 'submitted_at'),                   # Reminder and report jobs
+        # Covering indexes for the subject charts: answered from the index alone, no table or join lookups
+        db.Index('ix_quiz_attempt_subject_id_score', 'subject_id', 'score'),
+        db.Index('ix_quiz_attempt_user_id_subject_id_score', 'user_id', 'subject_id', 'score', 'total_questions'),
+    )
 
     @property
     def percentage_score(self):
-        return round((self.score / self.total_questions) * 100, 2) if self.total_questions > 0 else 0
+        return percentage_score(self.score, self.total_questions)
 
     @property
     def time_taken(self):
@@ -188,3 +234,308 @@ class QuizAttempt(db.Model):
     def __repr__(self):
         return f'<QuizAttempt User:{self.user_id} Quiz:{self.quiz_id} Score:{self.score}/{self.total_questions}>'
     
+
+
+class ArchivedQuizAttempt(db.Model):
+    """An attempt older than ARCHIVE_HORIZON_DAYS, moved out of quiz_attempt by core/archive.py."""
+    __tablename__ = 'quiz_attempt_archive'
+    id = db.Column(db.Integer, primary_key=True) # Same id it had in quiz_attempt
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=True)
+    score = db.Column(db.Integer, nullable=False)
+    total_questions = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.DateTime(timezone=True))
+    submitted_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_archive_user_id_submitted_at', 'user_id', 'submitted_at'),
+        db.Index('ix_quiz_attempt_archive_quiz_id', 'quiz_id'),
+    )
+
+    user = db.relationship('User', backref=db.backref('archived_attempts', lazy='dynamic', cascade='all, delete-orphan'))
+    quiz = db.relationship('Quiz', backref=db.backref('archived_attempts', lazy='dynamic', cascade='all, delete-orphan'))
+
+
+class AttemptRollup(db.Model):
+    """
+    Aggregates of a user's archived attempts at one quiz. Dashboards combine these
+    with the live quiz_attempt rows, so their numbers don't change when attempts
+    are archived. Percentages and sums only count attempts with total_questions > 0.
+    """
+    __tablename__ = 'quiz_attempt_rollup'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=True)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    total_sum = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=True)
+    best_total = db.Column(db.Integer, nullable=True)      # total_questions of the best-scoring attempt
+    max_percentage = db.Column(db.Float, nullable=True)
+    last_submitted_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    __table_args__ = (
+        # Covering indexes for the admin summary's per-subject and per-user totals
+        db.Index('ix_quiz_attempt_rollup_subject_id_best_score', 'subject_id', 'best_score', 'attempt_count'),
+        db.Index('ix_quiz_attempt_rollup_user_id_attempt_count', 'user_id', 'attempt_count'),
+    )
+
+    user = db.relationship('User', backref=db.backref('attempt_rollups', lazy='dynamic', cascade='all, delete-orphan'))
+    quiz = db.relationship('Quiz', backref=db.backref('attempt_rollups', lazy='dynamic', cascade='all, delete-orphan'))
+
+
+class AttemptAnswer(db.Model):
+    """
+    The option chosen for each question of a submitted attempt (None if
+    skipped) and whether it was scored correct, written in one executemany
+    INSERT on submit and read by core/item_analysis.py. attempt_id has no foreign key: archiving moves the
+    attempt to quiz_attempt_archive under the same id and its answers stay.
+    """
+    __tablename__ = 'attempt_answer'
+    attempt_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), primary_key=True, autoincrement=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    option_id = db.Column(db.Integer, db.ForeignKey('option.id'), nullable=True)
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+    __table_args__ = (
+        # Covering index for item analysis: a quiz's answers come from the index alone
+        db.Index('ix_attempt_answer_quiz_id_attempt_id', 'quiz_id', 'attempt_id', 'question_id', 'option_id'),
+    )
+
+
+class ScoreHistogram(db.Model):
+    """
+    How many submitted attempts at a quiz fall in each score bin (see
+    score_bin), and the sum of their percentages for the mean. Archived
+    attempts stay counted. Kept current by the events at the bottom of this
+    module and core/histograms.py; rebuilt from the attempt tables in batch.
+    """
+    __tablename__ = 'quiz_score_histogram'
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    bin = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0)
+
+    quiz = db.relationship('Quiz', backref=db.backref('score_histogram', lazy='dynamic', cascade='all, delete-orphan'))
+
+
+class ActivityRollup(db.Model):
+    """
+    Submitted attempts per time bucket and subject, at hour, day, week and
+    month granularity, for the admin trend charts (see core/activity.py).
+    subject_id 0 is every subject together; it has no foreign key, so the
+    history of a deleted subject stays. active_users counts distinct users.
+    """
+    __tablename__ = 'activity_rollup'
+    level = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    subject_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)
+    total_sum = db.Column(db.Integer, nullable=False, default=0)
+    active_users = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ActivityPresence(db.Model):
+    """
+    Which users have already been counted in an activity_rollup bucket that
+    is still open. Rows for closed buckets are pruned after each run.
+    """
+    __tablename__ = 'activity_presence'
+    level = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    subject_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+
+class RollupWatermark(db.Model):
+    """How far an incremental rollup job has read: the (submitted_at, id) of the last attempt it processed."""
+    __tablename__ = 'rollup_watermark'
+    name = db.Column(db.String(64), primary_key=True)
+    submitted_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    attempt_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ExportJob(db.Model):
+    """
+    A CSV export's status, written by the Celery task as it runs. Kept here
+    rather than in the result backend so finished jobs outlive its TTL; the
+    long-poll endpoint waits on `version`, bumped on every change.
+    """
+    __tablename__ = 'export_job'
+    id = db.Column(db.String(36), primary_key=True) # Also the Celery task id
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='PENDING') # PENDING, PROGRESS, SUCCESS, FAILURE
+    done = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    filename = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # A user's recent exports
+    __table_args__ = (db.Index('ix_export_job_user_id_created_at', 'user_id', 'created_at'),)
+
+    user = db.relationship('User', backref=db.backref('export_jobs', lazy='dynamic', cascade='all, delete-orphan'))
+
+# --- Denormalized subject/chapter keys ---
+# quiz.subject_id and quiz_attempt.chapter_id/subject_id copy the owning chapter's
+# and subject's ids. Views that already hold the parent set them directly; these
+# events fill in whatever is missing and follow a quiz (or chapter) when it moves.
+
+@event.listens_for(Quiz, 'before_insert')
+@event.listens_for(Quiz, 'before_update')
+def _quiz_subject_id(mapper, connection, target):
+    attrs = inspect(target).attrs
+    moved = attrs.chapter_id.history.has_changes() and not attrs.subject_id.history.has_changes()
+    if target.subject_id is None or moved:
+        target.subject_id = connection.scalar(
+            select(Chapter.subject_id).where(Chapter.id == target.chapter_id))
+
+
+@event.listens_for(QuizAttempt, 'before_insert')
+def _attempt_keys(mapper, connection, target):
+    if target.subject_id is None or target.chapter_id is None:
+        row = connection.execute(
+            select(Quiz.chapter_id, Quiz.subject_id).where(Quiz.id == target.quiz_id)).first()
+        if row is not None:
+            target.chapter_id, target.subject_id = row
+
+
+@event.listens_for(Quiz, 'after_update')
+def _quiz_moved(mapper, connection, target):
+    if inspect(target).attrs.chapter_id.history.has_changes():
+        for model in (QuizAttempt, ArchivedQuizAttempt, AttemptRollup):
+            connection.execute(
+                update(model.__table__)
+                .where(model.quiz_id == target.id)
+                .values(chapter_id=target.chapter_id, subject_id=target.subject_id))
+
+
+@event.listens_for(Chapter, 'after_update')
+def _chapter_moved(mapper, connection, target):
+    if inspect(target).attrs.subject_id.history.has_changes():
+        connection.execute(
+            update(Quiz.__table__).where(Quiz.chapter_id == target.id).values(subject_id=target.subject_id))
+        for model in (QuizAttempt, ArchivedQuizAttempt, AttemptRollup):
+            connection.execute(
+                update(model.__table__)
+                .where(model.quiz_id.in_(select(Quiz.id).where(Quiz.chapter_id == target.id)))
+                .values(subject_id=target.subject_id))
+
+
+# --- Counter caches ---
+# quiz.question_count, quiz.attempt_count and user.attempt_count follow every
+# question and attempt written through the ORM, as one UPDATE ... SET n = n + 1
+# in the same transaction. Core bulk writes adjust them themselves (see
+# core/counters.py), and the nightly reconciler repairs any drift.
+
+def _bump(connection, model, obj_id, column, delta):
+    connection.execute(update(model.__table__).where(model.id == obj_id)
+                       .values({column: getattr(model, column) + delta}))
+
+
+@event.listens_for(Question, 'after_insert')
+def _question_added(mapper, connection, target):
+    _bump(connection, Quiz, target.quiz_id, 'question_count', 1)
+
+
+@event.listens_for(Question, 'after_delete')
+def _question_removed(mapper, connection, target):
+    _bump(connection, Quiz, target.quiz_id, 'question_count', -1)
+
+
+@event.listens_for(QuizAttempt, 'after_insert')
+def _attempt_added(mapper, connection, target):
+    _bump(connection, Quiz, target.quiz_id, 'attempt_count', 1)
+    _bump(connection, User, target.user_id, 'attempt_count', 1)
+
+
+@event.listens_for(QuizAttempt, 'after_delete')
+def _attempt_removed(mapper, connection, target):
+    _bump(connection, Quiz, target.quiz_id, 'attempt_count', -1)
+    _bump(connection, User, target.user_id, 'attempt_count', -1)
+
+
+# --- Score histograms ---
+# A submitted attempt adds itself to its quiz's bin in quiz_score_histogram
+# when it is flushed (submit, or an admin recording a finished attempt), moves
+# bins if an admin edits its score, and leaves when deleted. Set-based deletes
+# adjust the rows themselves (core/histograms.py).
+
+def _histogram_add(connection, quiz_id, score, total_questions, sign):
+    table = ScoreHistogram.__table__
+    values = {'quiz_id': quiz_id, 'bin': score_bin(score, total_questions),
+              'attempt_count': sign, 'percentage_sum': sign * score * 100.0 / total_questions if total_questions > 0 else 0.0}
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    if dialect is not None: # One upsert, safe against two first submissions racing
+        stmt = dialect.insert(table).values(values)
+        connection.execute(stmt.on_conflict_do_update(index_elements=['quiz_id', 'bin'], set_={
+            'attempt_count': table.c.attempt_count + stmt.excluded.attempt_count,
+            'percentage_sum': table.c.percentage_sum + stmt.excluded.percentage_sum}))
+        return
+    if not connection.execute(update(table).where(table.c.quiz_id == quiz_id, table.c.bin == values['bin']).values(
+            attempt_count=table.c.attempt_count + sign,
+            percentage_sum=table.c.percentage_sum + values['percentage_sum'])).rowcount:
+        connection.execute(table.insert().values(values))
+
+
+def _before(target, name):
+    """The value `name` had when the row was loaded."""
+    history = inspect(target).attrs[name].history
+    if history.has_changes():
+        return history.deleted[0] if history.deleted else None
+    return getattr(target, name)
+
+
+@event.listens_for(QuizAttempt, 'after_insert')
+def _attempt_recorded(mapper, connection, target):
+    if target.submitted_at is not None:
+        _histogram_add(connection, target.quiz_id, target.score, target.total_questions, 1)
+
+
+@event.listens_for(QuizAttempt, 'after_update')
+def _attempt_scored(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if not any(attrs[name].history.has_changes() for name in ('submitted_at', 'score', 'total_questions', 'quiz_id')):
+        return
+    if _before(target, 'submitted_at') is not None:
+        _histogram_add(connection, _before(target, 'quiz_id'), _before(target, 'score'),
+                       _before(target, 'total_questions'), -1)
+    if target.submitted_at is not None:
+        _histogram_add(connection, target.quiz_id, target.score, target.total_questions, 1)
+
+
+@event.listens_for(QuizAttempt, 'after_delete')
+@event.listens_for(ArchivedQuizAttempt, 'after_delete') # ORM cascades; archiving itself moves rows with Core
+def _attempt_unrecorded(mapper, connection, target):
+    if target.submitted_at is not None:
+        _histogram_add(connection, target.quiz_id, target.score, target.total_questions, -1)
+
+
+# --- Stored answers ---
+# attempt_answer rows go with their question or attempt (live or archived)
+# when those are deleted through the ORM. Set-based deletes and question
+# replacement clear them with one DELETE (core/deletion.py, core/quiz_authoring.py).
+# The ORM deletes a question's options before the question itself, so the
+# answers that chose an option are removed with it (option_id is a foreign
+# key), and the question's skipped ones with the question.
+
+@event.listens_for(Option, 'before_delete')
+def _option_answers_removed(mapper, connection, target):
+    connection.execute(AttemptAnswer.__table__.delete().where(AttemptAnswer.option_id == target.id))
+
+
+@event.listens_for(Question, 'before_delete')
+def _question_answers_removed(mapper, connection, target):
+    connection.execute(AttemptAnswer.__table__.delete().where(AttemptAnswer.question_id == target.id))
+
+
+@event.listens_for(QuizAttempt, 'before_delete')
+@event.listens_for(ArchivedQuizAttempt, 'before_delete')
+def _attempt_answers_removed(mapper, connection, target):
+    connection.execute(AttemptAnswer.__table__.delete().where(AttemptAnswer.attempt_id == target.id))
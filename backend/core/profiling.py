@@ -0,0 +1,190 @@
+# core/profiling.py
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import g, request
+
+logger = logging.getLogger('quizapp.profiling')
+
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that started it every `interval` seconds.
+    Stacks are kept as tuples of code objects and only formatted when written,
+    in the collapsed format flamegraph.pl and speedscope read ("a;b;c count").
+    """
+    extension = 'collapsed'
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                frames = ';'.join(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+                                  for code in stack)
+                f.write(f'{frames} {count}\n')
+
+
+class DeterministicProfiler:
+    """cProfile for the request thread; writes a pstats dump (snakeviz, gprof2dot)."""
+    extension = 'prof'
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def write(self, path):
+        self._profile.dump_stats(path)
+
+
+def _wants_profile(app):
+    """Admin-requested via the header, otherwise a random sample of traffic."""
+    header = app.config.get('PROFILING_HEADER')
+    if header and request.headers.get(header):
+        from flask_jwt_extended import verify_jwt_in_request
+        from core.authz import ROLE_ADMIN, current_role_mask
+        try:
+            verify_jwt_in_request(optional=True)
+            if current_role_mask() & ROLE_ADMIN:
+                return 'header'
+        except Exception:
+            pass # Invalid tokens are the view's problem; the request just isn't profiled.
+    rate = app.config.get('PROFILING_SAMPLE_RATE') or 0
+    if rate and random.random() < rate:
+        return 'sample'
+    return None
+
+
+def profile_dir(app):
+    return app.config.get('PROFILING_DIR') or os.path.join(app.instance_path, 'profiles')
+
+
+def list_profiles(app, limit=100):
+    """Metadata of the newest profiles, newest first."""
+    directory = profile_dir(app)
+    if not os.path.isdir(directory):
+        return []
+    names = sorted((n for n in os.listdir(directory) if n.endswith('.json')), reverse=True)[:limit]
+    profiles = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def _prune(directory, keep):
+    stems = sorted({name.rsplit('.', 1)[0] for name in os.listdir(directory)}, reverse=True)
+    for stem in stems[keep:]:
+        for name in os.listdir(directory):
+            if name.startswith(stem + '.'):
+                os.remove(os.path.join(directory, name))
+
+
+def _write_profile(app, profiler, trigger, started, status):
+    directory = profile_dir(app)
+    os.makedirs(directory, exist_ok=True)
+    endpoint = request.endpoint or 'unmatched'
+    stem = f"{time.strftime('%Y%m%dT%H%M%S', time.localtime(started))}-{_UNSAFE_FILENAME.sub('_', endpoint)}-{uuid.uuid4().hex[:8]}"
+    profile_file = f'{stem}.{profiler.extension}'
+    profiler.write(os.path.join(directory, profile_file))
+
+    stats = g.get('query_stats')
+    meta = {
+        'id': stem,
+        'file': profile_file,
+        'format': profiler.extension,
+        'trigger': trigger,
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': status,
+        'started_at': started,
+        'duration_ms': round((time.time() - started) * 1000.0, 3),
+        'sql': stats.as_dict() if stats is not None else None,
+    }
+    if stats is not None:
+        meta['sql']['top_statements'] = [{'statement': fp, 'count': n} for fp, n in stats.fingerprints.most_common(10)]
+    with open(os.path.join(directory, f'{stem}.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    _prune(directory, app.config.get('PROFILING_MAX_FILES', 200))
+    logger.info(f"Profiled {request.method} {request.path} -> {profile_file}")
+
+
+def init_profiling(app):
+    """
+    Installs the per-request profiler hooks. Nothing is registered unless
+    PROFILING_ENABLED is set, so a disabled profiler costs nothing per request.
+    """
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    @app.before_request
+    def _start_profiler():
+        trigger = _wants_profile(app)
+        if trigger is None:
+            return
+        if app.config.get('PROFILING_MODE') == 'cprofile':
+            profiler = DeterministicProfiler()
+        else:
+            profiler = SamplingProfiler(app.config.get('PROFILING_INTERVAL', 0.001))
+        g.profiler = (profiler, trigger, time.time())
+        profiler.start()
+
+    @app.after_request
+    def _note_status(response):
+        if 'profiler' in g:
+            g.profiler_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _stop_profiler(exc):
+        active = g.pop('profiler', None)
+        if active is None:
+            return
+        profiler, trigger, started = active
+        profiler.stop()
+        try:
+            _write_profile(app, profiler, trigger, started, g.pop('profiler_status', 500))
+        except OSError as e:
+            logger.warning(f"Could not write profile: {e}")
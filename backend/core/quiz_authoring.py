@@ -0,0 +1,184 @@
+# core/quiz_authoring.py
+"""
+Bulk quiz authoring: a whole quiz document validated in one pass and written
+with bulk INSERTs in one transaction.
+
+A document looks like
+
+    {"title": "...", "chapter_id": 1, "duration_minutes": 30,
+     "scheduled_date": null, "is_active": true,
+     "questions": [{"text": "...", "options": ["a", "b", "c", "d"], "correct_option_index": 2}, ...]}
+
+and the same "questions" list replaces a quiz's questions in edit mode. The
+rules match the single-question endpoint: 4 options per question, and
+`correct_option_index` between 1 and 4.
+"""
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, insert, select
+from core.counters import add_questions
+from core.extensions import db
+from core.item_analysis import forget_analysis
+from core.models import AttemptAnswer, Chapter, Option, Question, Quiz, QuizAttempt
+from utils import parse_datetime
+
+OPTIONS_PER_QUESTION = 4
+
+# For the API docs
+QUIZ_DOCUMENT_SCHEMA = {
+    'type': 'object', 'required': ['title', 'chapter_id', 'duration_minutes', 'questions'],
+    'properties': {
+        'title': {'type': 'string'}, 'chapter_id': {'type': 'integer'}, 'duration_minutes': {'type': 'integer'},
+        'scheduled_date': {'type': 'string', 'format': 'date-time'}, 'is_active': {'type': 'boolean'},
+        'questions': {'type': 'array', 'items': {
+            'type': 'object', 'required': ['text', 'options', 'correct_option_index'],
+            'properties': {'text': {'type': 'string'}, 'options': {'type': 'array', 'items': {'type': 'string'}},
+                           'correct_option_index': {'type': 'integer'}}}},
+    }
+}
+
+
+class InvalidDocument(ValueError):
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} validation error(s)')
+        self.errors = errors # [{'field': 'questions[3].options', 'message': '...'}]
+
+
+def _text(value, field, max_length, errors):
+    if not isinstance(value, str) or not value.strip():
+        errors.append({'field': field, 'message': 'cannot be blank'})
+        return None
+    if max_length and len(value) > max_length:
+        errors.append({'field': field, 'message': f'must be at most {max_length} characters'})
+    return value.strip()
+
+
+def _int(value, field, errors, minimum=None, maximum=None):
+    if isinstance(value, bool) or not isinstance(value, int):
+        errors.append({'field': field, 'message': 'must be an integer'})
+        return None
+    if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+        errors.append({'field': field, 'message': f'must be between {minimum} and {maximum}' if maximum is not None
+                       else f'must be at least {minimum}'})
+    return value
+
+
+def validate_questions(questions, errors):
+    """Cleaned question dicts; every problem found is appended to `errors`."""
+    max_questions = current_app.config.get('BULK_QUIZ_MAX_QUESTIONS', 500)
+    if not isinstance(questions, list):
+        errors.append({'field': 'questions', 'message': 'must be a list'})
+        return []
+    if len(questions) > max_questions:
+        errors.append({'field': 'questions', 'message': f'at most {max_questions} questions per request'})
+        return []
+
+    option_length = Option.__table__.c.text.type.length
+    cleaned = []
+    for i, question in enumerate(questions):
+        field = f'questions[{i}]'
+        if not isinstance(question, dict):
+            errors.append({'field': field, 'message': 'must be an object'})
+            continue
+        text = _text(question.get('text'), f'{field}.text', None, errors)
+        options = question.get('options')
+        if not isinstance(options, list) or len(options) != OPTIONS_PER_QUESTION:
+            errors.append({'field': f'{field}.options', 'message': f'exactly {OPTIONS_PER_QUESTION} options must be provided'})
+            options = []
+        options = [_text(o, f'{field}.options[{j}]', option_length, errors) for j, o in enumerate(options)]
+        correct = _int(question.get('correct_option_index'), f'{field}.correct_option_index', errors,
+                       1, OPTIONS_PER_QUESTION)
+        cleaned.append({'text': text, 'options': options, 'correct_option_index': correct})
+    return cleaned
+
+
+def validate_quiz(document):
+    """The cleaned quiz document, or InvalidDocument listing every problem at once."""
+    errors = []
+    if not isinstance(document, dict):
+        raise InvalidDocument([{'field': '', 'message': 'expected a JSON object'}])
+    quiz = {
+        'title': _text(document.get('title'), 'title', Quiz.__table__.c.title.type.length, errors),
+        'chapter_id': _int(document.get('chapter_id'), 'chapter_id', errors),
+        'duration_minutes': _int(document.get('duration_minutes'), 'duration_minutes', errors, 1),
+        'is_active': bool(document.get('is_active', True)),
+        'scheduled_date': None,
+    }
+    if document.get('scheduled_date'):
+        quiz['scheduled_date'] = parse_datetime(document['scheduled_date'])
+        if quiz['scheduled_date'] is None:
+            errors.append({'field': 'scheduled_date', 'message': 'must be an ISO 8601 date'})
+    questions = validate_questions(document.get('questions', []), errors)
+    if errors:
+        raise InvalidDocument(errors)
+    return quiz, questions
+
+
+def _insert_questions(quiz_id, questions):
+    """
+    Bulk-inserts questions and their options: one executemany INSERT per table.
+    The quiz has no other questions at this point, so its question ids in id
+    order are the new ones in insertion order. (INSERT ... RETURNING with
+    sort_by_parameter_order would go row by row on SQLite.)
+    """
+    if not questions:
+        return
+    db.session.execute(insert(Question), [{'text': q['text'], 'quiz_id': quiz_id} for q in questions])
+    question_ids = db.session.scalars(select(Question.id).where(Question.quiz_id == quiz_id).order_by(Question.id)).all()
+    db.session.execute(insert(Option), [
+        {'question_id': question_id, 'text': text, 'is_correct': j + 1 == q['correct_option_index']}
+        for question_id, q in zip(question_ids, questions)
+        for j, text in enumerate(q['options'])])
+    add_questions(quiz_id, len(questions))
+
+
+def create_quiz(document):
+    """Creates the quiz and all its questions in one transaction; returns the quiz id."""
+    quiz, questions = validate_quiz(document)
+    chapter = db.session.get(Chapter, quiz['chapter_id'])
+    if chapter is None:
+        raise InvalidDocument([{'field': 'chapter_id', 'message': f"Chapter with id {quiz['chapter_id']} not found"}])
+    try:
+        quiz_id = db.session.execute(insert(Quiz).values(subject_id=chapter.subject_id, **quiz)
+                                     .returning(Quiz.id)).scalar_one()
+        _insert_questions(quiz_id, questions)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return quiz_id
+
+
+def attempts_in_progress(quiz):
+    """Unsubmitted attempts still inside the quiz's time limit; their answers refer to the current question ids."""
+    since = datetime.now(timezone.utc) - timedelta(minutes=quiz.duration_minutes)
+    return db.session.execute(select(func.count()).select_from(QuizAttempt).where(and_(
+        QuizAttempt.quiz_id == quiz.id, QuizAttempt.submitted_at.is_(None),
+        QuizAttempt.start_time >= since.replace(tzinfo=None)))).scalar()
+
+
+def replace_questions(quiz_id, questions):
+    """Replaces all of a quiz's questions in one transaction; returns how many it now has."""
+    errors = []
+    questions = validate_questions(questions, errors)
+    if errors:
+        raise InvalidDocument(errors)
+    old_questions = select(Question.id).where(Question.quiz_id == quiz_id)
+    try:
+        # Stored answers point at the old questions and options; their item statistics go with them
+        db.session.execute(delete(AttemptAnswer).where(AttemptAnswer.question_id.in_(old_questions))
+                           .execution_options(synchronize_session=False))
+        db.session.execute(delete(Option).where(Option.question_id.in_(old_questions))
+                           .execution_options(synchronize_session=False))
+        removed = db.session.execute(delete(Question).where(Question.quiz_id == quiz_id)
+                                     .execution_options(synchronize_session=False)).rowcount
+        add_questions(quiz_id, -removed)
+        _insert_questions(quiz_id, questions)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    db.session.expire_all()
+    forget_analysis(quiz_id)
+    return len(questions)
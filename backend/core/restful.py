@@ -0,0 +1,62 @@
+# core/restful.py
+"""
+The flask-restful Api every blueprint mounts its resources on.
+
+Both ways a resource can answer go through the app's JSON provider
+(core/json_provider.py) and honour `Accept: application/msgpack`:
+  - returned dicts / (dict, code) tuples, via the representations below;
+  - jsonify() responses, via the `response_mimetype` the negotiate decorator
+    leaves on `g` before the view runs.
+"""
+from functools import wraps
+
+import flask_restful
+from flask import current_app, g, make_response, request
+from core.json_provider import MSGPACK_MIMETYPE, dumps_msgpack, msgpack_available
+
+
+def output_json(data, code, headers=None):
+    body = current_app.json.dumps_bytes(data, indent=current_app.debug) + b'\n'
+    resp = make_response(body, code)
+    resp.mimetype = 'application/json'
+    resp.headers.extend(headers or {})
+    return resp
+
+
+def output_msgpack(data, code, headers=None):
+    resp = make_response(dumps_msgpack(data), code)
+    resp.mimetype = MSGPACK_MIMETYPE
+    resp.headers.extend(headers or {})
+    return resp
+
+
+def negotiated_mimetype():
+    """MessagePack when it's enabled and the client prefers it, JSON otherwise (never a 406)."""
+    if not msgpack_available(current_app):
+        return 'application/json'
+    return request.accept_mimetypes.best_match(['application/json', MSGPACK_MIMETYPE], default='application/json')
+
+
+def negotiate(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.response_mimetype = negotiated_mimetype()
+        resp = view(*args, **kwargs)
+        if msgpack_available(current_app):
+            resp.vary.add('Accept')
+        return resp
+    return wrapper
+
+
+class Api(flask_restful.Api):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.representations = {'application/json': output_json, MSGPACK_MIMETYPE: output_msgpack}
+        self.decorators.append(negotiate)
+
+    def make_response(self, data, *args, **kwargs):
+        kwargs.pop('fallback_mediatype', None)
+        mimetype = g.get('response_mimetype') or negotiated_mimetype() # Errors can be raised before negotiate ran
+        resp = self.representations[mimetype](data, *args, **kwargs)
+        resp.headers['Content-Type'] = mimetype
+        return resp
@@ -0,0 +1,137 @@
+# core/routing.py
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+READ_BIND = 'read'
+
+# Max tolerated staleness (seconds) for the block being executed, or None when not read-only.
+_read_policy = contextvars.ContextVar('quizapp_read_policy', default=None)
+_DEFAULT = object()
+
+
+@contextmanager
+def read_only(max_staleness=_DEFAULT):
+    """
+    Routes the SELECTs issued inside the block (or decorated view) to the read engine.
+    `max_staleness` bounds replica lag in seconds; reads fall back to the primary
+    when the replica is further behind. Defaults to READ_MAX_STALENESS.
+    """
+    token = _read_policy.set(max_staleness)
+    try:
+        yield
+    finally:
+        _read_policy.reset(token)
+
+
+class ReadReplica:
+    """The read engine plus a cached measurement of how far it lags the primary."""
+
+    def __init__(self, engine, default_staleness, check_interval):
+        self.engine = engine
+        self.default_staleness = default_staleness
+        self.check_interval = check_interval
+        self._lag = None
+        self._checked_at = 0.0
+
+    def lag(self):
+        """Replica lag in seconds (0 for a connection to the primary's own SQLite file)."""
+        if self.engine.dialect.name == 'sqlite':
+            return 0.0
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._lag = self._measure_lag()
+        return self._lag
+
+    def _measure_lag(self):
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == 'postgresql':
+                    lag = conn.execute(text(
+                        "SELECT CASE WHEN pg_is_in_recovery() "
+                        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+                        "ELSE 0 END")).scalar()
+                    return float(lag)
+        except Exception as e:
+            logger.warning(f"Read replica lag check failed, reading from the primary: {e}")
+        return float('inf') # Unknown dialect or unreachable replica
+
+    def usable(self, max_staleness):
+        bound = self.default_staleness if max_staleness is _DEFAULT else max_staleness
+        return bound is None or self.lag() <= bound
+
+
+class RoutingSession(Session):
+    """
+    db.session that sends SELECTs made under read_only() to the read bind. Flushes,
+    DML and every statement after this session's first flush go to the primary,
+    so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('wrote'):
+            policy = _read_policy.get()
+            if policy is not None and (clause is None or getattr(clause, 'is_select', False)):
+                replica = _current_replica()
+                if replica is not None and replica.usable(policy):
+                    return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+def _current_replica():
+    return current_app.extensions.get('quizapp_read_replica') if has_app_context() else None
+
+
+def read_bind_config(config, primary_options):
+    """
+    SQLALCHEMY_BINDS entry for the read engine, or None when routing is off.
+
+    A replica URL (SQLALCHEMY_READ_DATABASE_URI) wins; otherwise a file-backed
+    SQLite database in WAL mode is opened a second time through connections
+    pinned to PRAGMA query_only, with their own pool.
+    """
+    if not config.get('READ_ROUTING_ENABLED', True):
+        return None
+    url = config.get('SQLALCHEMY_READ_DATABASE_URI')
+    if not url:
+        primary = make_url(config['SQLALCHEMY_DATABASE_URI'])
+        if (primary.get_backend_name() != 'sqlite' or primary.database in (None, '', ':memory:')
+                or not (config.get('SQLITE_TUNING', True) and config.get('SQLITE_WAL', True))):
+            return None # Without WAL, a second SQLite reader would still block the writer
+        url = config['SQLALCHEMY_DATABASE_URI']
+    options = dict(primary_options, url=url,
+                   pool_size=config.get('READ_POOL_SIZE', 5),
+                   max_overflow=config.get('READ_MAX_OVERFLOW', 10))
+    return options
+
+
+def init_read_routing(app, db):
+    """Registers the read engine created from the 'read' bind (see read_bind_config)."""
+    engine = db.engines.get(READ_BIND)
+    if engine is None:
+        return None
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, 'connect')
+        def _query_only(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA query_only=1')
+            cursor.close()
+
+    replica = ReadReplica(engine, app.config.get('READ_MAX_STALENESS', 5),
+                          app.config.get('READ_LAG_CHECK_INTERVAL', 1))
+    app.extensions['quizapp_read_replica'] = replica
+    return replica
@@ -0,0 +1,161 @@
+# core/scheduler.py
+import logging
+import os
+import socket
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows: no flock, every process behaves as the leader
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def _in_app_context(app, func):
+    """APScheduler runs jobs on its own threads, outside any Flask app context."""
+    def job():
+        with app.app_context():
+            return func()
+    job.__name__ = func.__name__
+    return job
+
+
+def default_jobs(app):
+    """The recurring jobs every deployment schedules (kwargs for APScheduler.add_job)."""
+    from jobs import archive_attempts, reconcile_counters, refresh_activity_rollups, send_daily_reminders
+    scheduled = [
+        dict(id='daily-reminders', func=send_daily_reminders, trigger='cron', hour=20),
+    ]
+    if app.config.get('ARCHIVE_ENABLED', True):
+        scheduled.append(dict(id='archive-attempts', func=archive_attempts, trigger='cron',
+                              hour=app.config.get('ARCHIVE_HOUR', 3)))
+    if app.config.get('COUNTER_RECONCILE_ENABLED', True):
+        scheduled.append(dict(id='reconcile-counters', func=reconcile_counters, trigger='cron',
+                              hour=app.config.get('COUNTER_RECONCILE_HOUR', 4)))
+    if app.config.get('ACTIVITY_ROLLUP_ENABLED', True):
+        scheduled.append(dict(id='activity-rollups', func=refresh_activity_rollups, trigger='interval',
+                              minutes=app.config.get('ACTIVITY_ROLLUP_MINUTES', 5), coalesce=True, max_instances=1))
+    return scheduled
+
+
+class LeaderElection:
+    """
+    Host-wide leadership through an exclusive flock on SCHEDULER_LOCK_FILE.
+
+    The kernel drops the lock when the leader process exits or dies, so failover
+    needs no lease expiry: followers retry every `retry` seconds on a daemon thread
+    and the first one to get the lock calls `on_elected`. The leader rewrites the
+    lock file with its pid and a timestamp as a heartbeat, which followers use to
+    warn about a leader that is alive but stuck. The lock file must be on a local
+    filesystem (flock over NFS is unreliable) and only elects within one host.
+    """
+
+    def __init__(self, path, retry=30.0, on_elected=None):
+        self.path = path
+        self.retry = retry
+        self.on_elected = on_elected
+        self.is_leader = False
+        self._fd = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._try_acquire():
+            self._promote()
+        else:
+            logger.info(f"Scheduler: follower (pid {os.getpid()}), leader is {self.read_heartbeat()}")
+        self._thread = threading.Thread(target=self._loop, name='scheduler-election', daemon=True)
+        self._thread.start()
+        return self.is_leader
+
+    def _try_acquire(self):
+        if fcntl is None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def _promote(self):
+        self.is_leader = True
+        self._write_heartbeat()
+        logger.info(f"Scheduler: elected leader (pid {os.getpid()})")
+        if self.on_elected:
+            self.on_elected()
+
+    def _write_heartbeat(self):
+        if self._fd is None:
+            return
+        line = f'{os.getpid()} {socket.gethostname()} {time.time():.3f}\n'.encode()
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, line, 0)
+
+    def read_heartbeat(self):
+        """(pid, host, unix time) of the leader's last heartbeat, or None."""
+        try:
+            with open(self.path) as f:
+                pid, host, stamp = f.read().split()
+            return int(pid), host, float(stamp)
+        except (OSError, ValueError):
+            return None
+
+    def _loop(self):
+        while not self._stop.wait(self.retry):
+            if self.is_leader:
+                self._write_heartbeat()
+            elif self._try_acquire():
+                self._promote()
+            else:
+                beat = self.read_heartbeat()
+                if beat and time.time() - beat[2] > 3 * self.retry:
+                    logger.warning(f"Scheduler: leader pid {beat[0]} holds the lock but its heartbeat is "
+                                   f"{time.time() - beat[2]:.0f}s old")
+
+    def detach(self):
+        """
+        Drops this process's copy of the lock after a fork. The parent still holds
+        the lock; the child simply stops taking part in the election.
+        """
+        self._stop.set()
+        self.is_leader = False
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def init_scheduler(app, jobs=None):
+    """
+    Elects one process per host to run APScheduler. Followers never construct a
+    scheduler; they only wait on the lock and take over if the leader goes away.
+    """
+    lock_path = app.config.get('SCHEDULER_LOCK_FILE') or os.path.join(app.instance_path, 'scheduler.lock')
+
+    def start_scheduler():
+        from flask_apscheduler import APScheduler
+
+        scheduler = APScheduler()
+        scheduler.init_app(app)
+        scheduler.start()
+        for job in (default_jobs(app) if jobs is None else jobs):
+            if not scheduler.get_job(job['id']):
+                scheduler.add_job(**dict(job, func=_in_app_context(app, job['func'])))
+                logger.info(f"Scheduled '{job['id']}' job.")
+        app.extensions['quizapp_scheduler'] = scheduler
+
+    election = LeaderElection(lock_path, app.config.get('SCHEDULER_LEADER_RETRY', 30), start_scheduler)
+    app.extensions['quizapp_scheduler_election'] = election
+    election.start()
+    return election
+
+
+def detach_scheduler(app):
+    """Call in forked children (gunicorn post_fork) so only the parent keeps the lock."""
+    election = app.extensions.get('quizapp_scheduler_election')
+    if election:
+        election.detach()
@@ -0,0 +1,114 @@
+# core/serializers.py
+"""
+Read-path loading and serialization of nested content.
+
+Walking the models' `lazy='dynamic'` relationships costs a query per parent
+(one options query per question, and so on). The loaders here go through the
+loadable `*_list` variants with selectinload/joinedload instead, so every
+nested read is a fixed number of queries whatever its size:
+
+    load_quiz_content     quiz, questions, options                 3 queries
+    load_attempt_content  attempt + quiz, questions, options       3 queries
+    load_question         question, options                        2 queries
+    load_catalog          subjects, chapters, (active) quizzes     3 queries
+    correct_option_ids    the answer key of a quiz                 1 query
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from core.extensions import db
+from core.models import Chapter, Option, Question, Quiz, QuizAttempt, Subject
+
+
+# --- Loaders ---
+# Options are built per call: backref attributes (Quiz.chapter, QuizAttempt.quiz)
+# only exist once the mappers are configured.
+
+def quiz_content_options():
+    """quiz -> questions -> options, one SELECT ... IN per level."""
+    return selectinload(Quiz.question_list).selectinload(Question.option_list)
+
+
+def quiz_context_options():
+    """quiz -> chapter -> subject, joined into the quiz's own SELECT."""
+    return joinedload(Quiz.chapter).joinedload(Chapter.subject)
+
+
+def joined_quiz_context_options():
+    """quiz -> chapter -> subject, populated from a query that already joins Chapter and Subject."""
+    return contains_eager(Quiz.chapter).contains_eager(Chapter.subject)
+
+
+def attempt_context_options():
+    """attempt -> quiz -> chapter -> subject, joined into the attempt's own SELECT."""
+    return joinedload(QuizAttempt.quiz).joinedload(Quiz.chapter).joinedload(Chapter.subject)
+
+
+def load_quiz_content(quiz_id):
+    return Quiz.query.options(quiz_content_options())\
+        .filter_by(id=quiz_id).first_or_404(description='Quiz not found')
+
+
+def load_attempt_content(attempt_id):
+    return QuizAttempt.query.options(
+        joinedload(QuizAttempt.quiz).selectinload(Quiz.question_list).selectinload(Question.option_list)
+    ).filter_by(id=attempt_id).first_or_404()
+
+
+def load_question(question_id):
+    return Question.query.options(selectinload(Question.option_list))\
+        .filter_by(id=question_id).first_or_404()
+
+
+def load_catalog(active_only=True):
+    """Subjects by name with their chapters (by name) and quizzes (by title)."""
+    quizzes = Chapter.quiz_list.and_(Quiz.is_active.is_(True)) if active_only else Chapter.quiz_list
+    return Subject.query.options(selectinload(Subject.chapter_list).selectinload(quizzes))\
+        .order_by(Subject.name).all()
+
+
+def correct_option_ids(quiz_id):
+    """{question_id: id of its correct option} for every question of a quiz."""
+    rows = db.session.execute(
+        select(Option.question_id, func.min(Option.id))
+        .join(Question, Question.id == Option.question_id)
+        .where(Question.quiz_id == quiz_id, Option.is_correct.is_(True))
+        .group_by(Option.question_id)).all()
+    return dict(rows)
+
+
+def answer_sheet(quiz_id):
+    """
+    correct_option_ids() plus {question_id: set of its option ids}, from the
+    same single query - for checking the options a submission names.
+    """
+    key, options = {}, {}
+    rows = db.session.execute(
+        select(Option.question_id, Option.id, Option.is_correct)
+        .join(Question, Question.id == Option.question_id)
+        .where(Question.quiz_id == quiz_id)).all()
+    for question_id, option_id, is_correct in rows:
+        options.setdefault(question_id, set()).add(option_id)
+        if is_correct and (question_id not in key or option_id < key[question_id]):
+            key[question_id] = option_id
+    return key, options
+
+
+# --- Serializers ---
+
+def serialize_option(option, include_answers=True):
+    data = {'id': option.id, 'text': option.text}
+    if include_answers:
+        data['is_correct'] = option.is_correct
+    return data
+
+
+def serialize_question(question, include_answers=True):
+    """A question with its options; `include_answers=False` hides which option is correct."""
+    return {
+        'id': question.id, 'text': question.text, 'quiz_id': question.quiz_id,
+        'options': [serialize_option(o, include_answers) for o in question.option_list],
+    }
+
+
+def quiz_context(quiz):
+    return {'chapter_name': quiz.chapter.name, 'subject_name': quiz.chapter.subject.name}
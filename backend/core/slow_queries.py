@@ -0,0 +1,157 @@
+# core/slow_queries.py
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import has_request_context, request
+
+from core.instrumentation import fingerprint, register_slow_query_recorder
+
+logger = logging.getLogger('quizapp.sql.slow')
+
+# Statements EXPLAIN can describe without running them (no ANALYZE is ever used).
+_EXPLAINABLE = ('select', 'with', 'update', 'delete', 'insert')
+
+
+def _short_repr(value, limit=500):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + '...'
+
+
+class SlowQueryRecorder:
+    """
+    Collects statements slower than `threshold` seconds on one engine.
+
+    The request thread only captures the statement, parameters and endpoint and
+    hands them to a queue. A background thread fingerprints them, logs them, runs
+    EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (other dialects) once per fingerprint
+    every `explain_ttl` seconds, and keeps the per-fingerprint aggregates behind
+    report(). Aggregates are per process.
+    """
+
+    def __init__(self, engine, threshold, explain_ttl=600, max_fingerprints=500):
+        self.engine = engine
+        self.threshold = threshold
+        self.explain_ttl = explain_ttl
+        self.max_fingerprints = max_fingerprints
+        self.aggregates = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._pid = None
+
+    # --- Request Thread ---
+    def record(self, statement, parameters, duration, executemany=False):
+        if self._thread is not None and threading.get_ident() == self._thread.ident:
+            return # Our own EXPLAIN being slow
+        if executemany and parameters:
+            parameters = parameters[0]
+        event = {
+            'statement': statement,
+            'parameters': parameters,
+            'duration_ms': round(duration * 1000.0, 3),
+            'at': time.time(),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'path': request.path if has_request_context() else None,
+        }
+        self._ensure_worker()
+        self._queue.put(event)
+
+    def _ensure_worker(self):
+        # Threads don't survive a fork, so each gunicorn worker starts its own.
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='slow-query-recorder', daemon=True)
+            self._thread.start()
+
+    # --- Background Thread ---
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                self._process(event)
+            except Exception as e:
+                logger.warning(f"Slow query recorder failed: {e}")
+
+    def _process(self, event):
+        fp = fingerprint(event['statement'])
+        with self._lock:
+            agg = self.aggregates.get(fp)
+            if agg is None:
+                agg = self.aggregates[fp] = {
+                    'fingerprint': fp, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'first_seen': event['at'], 'last_seen': event['at'], 'endpoints': Counter(),
+                    'sample': None, 'plan': None, 'plan_captured_at': None,
+                }
+                while len(self.aggregates) > self.max_fingerprints:
+                    self.aggregates.popitem(last=False)
+            else:
+                self.aggregates.move_to_end(fp)
+            agg['count'] += 1
+            agg['total_ms'] += event['duration_ms']
+            agg['last_seen'] = event['at']
+            agg['endpoints'][event['endpoint'] or '(no request)'] += 1
+            if event['duration_ms'] >= agg['max_ms']:
+                agg['max_ms'] = event['duration_ms']
+                agg['sample'] = {'statement': event['statement'], 'parameters': _short_repr(event['parameters']),
+                                 'duration_ms': event['duration_ms'], 'endpoint': event['endpoint'],
+                                 'path': event['path']}
+            needs_plan = agg['plan_captured_at'] is None or event['at'] - agg['plan_captured_at'] > self.explain_ttl
+
+        logger.warning(json.dumps({'slow_query_ms': event['duration_ms'], 'endpoint': event['endpoint'],
+                                   'path': event['path'], 'statement': event['statement'],
+                                   'parameters': _short_repr(event['parameters'])}))
+        if needs_plan:
+            plan = self.explain(event['statement'], event['parameters'])
+            with self._lock:
+                agg['plan'], agg['plan_captured_at'] = plan, time.time()
+
+    def explain(self, statement, parameters):
+        """Plan rows for a statement, as a list of strings; never executes the statement itself."""
+        if not statement.lstrip().lower().startswith(_EXPLAINABLE):
+            return None
+        prefix = 'EXPLAIN QUERY PLAN ' if self.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+                conn.rollback()
+        except Exception as e:
+            return [f'EXPLAIN failed: {e}']
+        if self.engine.dialect.name == 'sqlite':
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [' | '.join(str(col) for col in row) for row in rows]
+
+    # --- Reporting ---
+    def report(self, limit=50):
+        with self._lock:
+            rows = [dict(agg, endpoints=dict(agg['endpoints'].most_common()),
+                         total_ms=round(agg['total_ms'], 3),
+                         avg_ms=round(agg['total_ms'] / agg['count'], 3))
+                    for agg in self.aggregates.values()]
+        rows.sort(key=lambda r: r['total_ms'], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self.aggregates.clear()
+
+
+def init_slow_query_log(app):
+    """Attaches a SlowQueryRecorder to the app's engine unless SLOW_QUERY_THRESHOLD_MS is None."""
+    threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    if threshold_ms is None:
+        return None
+    from core.extensions import db
+    with app.app_context():
+        engine = db.engine
+    recorder = SlowQueryRecorder(engine, threshold_ms / 1000.0,
+                                 explain_ttl=app.config.get('SLOW_QUERY_EXPLAIN_TTL', 600),
+                                 max_fingerprints=app.config.get('SLOW_QUERY_MAX_FINGERPRINTS', 500))
+    register_slow_query_recorder(engine, recorder)
+    app.extensions['quizapp_slow_queries'] = recorder
+    return recorder
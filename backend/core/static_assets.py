@@ -0,0 +1,151 @@
+# core/static_assets.py
+"""
+Serving the Vite bundle (frontend/dist) from an in-memory manifest.
+
+The manifest is built once per process: every file's size, mtime, ETag and
+precompressed `.br`/`.gz` siblings. Requests are answered from it without
+touching the filesystem until the chosen file is opened. Vite's content-hashed
+files (`assets/name-<hash>.js`) get a year-long `immutable` Cache-Control. Every
+other file, index.html included, is revalidated with its ETag.
+
+`flask precompress-static` writes the `.br`/`.gz` files; run it after
+`npm run build`. Set STATIC_PRECOMPRESS_ON_START to have the app do it when the
+manifest is built.
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import re
+
+import click
+from flask import current_app, request
+from flask.cli import with_appcontext
+from werkzeug.wsgi import wrap_file
+from core.compression import brotli, choose_encoding
+
+logger = logging.getLogger(__name__)
+
+HASHED_ASSET = re.compile(r'-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$') # Vite's [name]-[hash].[ext]
+VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class Asset:
+    __slots__ = ('path', 'mimetype', 'size', 'mtime', 'etag', 'immutable', 'variants')
+
+    def __init__(self, path, relpath, stat):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'{self.mtime:x}-{self.size:x}'
+        self.immutable = HASHED_ASSET.search(relpath) is not None
+        self.variants = {} # encoding -> (path, size)
+
+
+class AssetManifest:
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+
+    def scan(self):
+        assets = {}
+        if os.path.isdir(self.root):
+            for dirpath, _, filenames in os.walk(self.root):
+                names = set(filenames)
+                for name in filenames:
+                    if name.endswith(('.br', '.gz')):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    relpath = os.path.relpath(path, self.root).replace(os.sep, '/')
+                    asset = assets[relpath] = Asset(path, relpath, os.stat(path))
+                    for encoding, suffix in VARIANTS:
+                        if name + suffix in names:
+                            variant = os.stat(path + suffix)
+                            if variant.st_mtime >= asset.mtime: # Stale variants are ignored
+                                asset.variants[encoding] = (path + suffix, variant.st_size)
+        self.assets = assets
+        return self
+
+    def get(self, relpath):
+        return self.assets.get(relpath)
+
+
+def precompress(root, min_size=1024, compressible=None):
+    """Writes `.gz` (and `.br` with brotli installed) next to each compressible file; returns how many."""
+    compressible = compressible or current_app.config['COMPRESS_MIMETYPES']
+    written = 0
+    for asset in AssetManifest(root).scan().assets.values():
+        if asset.size < min_size or asset.mimetype not in compressible:
+            continue
+        with open(asset.path, 'rb') as f:
+            data = f.read()
+        for encoding, suffix in VARIANTS:
+            if encoding == 'br' and brotli is None:
+                continue
+            target = asset.path + suffix
+            if os.path.exists(target) and os.path.getmtime(target) >= asset.mtime:
+                continue
+            packed = brotli.compress(data, quality=11) if encoding == 'br' else gzip.compress(data, 9, mtime=0)
+            if len(packed) >= asset.size:
+                continue
+            with open(target + '.tmp', 'wb') as f:
+                f.write(packed)
+            os.replace(target + '.tmp', target)
+            written += 1
+    return written
+
+
+def send_asset(asset):
+    """A conditional response for `asset`, served from its best precompressed variant."""
+    encoding = choose_encoding(request.accept_encodings, [e for e, _ in VARIANTS if e in asset.variants])
+    path, size = asset.variants[encoding] if encoding else (asset.path, asset.size)
+
+    response = current_app.response_class(wrap_file(request.environ, open(path, 'rb')),
+                                          mimetype=asset.mimetype, direct_passthrough=True)
+    response.content_length = size
+    response.last_modified = asset.mtime
+    response.set_etag(f'{asset.etag}-{encoding}' if encoding else asset.etag)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if asset.variants:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE if asset.immutable else 'no-cache'
+    return response.make_conditional(request)
+
+
+def get_manifest(app):
+    return app.extensions.get('static_manifest')
+
+
+def lookup(app, relpath):
+    """The manifest entry for `relpath`; in debug mode a miss rescans dist (rebuilt bundles)."""
+    manifest = get_manifest(app)
+    asset = manifest.get(relpath)
+    if asset is None and app.debug:
+        asset = manifest.scan().get(relpath)
+    return asset
+
+
+def init_static_assets(app):
+    root = app.static_folder
+    if root and app.config.get('STATIC_PRECOMPRESS_ON_START') and os.path.isdir(root):
+        try:
+            with app.app_context():
+                precompress(root, app.config.get('COMPRESS_MIN_SIZE', 1024))
+        except OSError as e: # Read-only dist
+            logger.warning(f"Could not precompress static assets in {root}: {e}")
+    manifest = app.extensions['static_manifest'] = AssetManifest(root).scan()
+    compressed = sum(1 for a in manifest.assets.values() if a.variants)
+    logger.debug(f"Static manifest: {len(manifest.assets)} files ({compressed} precompressed) from {root}")
+
+
+@click.command('precompress-static')
+@click.option('--min-size', type=int, default=None, help='Skip files smaller than this (default: COMPRESS_MIN_SIZE)')
+@with_appcontext
+def precompress_static_command(min_size):
+    """Write .gz/.br copies of the frontend bundle for the static file server."""
+    root = current_app.static_folder
+    written = precompress(root, min_size if min_size is not None else current_app.config.get('COMPRESS_MIN_SIZE', 1024))
+    print(f"Wrote {written} precompressed files in {root}.")
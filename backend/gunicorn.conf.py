@@ -0,0 +1,27 @@
+# gunicorn.conf.py
+# Usage: gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Export status long-polls hold a sync worker for up to EXPORT_WAIT_SECONDS; with
+# gevent installed, GUNICORN_WORKER_CLASS=gevent turns each waiter into a greenlet.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+
+# Import and build the app once in the master; workers fork from it and share
+# those pages copy-on-write instead of each paying the full startup cost.
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must never be shared across processes.
+    from core.extensions import db
+    from core.scheduler import detach_scheduler
+    app = worker.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values(): # Primary and read engines
+            engine.dispose(close=False)
+    # The master won the scheduler election (or is waiting on it); workers
+    # never run jobs and must not keep the lock alive after the master exits.
+    detach_scheduler(app)
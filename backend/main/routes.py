@@ -1,25 +1,36 @@
 # backend/main/routes.py
-from flask import Blueprint, send_from_directory, current_app
+from flask import Blueprint, abort, send_from_directory, current_app
+from flask_jwt_extended import jwt_required
 import os
+from core.static_assets import HASHED_ASSET, lookup, send_asset
 
 main_bp = Blueprint('main', __name__)
 
+@main_bp.route('/exports/<path:filename>')
+@jwt_required() # Secure the download link
+def download_export(filename):
+    """Serves files from the secure export directory."""
+    export_dir = os.path.join(current_app.instance_path, 'exports')
+    return send_from_directory(export_dir, filename, as_attachment=True)
+
 @main_bp.route('/', defaults={'path': ''})
 @main_bp.route('/<path:path>') 
 def serve_vue_app(path):
-    """Serves the Vue app's index.html for all non-API routes."""
-    # static_folder should be set to '../frontend/dist' in app.py
-    static_folder = current_app.static_folder
+    """Serves the Vue app's files, and its index.html for all other non-API routes."""
+    # Looked up in the manifest built at startup (core/static_assets.py), not on disk
+    if not current_app.static_folder:
+        return "Static folder not configured.", 404
+    if path.startswith('api/'):
+        abort(404)
 
-    if static_folder and path != "" and os.path.exists(os.path.join(static_folder, path)):
+    asset = lookup(current_app, path) if path else None
+    if asset is not None:
         # If the path exists in the static folder (e.g., CSS, JS files requested by index.html), serve it.
-        return send_from_directory(static_folder, path)
-    elif static_folder:
-         # Otherwise, serve the index.html shell for Vue Router to handle the path.
-         index_path = os.path.join(static_folder, 'index.html')
-         if os.path.exists(index_path):
-            return send_from_directory(static_folder, 'index.html')
-         else:
-             return "Frontend index.html not found in static folder.", 404
-    else:
-        return "Static folder not configured.", 404
\ No newline at end of file
+        return send_asset(asset)
+    if HASHED_ASSET.search(path):
+        abort(404) # A bundle file from another build; index.html in its place would break the page
+    # Otherwise, serve the index.html shell for Vue Router to handle the path.
+    index = lookup(current_app, 'index.html')
+    if index is None:
+        return "Frontend index.html not found in static folder.", 404
+    return send_asset(index)
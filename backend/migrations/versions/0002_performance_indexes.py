@@ -0,0 +1,46 @@
+"""performance indexes
+
+Secondary indexes for the hot paths: attempt history per user, per-quiz and
+per-subject aggregates, the scheduled jobs' date filters, grading lookups and
+the dashboard's subject -> chapter -> quiz walk.
+
+The operations are idempotent (if_not_exists / if_exists) because a database
+created by db.create_all() from the current models already has these indexes
+when it is stamped at the baseline.
+
+Revision ID: 0002_performance_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-19 12:23:17.958604
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_performance_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_chapter_subject_id_name', 'chapter', ['subject_id', 'name']),
+    ('ix_quiz_chapter_id_title', 'quiz', ['chapter_id', 'title']),
+    ('ix_question_quiz_id', 'question', ['quiz_id']),
+    ('ix_option_question_id_is_correct', 'option', ['question_id', 'is_correct']),
+    ('ix_quiz_attempt_user_id_submitted_at', 'quiz_attempt', ['user_id', 'submitted_at']),
+    ('ix_quiz_attempt_quiz_id_score', 'quiz_attempt', ['quiz_id', 'score']),
+    ('ix_quiz_attempt_submitted_at', 'quiz_attempt', ['submitted_at']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite has no autovacuum/autoanalyze; give the planner statistics for the new indexes.
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,75 @@
+"""denormalized subject/chapter keys
+
+Copies quiz -> chapter -> subject onto quiz.subject_id and
+quiz_attempt.chapter_id/subject_id, backfills existing rows and adds the
+covering indexes the subject charts read from.
+
+The columns stay nullable: the backfill below is a single statement per table,
+which is fine up to a few million attempts. For bigger tables, upgrade, deploy,
+then run `flask backfill-analytics-keys` (or the jobs.backfill_analytics_keys
+task), which fills and repairs the keys in small batches.
+
+Revision ID: 0003_denormalized_subject_keys
+Revises: 0002_performance_indexes
+Create Date: 2026-10-19 15:02:41.336120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_denormalized_subject_keys'
+down_revision = '0002_performance_indexes'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('quiz', 'subject_id', 'subject'),
+    ('quiz_attempt', 'chapter_id', 'chapter'),
+    ('quiz_attempt', 'subject_id', 'subject'),
+]
+
+INDEXES = [
+    ('ix_quiz_subject_id', 'quiz', ['subject_id']),
+    ('ix_quiz_attempt_subject_id_score', 'quiz_attempt', ['subject_id', 'score']),
+    ('ix_quiz_attempt_user_id_subject_id_score', 'quiz_attempt', ['user_id', 'subject_id', 'score', 'total_questions']),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    for table, column, target in COLUMNS:
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            continue # Created by db.create_all() from the current models
+        if bind.dialect.name == 'sqlite':
+            # SQLite accepts REFERENCES on ADD COLUMN, which avoids batch mode copying quiz_attempt;
+            # Alembic itself only offers the copy.
+            op.execute(f'ALTER TABLE {table} ADD COLUMN {column} INTEGER REFERENCES {target} (id)')
+        else:
+            op.add_column(table, sa.Column(column, sa.Integer(), nullable=True))
+            op.create_foreign_key(f'fk_{table}_{column}_{target}', table, target, [column], ['id'])
+
+    op.execute(
+        "UPDATE quiz SET subject_id = (SELECT chapter.subject_id FROM chapter WHERE chapter.id = quiz.chapter_id) "
+        "WHERE subject_id IS NULL")
+    op.execute(
+        "UPDATE quiz_attempt SET "
+        "chapter_id = (SELECT quiz.chapter_id FROM quiz WHERE quiz.id = quiz_attempt.quiz_id), "
+        "subject_id = (SELECT quiz.subject_id FROM quiz WHERE quiz.id = quiz_attempt.quiz_id) "
+        "WHERE subject_id IS NULL OR chapter_id IS NULL")
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    for table, column, _ in reversed(COLUMNS):
+        # Dropping the column drops its foreign key with it
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(column)
@@ -0,0 +1,74 @@
+"""attempt archive and rollups
+
+quiz_attempt_archive holds attempts older than ARCHIVE_HORIZON_DAYS and
+quiz_attempt_rollup their per-user, per-quiz aggregates (see core/archive.py).
+Both start empty; `flask archive-attempts` or the nightly job fills them.
+
+Revision ID: 0004_attempt_archive
+Revises: 0003_denormalized_subject_keys
+Create Date: 2026-10-19 16:10:52.804417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_attempt_archive'
+down_revision = '0003_denormalized_subject_keys'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quiz_attempt_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=True),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('total_questions', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('submitted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapter.id'], ),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_quiz_attempt_archive_user_id_submitted_at', 'quiz_attempt_archive', ['user_id', 'submitted_at'], unique=False, if_not_exists=True)
+    op.create_index('ix_quiz_attempt_archive_quiz_id', 'quiz_attempt_archive', ['quiz_id'], unique=False, if_not_exists=True)
+
+    op.create_table('quiz_attempt_rollup',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('chapter_id', sa.Integer(), nullable=True),
+    sa.Column('subject_id', sa.Integer(), nullable=True),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Integer(), nullable=False),
+    sa.Column('total_sum', sa.Integer(), nullable=False),
+    sa.Column('best_score', sa.Integer(), nullable=True),
+    sa.Column('best_total', sa.Integer(), nullable=True),
+    sa.Column('max_percentage', sa.Float(), nullable=True),
+    sa.Column('last_submitted_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['chapter_id'], ['chapter.id'], ),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ),
+    sa.ForeignKeyConstraint(['subject_id'], ['subject.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'quiz_id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_quiz_attempt_rollup_subject_id_best_score', 'quiz_attempt_rollup', ['subject_id', 'best_score', 'attempt_count'], unique=False, if_not_exists=True)
+    op.create_index('ix_quiz_attempt_rollup_user_id_attempt_count', 'quiz_attempt_rollup', ['user_id', 'attempt_count'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_quiz_attempt_rollup_user_id_attempt_count', table_name='quiz_attempt_rollup')
+    op.drop_index('ix_quiz_attempt_rollup_subject_id_best_score', table_name='quiz_attempt_rollup')
+    op.drop_table('quiz_attempt_rollup')
+    op.drop_index('ix_quiz_attempt_archive_quiz_id', table_name='quiz_attempt_archive')
+    op.drop_index('ix_quiz_attempt_archive_user_id_submitted_at', table_name='quiz_attempt_archive')
+    op.drop_table('quiz_attempt_archive')
@@ -0,0 +1,63 @@
+"""counter caches
+
+Adds quiz.question_count, quiz.attempt_count and user.attempt_count, fills
+them from the question, quiz_attempt and quiz_attempt_rollup tables, and
+indexes the two that are filtered and sorted on. From here on the ORM events
+and core/counters.py keep them current; `flask reconcile-counters` (also run
+nightly) repairs any drift.
+
+Revision ID: 0005_counter_caches
+Revises: 0004_attempt_archive
+Create Date: 2026-10-19 18:42:17.509213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_counter_caches'
+down_revision = '0004_attempt_archive'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('quiz', 'question_count'),
+    ('quiz', 'attempt_count'),
+    ('user', 'attempt_count'),
+]
+
+INDEXES = [
+    ('ix_quiz_question_count', 'quiz', ['question_count']),
+    ('ix_user_attempt_count', 'user', ['attempt_count']),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, column in COLUMNS:
+        if column in {c['name'] for c in inspector.get_columns(table)}:
+            continue # Created by db.create_all() from the current models
+        # A constant default keeps this a plain ADD COLUMN on SQLite, no table copy
+        op.add_column(table, sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute(
+        'UPDATE quiz SET '
+        'question_count = (SELECT count(*) FROM question WHERE question.quiz_id = quiz.id), '
+        'attempt_count = (SELECT count(*) FROM quiz_attempt WHERE quiz_attempt.quiz_id = quiz.id) '
+        '+ (SELECT coalesce(sum(r.attempt_count), 0) FROM quiz_attempt_rollup r WHERE r.quiz_id = quiz.id)')
+    op.execute(
+        'UPDATE "user" SET attempt_count = '
+        '(SELECT count(*) FROM quiz_attempt WHERE quiz_attempt.user_id = "user".id) '
+        '+ (SELECT coalesce(sum(r.attempt_count), 0) FROM quiz_attempt_rollup r WHERE r.user_id = "user".id)')
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
+    for table, column in reversed(COLUMNS):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column(column)
@@ -0,0 +1,51 @@
+"""score histograms
+
+quiz_score_histogram counts each quiz's submitted attempts (live and
+archived) in 20 score bins of 5 percentage points, with the sum of their
+percentages, so percentile ranks and means don't scan quiz_attempt (see
+core/histograms.py). Filled here from the attempt tables; from then on the
+ORM events keep it current and `flask rebuild-score-histograms` recomputes it.
+
+Revision ID: 0007_score_histograms
+Revises: 0006_export_jobs
+Create Date: 2026-10-19 22:15:40.127730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_score_histograms'
+down_revision = '0006_export_jobs'
+branch_labels = None
+depends_on = None
+
+BINS = 20 # core.models.SCORE_BINS when this revision was written
+
+
+def upgrade():
+    op.create_table('quiz_score_histogram',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('bin', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('percentage_sum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ),
+    sa.PrimaryKeyConstraint('quiz_id', 'bin'),
+    if_not_exists=True
+    )
+    op.execute('DELETE FROM quiz_score_histogram') # create_all() may have made it already
+    attempts = ' UNION ALL '.join(
+        f'SELECT quiz_id, '
+        f'CASE WHEN total_questions <= 0 THEN 0 WHEN score >= total_questions THEN {BINS - 1} '
+        f'ELSE score * {BINS} / total_questions END AS bin, '
+        f'CASE WHEN total_questions > 0 THEN score * 100.0 / total_questions ELSE 0.0 END AS percentage '
+        f'FROM {table} WHERE submitted_at IS NOT NULL'
+        for table in ('quiz_attempt', 'quiz_attempt_archive'))
+    op.execute(
+        'INSERT INTO quiz_score_histogram (quiz_id, bin, attempt_count, percentage_sum) '
+        f'SELECT quiz_id, bin, count(*), sum(percentage) FROM ({attempts}) AS a GROUP BY quiz_id, bin')
+
+
+def downgrade():
+    op.drop_table('quiz_score_histogram')
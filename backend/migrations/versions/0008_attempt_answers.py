@@ -0,0 +1,42 @@
+"""attempt answers
+
+attempt_answer stores the option chosen for each question of a submitted
+attempt, for item analysis (see core/item_analysis.py). Only submissions from
+now on are recorded; earlier attempts never kept their answers. Starts empty.
+
+Revision ID: 0008_attempt_answers
+Revises: 0007_score_histograms
+Create Date: 2026-10-19 23:41:08.552193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_attempt_answers'
+down_revision = '0007_score_histograms'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attempt_answer',
+    sa.Column('attempt_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('question_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('option_id', sa.Integer(), nullable=True),
+    sa.Column('is_correct', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['option_id'], ['option.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['question.id'], ),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quiz.id'], ),
+    sa.PrimaryKeyConstraint('attempt_id', 'question_id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_attempt_answer_quiz_id_attempt_id', 'attempt_answer',
+                    ['quiz_id', 'attempt_id', 'question_id', 'option_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_attempt_answer_quiz_id_attempt_id', table_name='attempt_answer')
+    op.drop_table('attempt_answer')
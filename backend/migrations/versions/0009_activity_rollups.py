@@ -0,0 +1,58 @@
+"""activity rollups
+
+activity_rollup holds attempts, score sums and active users per hour, day,
+week and month and subject for the admin trend charts; activity_presence
+tracks who was already counted in the open buckets and rollup_watermark how
+far the job has read (see core/activity.py). Starts empty: the scheduler's
+first run, or `flask rebuild-activity-rollups`, fills it from history.
+
+Revision ID: 0009_activity_rollups
+Revises: 0008_attempt_answers
+Create Date: 2026-10-19 23:58:31.174260
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_activity_rollups'
+down_revision = '0008_attempt_answers'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('activity_rollup',
+    sa.Column('level', sa.String(length=8), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.Integer(), nullable=False),
+    sa.Column('total_sum', sa.Integer(), nullable=False),
+    sa.Column('active_users', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('level', 'bucket_start', 'subject_id'),
+    if_not_exists=True
+    )
+    op.create_table('activity_presence',
+    sa.Column('level', sa.String(length=8), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('subject_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.PrimaryKeyConstraint('level', 'bucket_start', 'subject_id', 'user_id'),
+    if_not_exists=True
+    )
+    op.create_table('rollup_watermark',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('attempt_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name'),
+    if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_watermark')
+    op.drop_table('activity_presence')
+    op.drop_table('activity_rollup')
@@ -0,0 +1,6 @@
+# wsgi.py
+# Entry point for production servers, e.g.: gunicorn -w 4 wsgi:app
+import os
+from app import create_app
+
+app = create_app(os.environ.get('QUIZAPP_CONFIG', 'production'))
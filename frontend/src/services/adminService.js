@@ -128,8 +128,9 @@ export default {
     return apiClient.get('/summary/');
   },
 
-  getUserActivity(userId) {
-    return apiClient.get(`/admin/users/${userId}/activity`);
+  getUserActivity(userId, params = {}) {
+    // params: { include_archived: true, page, per_page } pages through archived history too
+    return apiClient.get(`/admin/users/${userId}/activity`, { params });
   },
 
   //=== Search ===
@@ -8,11 +8,19 @@ export default {
       getExportStatus(taskId) {
         return apiClient.get(`/tasks/${taskId}/status`);
       },
+      // Long-poll: answers once the job's version moves past `version`, or after `wait` seconds
+      waitForExport(jobId, version, wait = 25) {
+        return apiClient.get(`/user/exports/${jobId}`, { params: { version, wait }, timeout: (wait + 15) * 1000 });
+      },
+      downloadExport(downloadUrl) {
+        return apiClient.get(downloadUrl, { baseURL: '/', responseType: 'blob' });
+      },
   getDashboardData() { return apiClient.get('/user/dashboard-data'); },
   startQuiz(quizId) { return apiClient.post(`/user/quizzes/${quizId}/start`); },
   getQuizForAttempt(attemptId) { return apiClient.get(`/user/attempts/${attemptId}`); },
   submitQuizAttempt(attemptId, answers) { return apiClient.post(`/user/attempts/${attemptId}`, { answers }); },
   getSummaryData() {return apiClient.get('/user/summary-data');},
+  getLeaderboard(kind, id, limit = 10) { return apiClient.get(`/user/leaderboards/${kind}/${id}`, { params: { limit } }); },
   checkAnswer(attemptId, questionId, selectedOptionId) {
     return apiClient.post(`/user/attempts/${attemptId}/check`, {
       question_id: questionId,